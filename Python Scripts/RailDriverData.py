@@ -5,7 +5,13 @@
 
 import ctypes
 import os
+import random
+import sys
 import time
+from array import array
+from itertools import repeat
+
+from raildriver_log import flush as flush_log, log, set_level
 
 # ===============================
 # Global Configuration
@@ -13,16 +19,32 @@ import time
 # RailDriver DLL path
 DLL_NAME_X64 = r"C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dll"
 DLL_NAME_X86 = r"C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver.dll"
-# Set the DLL name based on the system architecture
-if os.name == 'nt':  # Windows
+# Set the DLL name based on the system architecture, unless RAILDRIVER_DLL points elsewhere (e.g. the stub DLL)
+if os.environ.get("RAILDRIVER_DLL"):
+    DLL_NAME = os.environ["RAILDRIVER_DLL"]
+elif os.name == 'nt':  # Windows
     if os.environ['PROCESSOR_ARCHITECTURE'].endswith('64'):
         DLL_NAME = DLL_NAME_X64
     else:
         DLL_NAME = DLL_NAME_X86
 else:
-    print("Operating system not Windows. Please adjust DLL_NAME manually.")
+    # stderr: stdout may be data (python -m raildriver dump --json)
+    print("Operating system not Windows. Please adjust DLL_NAME manually.", file=sys.stderr)
     DLL_NAME = DLL_NAME_X64 # Default to x64 for non-Windows
 
+# "Virtual" controllers, always there regardless of the loco. Current value only (mode 0).
+VIRTUAL_CONTROLLERS = {
+    400: "Latitude",
+    401: "Longitude",
+    402: "Fuel level",
+    403: "Is in tunnel?",
+    404: "Gradient",
+    405: "Heading",
+    406: "Time: hours",
+    407: "Time: minutes",
+    408: "Time: seconds",
+}
+
 # Load RailDriver DLL
 def load_raildriver_dll(dll_name=DLL_NAME):
     """Loads the specified RailDriver DLL."""
@@ -31,27 +53,12 @@ def load_raildriver_dll(dll_name=DLL_NAME):
         dll_path = os.path.join(script_dir, dll_name)
         raildriver = ctypes.CDLL(dll_path)
         log(2, f"Successfully loaded: {dll_path}")
-        time.sleep(1)  # Small delay after loading. Does it make any difference?
+        # No delay here: wait for the sim with connection.ConnectionSupervisor.wait_ready()
         return raildriver
     except OSError as e:
         log(1, f"Error loading {dll_name}: {e}")
         return None
 
-DEBUG_LEVEL = 1  # 0: NONE, 1: ERROR, 2: INFO, 3: DEBUG
-LOG_LEVELS = {
-    0: "NONE",
-    1: "ERROR",
-    2: "INFO",
-    3: "DEBUG"
-}
-
-def log(level, message):
-    """Centralized logging function with level control."""
-    if level <= DEBUG_LEVEL:
-        log_level_name = LOG_LEVELS.get(level, "UNKNOWN")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] [{log_level_name}] {message}")
-
 # ===============================
 # API Wrappers
 # ===============================
@@ -69,7 +76,7 @@ def get_controller_list(raildriver):
         if controller_list_bytes:
             controller_list_str = controller_list_bytes.decode('utf-8')
             controllers = controller_list_str.split("::")
-            log(3, f"Retrieved controller list: {controllers}")
+            log(3, "Retrieved controller list: %s", controllers)
             return controllers
         else:
             log(1, "Failed to retrieve controller list.")
@@ -91,7 +98,7 @@ def get_loco_name(raildriver):
         loco_name_bytes = GetLocoNameFunc()
         if loco_name_bytes:
             loco_name_str = loco_name_bytes.decode('utf-8')
-            log(3, f"Retrieved locomotive name: {loco_name_str}")
+            log(3, "Retrieved locomotive name: %s", loco_name_str)
             return loco_name_str
         else:
             log(1, "Failed to retrieve locomotive name.")
@@ -110,7 +117,7 @@ def get_controller_value(raildriver, control_id, mode=0):
         GetControllerValueFunc.restype = ctypes.c_float
         GetControllerValueFunc.argtypes = [ctypes.c_int, ctypes.c_int] # controlID, Mode
         value = GetControllerValueFunc(control_id, mode)
-        log(3, f"GetControllerValue(control_id={control_id}, mode={mode}) returned: {value}")
+        log(3, "GetControllerValue(control_id=%s, mode=%s) returned: %s", control_id, mode, value)
         return value
     except Exception as e:
         log(1, f"Error in get_controller_value: {e}")
@@ -126,7 +133,7 @@ def set_controller_value(raildriver, control_id, value):
         SetControllerValueFunc.restype = None # void return
         SetControllerValueFunc.argtypes = [ctypes.c_int, ctypes.c_float] # Control, Value
         SetControllerValueFunc(control_id, ctypes.c_float(value))
-        log(3, f"SetControllerValue(control_id={control_id}, value={value}) called.")
+        log(3, "SetControllerValue(control_id=%s, value=%s) called.", control_id, value)
     except Exception as e:
         log(1, f"Error in set_controller_value: {e}")
         return None
@@ -141,7 +148,7 @@ def get_rail_sim_loco_changed(raildriver):
         GetRailSimLocoChangedFunc.restype = ctypes.c_bool
         GetRailSimLocoChangedFunc.argtypes = [] 
         changed = GetRailSimLocoChangedFunc()
-        log(3, f"GetRailSimLocoChanged() returned: {changed}")
+        log(3, "GetRailSimLocoChanged() returned: %s", changed)
         return changed
     except Exception as e:
         log(1, f"Error in get_rail_sim_loco_changed: {e}")
@@ -157,32 +164,255 @@ def set_rail_driver_connected(raildriver, value):
         SetRailDriverConnectedFunc.restype = None # void return 
         SetRailDriverConnectedFunc.argtypes = [ctypes.c_bool] 
         SetRailDriverConnectedFunc(ctypes.c_bool(value))
-        log(3, f"SetRailDriverConnected({value}) called.")
+        log(3, "SetRailDriverConnected(%s) called.", value)
     except Exception as e:
         log(1, f"Error in set_rail_driver_connected: {e}")
         return None
 
-# trying to debug the controller retrieval errors! Not sure if it makes any difference
-def attempt_get_controller_list(raildriver, max_attempts=3, delay=2):
+def backoff_delays(initial=0.01, maximum=1.0, factor=2.0, jitter=0.5, rng=random.random):
+    """
+    Endless delays growing from initial by factor up to maximum. Each is reduced by a random
+    part of up to jitter (0.5: between 50% and 100% of the nominal delay), so several
+    processes started together don't probe the DLL in lockstep.
+    """
+    delay = initial
+    while True:
+        yield delay * (1.0 - jitter * rng())
+        delay = min(delay * factor, maximum)
+
+# The controller list is often not there right after loading, or while a loco is loading.
+# Retries with growing, jittered delays (backoff_delays) instead of a fixed wait.
+def retry_controller_list(get_list, max_attempts=8, delay=0.02, max_delay=1.0):
+    """
+    Calls get_list() until it returns a controller list (None or RuntimeError: not yet).
+    Raises RuntimeError after max_attempts. Shared by every caller that discovers the list.
+    """
+    delays = backoff_delays(delay, max_delay)
     for attempt in range(max_attempts):
         try:
-            controllers = get_controller_list(raildriver)
-            return controllers
+            controllers = get_list()
+            if controllers:
+                return controllers
+            error = "no controller list"
         except RuntimeError as e:
-            print(f"[WARNING] Attempt {attempt + 1} to get controller list failed: {e}")
-            if attempt < max_attempts - 1:
-                time.sleep(delay)
-            else:
-                raise  
+            error = e
+        log(2, f"Attempt {attempt + 1} to get controller list failed: {error}")
+        if attempt == max_attempts - 1:
+            raise RuntimeError(f"Failed to retrieve controller list after {max_attempts} attempts.")
+        time.sleep(next(delays))
+
+def attempt_get_controller_list(raildriver, max_attempts=8, delay=0.02, max_delay=1.0):
+    return retry_controller_list(lambda: get_controller_list(raildriver), max_attempts, delay, max_delay)
+
+# ===============================
+# Bound Function Table
+# ===============================
+# (restype, argtypes) for every export in dll_dumbs/RailDriver64_Function_List.txt.
+# The ones the wrappers above use are known to work, the rest are best guesses from the names.
+DLL_PROTOTYPES = {
+    "ClearChanged":                    (None,            []),
+    "ControllerChanged":               (ctypes.c_bool,   [ctypes.c_int]),
+    "GetControllerList":               (ctypes.c_char_p, []),
+    "GetControllerValue":              (ctypes.c_float,  [ctypes.c_int, ctypes.c_int]), # controlID, Mode
+    "GetCurrentControllerValue":       (ctypes.c_float,  [ctypes.c_int]),
+    "GetLocoName":                     (ctypes.c_char_p, []),
+    "GetNextRailDriverId":             (ctypes.c_int,    []),
+    "GetRailDriverConnected":          (ctypes.c_bool,   []),
+    "GetRailDriverGetId":              (ctypes.c_int,    [ctypes.c_int]),
+    "GetRailDriverGetType":            (ctypes.c_int,    [ctypes.c_int]),
+    "GetRailDriverValue":              (ctypes.c_float,  [ctypes.c_int]),
+    "GetRailSimCombinedThrottleBrake": (ctypes.c_bool,   []),
+    "GetRailSimConnected":             (ctypes.c_bool,   []),
+    "GetRailSimLocoChanged":           (ctypes.c_bool,   []),
+    "GetRailSimValue":                 (ctypes.c_float,  [ctypes.c_int, ctypes.c_int]),
+    "IsLocoSet":                       (ctypes.c_bool,   []),
+    "SetControllerList":               (None,            [ctypes.c_char_p]),
+    "SetControllerValue":              (None,            [ctypes.c_int, ctypes.c_float]), # Control, Value
+    "SetLocoName":                     (None,            [ctypes.c_char_p]),
+    "SetRailDriverConnected":          (None,            [ctypes.c_bool]),
+    "SetRailDriverLocoChanged":        (None,            [ctypes.c_bool]),
+    "SetRailDriverValue":              (None,            [ctypes.c_int, ctypes.c_float]),
+    "SetRailSimConnected":             (None,            [ctypes.c_bool]),
+    "SetRailSimControllerMinMax":      (None,            [ctypes.c_int, ctypes.c_float, ctypes.c_float]),
+    "SetRailSimControllerValue":       (None,            [ctypes.c_int, ctypes.c_float]),
+    "SetRailSimValue":                 (None,            [ctypes.c_int, ctypes.c_float]),
+}
+
+class RailDriverClient:
+    """
+    Resolves and types every DLL export once, at load time.
+
+    Each export is available as an attribute with its DLL name (client.GetControllerValue(id, mode)),
+    already typed, so the hot path is a single ctypes call. Exports missing from the DLL are None.
+    The snake_case methods mirror the module wrappers above for the calls that need decoding.
+    """
+
+    def __init__(self, raildriver):
+        if not raildriver:
+            log(1, f"{DLL_NAME} not loaded.")
+            raise RuntimeError("DLL not loaded!")
+        self.dll = raildriver
+        self.layout = None  # ControllerLayout of the current loco, see read_snapshot()
+        self.missing = []
+        for name, (restype, argtypes) in DLL_PROTOTYPES.items():
+            try:
+                # dll[name] gives a private function object, so the prototype set here
+                # can't be overwritten by other code typing raildriver.<name> differently.
+                func = raildriver[name]
+            except AttributeError:
+                self.missing.append(name)
+                setattr(self, name, None)
+                continue
+            func.restype = restype
+            func.argtypes = argtypes
+            setattr(self, name, func)
+        if self.missing:
+            log(2, f"Exports not found in DLL: {', '.join(self.missing)}")
+
+    @classmethod
+    def load(cls, dll_name=DLL_NAME):
+        """Loads the DLL and returns a client for it, or None if loading failed."""
+        raildriver = load_raildriver_dll(dll_name)
+        return cls(raildriver) if raildriver else None
+
+    def get_controller_list(self):
+        """Retrieves the controller list, None if the DLL returned nothing."""
+        controller_list_bytes = self.GetControllerList()
+        if not controller_list_bytes:
+            log(1, "Failed to retrieve controller list.")
+            return None
+        return controller_list_bytes.decode('utf-8').split("::")
+
+    def get_loco_name(self):
+        """Retrieves the current locomotive name, None if not available."""
+        loco_name_bytes = self.GetLocoName()
+        if not loco_name_bytes:
+            log(1, "Failed to retrieve locomotive name.")
+            return None
+        return loco_name_bytes.decode('utf-8')
+
+    def get_controller_value(self, control_id, mode=0):
+        """Retrieves the current (0), min (1) or max (2) value of a controller."""
+        return self.GetControllerValue(control_id, mode)
+
+    def set_controller_value(self, control_id, value):
+        """Sets the value of a specific controller."""
+        self.SetControllerValue(control_id, value)
+
+    def get_rail_sim_loco_changed(self):
+        """Checks if the currently driven locomotive has changed."""
+        return self.GetRailSimLocoChanged()
+
+    def set_rail_driver_connected(self, value):
+        """Keeps the RailDriver connection open."""
+        self.SetRailDriverConnected(value)
+
+    def read_layout(self, controllers=None):
+        """Reads the controller list (unless given) and every controller's min/max. Once per loco."""
+        if controllers is None:
+            controllers = self.get_controller_list()
+            if controllers is None:
+                raise RuntimeError("Failed to retrieve controller list.")
+        self.layout = ControllerLayout.read(self, controllers)
+        return self.layout
+
+    def read_snapshot(self):
+        """
+        Reads the current value of every controller, virtual ones included.
+        Only mode 0 is read; min/max come from the layout, which is re-read when the loco changes.
+        """
+        # always read (and so clear) the flag, also when the layout is read for the first time:
+        # otherwise the still raised flag looks like a loco change on the next snapshot
+        loco_changed = self.GetRailSimLocoChanged()
+        if loco_changed or self.layout is None:
+            self.read_layout()
+        return Snapshot.read(self, self.layout)
+
+# ===============================
+# Snapshots
+# ===============================
+class ControllerLayout:
+    """
+    Everything about the controllers that only changes with the loco.
+
+    Position i describes controller ids[i], called names[i], with limits mins[i]/maxs[i].
+    Regular controllers come first (id == position), then the virtual ones (no min/max, NaN).
+    """
+    __slots__ = ("names", "ids", "index", "mins", "maxs", "controller_count")
+
+    def __init__(self, names, ids, mins, maxs, controller_count):
+        self.names = names
+        self.ids = ids
+        self.index = {name: position for position, name in enumerate(names)}
+        self.mins = mins
+        self.maxs = maxs
+        self.controller_count = controller_count
+
+    @classmethod
+    def read(cls, client, controllers):
+        """Builds the layout for a controller list, reading min and max of each controller once."""
+        get = client.GetControllerValue
+        count = len(controllers)
+        mins = map(get, range(count), repeat(1))
+        maxs = map(get, range(count), repeat(2))
+        log(3, "Reading min/max of %d controllers", count)
+        return cls.build(controllers, mins, maxs)
+
+    @classmethod
+    def build(cls, controllers, mins, maxs):
+        """Builds the layout from already known values, e.g. loaded from disk. Appends the virtual controllers."""
+        count = len(controllers)
+        names = list(controllers) + list(VIRTUAL_CONTROLLERS.values())
+        ids = array('i', range(count))
+        ids.extend(VIRTUAL_CONTROLLERS)
+        nan = float("nan")
+        mins = array('f', mins)
+        mins.extend(repeat(nan, len(VIRTUAL_CONTROLLERS)))
+        maxs = array('f', maxs)
+        maxs.extend(repeat(nan, len(VIRTUAL_CONTROLLERS)))
+        return cls(names, ids, mins, maxs, count)
+
+    @property
+    def controllers(self):
+        """The regular controller names, as GetControllerList returned them."""
+        return self.names[:self.controller_count]
+
+    def __len__(self):
+        return len(self.ids)
+
+class Snapshot:
+    """The current values of all controllers at one moment, values[i] belongs to layout position i."""
+    __slots__ = ("timestamp", "layout", "values")
+
+    def __init__(self, timestamp, layout, values):
+        self.timestamp = timestamp
+        self.layout = layout
+        self.values = values
+
+    @classmethod
+    def read(cls, client, layout):
+        """One GetControllerValue(id, 0) per controller, straight into an array('f')."""
+        timestamp = time.time()
+        values = array('f', map(client.GetControllerValue, layout.ids, repeat(0)))
+        return cls(timestamp, layout, values)
+
+    def __getitem__(self, name):
+        """Value of a controller by name, e.g. snapshot["SpeedometerMPH"]."""
+        return self.values[self.layout.index[name]]
+
+    def as_dict(self):
+        """{name: value} for every controller. Convenient, but allocates; avoid in tight loops."""
+        return dict(zip(self.layout.names, self.values))
 
 # =============
 # Main Script
 # =============
 if __name__ == "__main__":
-    raildriver_lib = load_raildriver_dll()  # central DLL_NAME
+    set_level(1)  # 0: NONE, 1: ERROR, 2: INFO, 3: DEBUG; as a library: raildriver_log.set_level()
+    client = RailDriverClient.load()  # central DLL_NAME
 
-    if raildriver_lib:
-        loco_name = get_loco_name(raildriver_lib)
+    if client:
+        loco_name = client.get_loco_name()
         if loco_name:
             detailed_time = time.strftime("%Y-%m-%d %H:%M:%S")
             compact_date = time.strftime("%Y%m%d")
@@ -197,25 +427,26 @@ if __name__ == "__main__":
 
                 log(2, f"Currently driven locomotive: {loco_name}")
 
-                controllers = attempt_get_controller_list(raildriver_lib)
+                controllers = attempt_get_controller_list(client.dll)
                 if controllers:
+                    layout = client.read_layout(controllers)
+                    snapshot = client.read_snapshot()
                     log(2, "\nDetected Controllers and Values:")
                     log(2, "-" * 40)
+                    flush_log()  # before the console output
                     outfile.write("Detected Controllers and Values:\n")
                     outfile.write("-" * 40 + "\n")
-                    for index, controller_name in enumerate(controllers):
-                        current_value = get_controller_value(raildriver_lib, index, 0)
-                        min_value = get_controller_value(raildriver_lib, index, 1)
-                        max_value = get_controller_value(raildriver_lib, index, 2)
+                    for index in range(layout.controller_count):
+                        current_value = snapshot.values[index]
+                        min_value = layout.mins[index]
+                        max_value = layout.maxs[index]
 
-                        output = f"[{index:02d}] {controller_name}: "
-                        if min_value == 0.0 and max_value == 1.0 and current_value is not None:
+                        output = f"[{index:02d}] {layout.names[index]}: "
+                        if min_value == 0.0 and max_value == 1.0:
                             status = "ON" if current_value > 0.5 else "OFF"
                             output += f"(BOOLEAN): {status} "
-                        elif current_value is not None and min_value is not None and max_value is not None:
-                            output += f": {current_value:.2f}, Min/Max: [{min_value:.2f}, {max_value:.2f}]"
                         else:
-                            output += "Could not retrieve all values."
+                            output += f": {current_value:.2f}, Min/Max: [{min_value:.2f}, {max_value:.2f}]"
                         print(output)  # console output
                         outfile.write(output + "\n")
                     outfile.write("-" * 40 + "\n")
@@ -223,24 +454,8 @@ if __name__ == "__main__":
                     # Added the extra "virtual" controllers to the printout
                     outfile.write("\nAdditional RailDriver Controllers:\n")
                     outfile.write("-" * 40 + "\n")
-                    virtual_controllers = {
-                        400: "Latitude",
-                        401: "Longitude",
-                        402: "Fuel level",
-                        403: "Is in tunnel?",
-                        404: "Gradient",
-                        405: "Heading",
-                        406: "Time: hours",
-                        407: "Time: minutes",
-                        408: "Time: seconds",
-                    }
-                    for control_id, description in virtual_controllers.items():
-                        current_value = get_controller_value(raildriver_lib, control_id, 0)
-                        output = f"[{control_id:03d}] {description}: "
-                        if current_value is not None:
-                            output += f"{current_value:.2f}"
-                        else:
-                            output += "Could not retrieve value."
+                    for index in range(layout.controller_count, len(layout)):
+                        output = f"[{layout.ids[index]:03d}] {layout.names[index]}: {snapshot.values[index]:.2f}"
                         print(output)
                         outfile.write(output + "\n")
                     outfile.write("-" * 40 + "\n")
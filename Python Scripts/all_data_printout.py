@@ -1,52 +1,16 @@
 import ctypes
-import os
 import time
 
+from connection import ConnectionSupervisor
+from RailDriverData import RailDriverClient, attempt_get_controller_list, load_raildriver_dll
+from raildriver_log import flush as flush_log, log, set_level
+
 # ===============================
 # Global Configuration
 # ===============================
 # RailDriver DLL path
 DLL_NAME = r"C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dll"  # Corrected path using raw string
-# Load RailDriver DLL
-def load_raildriver_dll(dll_name=DLL_NAME):
-    try:
-        raildriver = ctypes.CDLL(dll_name)
-        time.sleep(1)  # Small delay after loading
-        return raildriver
-    except OSError as e:
-        print(f"Error loading {dll_name}: {e}")
-        return None
-    
 DEBUG_LEVEL = 1  # 0: NONE, 1: ERROR, 2: INFO, 3: DEBUG
-LOG_LEVELS = {
-    0: "NONE",
-    1: "ERROR",
-    2: "INFO",
-    3: "DEBUG"
-}
-
-def log(level, message):
-    """Centralized logging function with level control."""
-    if level <= DEBUG_LEVEL:
-        log_level_name = LOG_LEVELS.get(level, "UNKNOWN")
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] [{log_level_name}] {message}")
-
-# ===============================
-# DLL Loading
-# ===============================
-def load_raildriver_dll(dll_name=DLL_NAME):
-    """Loads the specified RailDriver DLL."""
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        dll_path = os.path.join(script_dir, dll_name)
-        raildriver = ctypes.CDLL(dll_path)
-        log(2, f"Successfully loaded: {dll_path}")
-        time.sleep(1)  # Delay maybe solves the raildriver loading error?
-        return raildriver
-    except OSError as e:
-        log(1, f"Error loading {dll_name}: {e}")
-        return None
 
 # ===============================
 # API Function Wrappers
@@ -64,7 +28,7 @@ def get_controller_list(raildriver):
         if controller_list_bytes:
             controller_list_str = controller_list_bytes.decode('utf-8')
             controllers = controller_list_str.split("::")
-            log(3, f"Retrieved controller list: {controllers}")
+            log(3, "Retrieved controller list: %s", controllers)
             return controllers
         else:
             log(1, "Failed to retrieve controller list.")
@@ -85,7 +49,7 @@ def get_loco_name(raildriver):
         loco_name_bytes = GetLocoName()
         if loco_name_bytes:
             loco_name_str = loco_name_bytes.decode('utf-8')
-            log(3, f"Retrieved locomotive name: {loco_name_str}")
+            log(3, "Retrieved locomotive name: %s", loco_name_str)
             return loco_name_str
         else:
             log(1, "Failed to retrieve locomotive name.")
@@ -103,32 +67,22 @@ def get_controller_value(raildriver, control_id, mode=0):
         GetControllerValue = raildriver.GetControllerValue
         GetControllerValue.restype = ctypes.c_float
         value = GetControllerValue(control_id, mode)
-        log(3, f"GetControllerValue(control_id={control_id}, mode={mode}) returned: {value}")
+        log(3, "GetControllerValue(control_id=%s, mode=%s) returned: %s", control_id, mode, value)
         return value
     except Exception as e:
         log(1, f"Error in get_controller_value: {e}")
         return None
 
-# trying to debug the controller retrieval errors! Not sure if it makes any difference
-def attempt_get_controller_list(raildriver, max_attempts=3, delay=2):
-    for attempt in range(max_attempts):
-        try:
-            controllers = get_controller_list(raildriver)
-            return controllers
-        except RuntimeError as e:
-            print(f"[WARNING] Attempt {attempt + 1} to get controller list failed: {e}")
-            if attempt < max_attempts - 1:
-                time.sleep(delay)
-            else:
-                raise  # Re-raise the exception after final attempt
-
 # =============
 # Main Script
 # =============
 if __name__ == "__main__":
-    raildriver_lib = load_raildriver_dll()  # Uses the global DLL_NAME
+    set_level(DEBUG_LEVEL)  # lazy, queued logging, see raildriver_log.py
+    raildriver_lib = load_raildriver_dll(DLL_NAME)  # the shared loader of RailDriverData.py
 
     if raildriver_lib:
+        # instead of a fixed delay after loading: probe until the sim delivers a controller list
+        ConnectionSupervisor(RailDriverClient(raildriver_lib)).wait_ready(timeout=10)
         loco_name = get_loco_name(raildriver_lib)
         if loco_name:
             detailed_time = time.strftime("%Y-%m-%d %H:%M:%S")
@@ -150,6 +104,7 @@ if __name__ == "__main__":
                 if controllers:
                     log(2, "\nDetected Controllers and Values:")
                     log(2, "-" * 40)
+                    flush_log()  # before the console output
                     for index, controller_name in enumerate(controllers):
                         current_value = get_controller_value(raildriver_lib, index, 0)
                         min_value = get_controller_value(raildriver_lib, index, 1)
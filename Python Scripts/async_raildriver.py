@@ -0,0 +1,161 @@
+# asyncio front-end for RailDriverClient.
+#   All DLL calls run on one dedicated thread, so the DLL is never called concurrently and the
+#   event loop never blocks. Reads requested in the same loop iteration are batched into one
+#   job, and identical reads are done only once: 100 coroutines awaiting the speed cost one call.
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from RailDriverData import DLL_NAME, RailDriverClient
+from change_stream import ChangeStream
+
+def _dll_executor():
+    """The one thread every DLL call of an AsyncRailDriver runs on."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="RailDriverDLL")
+
+class AsyncRailDriver:
+    """Awaitable get_value/set_value/snapshot and an async change stream over a RailDriverClient."""
+
+    def __init__(self, client, executor=None):
+        self.client = client
+        self.executor = executor or _dll_executor()
+        self.batched_reads = 0    # reads done on the DLL thread after coalescing (a snapshot counts once)
+        self.coalesced_reads = 0  # reads answered by another coroutine's call
+        self._batch = {}          # read key -> asyncio.Future, for the current loop iteration
+        self._flush_scheduled = False
+
+    @classmethod
+    async def load(cls, dll_name=DLL_NAME):
+        """Loads the DLL without blocking the loop. Returns None if loading failed."""
+        loop = asyncio.get_running_loop()
+        executor = _dll_executor()  # loaded on the thread that will make every call
+        client = await loop.run_in_executor(executor, RailDriverClient.load, dll_name)
+        if not client:
+            executor.shutdown(wait=False)
+            return None
+        return cls(client, executor)
+
+    async def get_value(self, control_id, mode=0):
+        """Current (0), min (1) or max (2) value of a controller."""
+        return await self._read(("value", control_id, mode))
+
+    async def snapshot(self):
+        """Snapshot of all controllers, see RailDriverClient.read_snapshot()."""
+        return await self._read(("snapshot",))
+
+    async def set_value(self, control_id, value):
+        """Sets a controller. Runs after any read requested before it."""
+        self._flush()
+        await self.call(self.client.SetControllerValue, control_id, value)
+
+    async def call(self, func, *args):
+        """Runs any client function on the DLL thread, e.g. await rd.call(rd.client.get_loco_name)."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def changes(self, interval=0.05, **stream_options):
+        """
+        Async generator of ChangeEvents, polled every interval seconds.
+        stream_options go to ChangeStream (controllers, deadband, deadbands, mode).
+        """
+        stream = await self.call(lambda: ChangeStream(self.client, **stream_options))
+        deadline = time.perf_counter()
+        while True:
+            for event in await self.call(stream.poll):
+                yield event
+            deadline += interval
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            else:
+                deadline = time.perf_counter()
+
+    async def close(self):
+        """Waits for queued DLL calls, then stops the DLL thread."""
+        self._flush()
+        await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _read(self, key):
+        future = self._batch.get(key)
+        if future is not None:
+            self.coalesced_reads += 1
+            return asyncio.shield(future)
+        loop = asyncio.get_running_loop()
+        future = self._batch[key] = loop.create_future()
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        return asyncio.shield(future)
+
+    def _flush(self):
+        """Sends the reads collected in this loop iteration to the DLL thread as one job."""
+        self._flush_scheduled = False
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, {}
+        self.batched_reads += len(batch)
+        loop = asyncio.get_running_loop()
+        job = self.executor.submit(self._read_batch, list(batch))
+        job.add_done_callback(lambda done: loop.call_soon_threadsafe(self._deliver, batch, done))
+
+    def _read_batch(self, keys):
+        """DLL thread: does each read, keeping exceptions per key."""
+        get = self.client.GetControllerValue
+        results = []
+        for key in keys:
+            try:
+                if key[0] == "value":
+                    results.append((True, get(key[1], key[2])))
+                else:
+                    results.append((True, self.client.read_snapshot()))
+            except Exception as e:
+                results.append((False, e))
+        return results
+
+    def _deliver(self, batch, done):
+        """Event loop: resolves the futures of a finished batch."""
+        try:
+            results = done.result()
+        except Exception as e:
+            results = [(False, e)] * len(batch)
+        for future, (ok, result) in zip(batch.values(), results):
+            if future.cancelled():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+# =============
+# Main Script
+# =============
+async def main(dll_name):
+    raildriver = await AsyncRailDriver.load(dll_name)
+    if not raildriver:
+        return 1
+    async with raildriver:
+        speeds = await asyncio.gather(*(raildriver.get_value(0) for _ in range(100)))
+        print(f"100 concurrent reads -> {raildriver.batched_reads} read(s) on the DLL thread, value {speeds[0]:.2f}")
+        snapshot = await raildriver.snapshot()
+        print(f"Snapshot of {len(snapshot.values)} controllers")
+        print("Watching changes for 5 s...")
+        try:
+            await asyncio.wait_for(print_changes(raildriver), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+    return 0
+
+async def print_changes(raildriver):
+    async for event in raildriver.changes(deadband=0.01):
+        print(f"[{event.controller_id:03d}] {event.name}: {event.old:.2f} -> {event.new:.2f}")
+
+if __name__ == "__main__":
+    # python async_raildriver.py [dll_path]
+    sys.exit(asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else DLL_NAME)))
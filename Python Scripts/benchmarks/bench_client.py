@@ -0,0 +1,50 @@
+# Micro-benchmark: module wrappers (prototype set up on every call) vs. RailDriverClient (typed once).
+# Runs against the stub DLL, so it works on Linux:  python benchmarks/bench_client.py [iterations]
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import RailDriverData
+from RailDriverData import RailDriverClient
+from stub_dll import build_stub_dll
+
+def bench(label, func, number):
+    """Times func() and prints the per-call cost. Returns seconds per call."""
+    per_call = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<45} {per_call * 1e9:10.0f} ns/call {1 / per_call:14,.0f} calls/s")
+    return per_call
+
+if __name__ == "__main__":
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    raildriver_lib = RailDriverData.load_raildriver_dll(build_stub_dll())
+    if not raildriver_lib:
+        sys.exit(1)
+    client = RailDriverClient(raildriver_lib)
+
+    pairs = [
+        ("get_controller_value",
+         lambda: RailDriverData.get_controller_value(raildriver_lib, 3, 0),
+         lambda: client.GetControllerValue(3, 0)),
+        ("set_controller_value",
+         lambda: RailDriverData.set_controller_value(raildriver_lib, 3, 0.5),
+         lambda: client.SetControllerValue(3, 0.5)),
+        ("get_controller_list",
+         lambda: RailDriverData.get_controller_list(raildriver_lib),
+         client.get_controller_list),
+        ("get_loco_name",
+         lambda: RailDriverData.get_loco_name(raildriver_lib),
+         client.get_loco_name),
+        ("get_rail_sim_loco_changed",
+         lambda: RailDriverData.get_rail_sim_loco_changed(raildriver_lib),
+         lambda: client.GetRailSimLocoChanged()),
+        ("set_rail_driver_connected",
+         lambda: RailDriverData.set_rail_driver_connected(raildriver_lib, True),
+         lambda: client.SetRailDriverConnected(True)),
+    ]
+    for name, old, new in pairs:
+        old_time = bench(f"{name} (module wrapper)", old, number)
+        new_time = bench(f"{name} (RailDriverClient)", new, number)
+        print(f"{'':<45} {old_time / new_time:10.1f}x faster")
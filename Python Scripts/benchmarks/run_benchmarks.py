@@ -0,0 +1,455 @@
+# Benchmark suite for the RailDriver access layer, run against the stub DLL (stub_dll.py).
+#   python benchmarks/run_benchmarks.py [--output results.json] [--compare baseline.json] [--quick]
+# Prints a summary and writes the results as JSON, so two versions can be compared:
+# --compare reports every metric that got more than --tolerance worse than in the baseline file.
+# It also exits with 1 if python -m raildriver dump needs more than DUMP_FIRST_BYTE_BUDGET_MS to its first output.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import RailDriverData
+import raildriver_log
+from RailDriverData import RailDriverClient
+from controller_arrays import ControllerArrays, as_array, np
+from controller_names import ControllerNames
+from controller_resolver import ControllerResolver
+from instrumentation import Instruments
+from key_bindings import KeyBindings
+from live_view import LiveView
+from stub_dll import DEFAULT_CONTROLLERS, build_stub_dll, change_loco, load_stub_dll, stub_controls
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_SIZES = (10, 50, 100, 250, 500, 1000)
+DUMP_FIRST_BYTE_BUDGET_MS = 250  # python -m raildriver dump: p50 from start to its first output
+FORMAT_VERSION = 1
+
+# ===============================
+# Measuring
+# ===============================
+def percentile(sorted_samples, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_samples:
+        return 0.0
+    rank = min(int(fraction * len(sorted_samples)), len(sorted_samples) - 1)
+    return sorted_samples[rank]
+
+def measure(func, samples, warmup=100):
+    """
+    Calls func() samples times, timing every call on its own.
+    Returns calls/s (over the whole run) and mean/p50/p99/max latency in microseconds.
+    """
+    for _ in range(warmup):
+        func()
+    clock = time.perf_counter_ns
+    timings = [0] * samples
+    started = clock()
+    for i in range(samples):
+        before = clock()
+        func()
+        timings[i] = clock() - before
+    elapsed = clock() - started
+    return summarize(timings, elapsed)
+
+def measure_process(command, samples, env=None, first_byte=False):
+    """
+    Starts command samples times in the scripts folder, timing each run until the process exits,
+    or with first_byte until its first byte of output. Same metrics as measure().
+    """
+    clock = time.perf_counter_ns
+    timings = []
+    started = clock()
+    for _ in range(samples):
+        before = clock()
+        process = subprocess.Popen(command, cwd=SCRIPTS_DIR, env=env, stdout=subprocess.PIPE,
+                                   stderr=subprocess.DEVNULL)
+        if first_byte:
+            process.stdout.read(1)
+            timings.append(clock() - before)
+            process.communicate()
+        else:
+            process.communicate()
+            timings.append(clock() - before)
+        if process.returncode:
+            raise RuntimeError(f"{' '.join(command)} exited with {process.returncode}")
+    return summarize(timings, clock() - started)
+
+def summarize(timings, elapsed):
+    """Calls/s over elapsed ns and mean/p50/p99/max of the timings (ns) in microseconds."""
+    samples = len(timings)
+    timings.sort()
+    return {
+        "samples": samples,
+        "calls_per_s": round(samples / (elapsed / 1e9)),
+        "mean_us": round(sum(timings) / samples / 1000, 3),
+        "p50_us": round(percentile(timings, 0.50) / 1000, 3),
+        "p99_us": round(percentile(timings, 0.99) / 1000, 3),
+        "max_us": round(timings[-1] / 1000, 3),
+    }
+
+def clock_overhead_ns(samples=100_000):
+    """Cost of one perf_counter_ns() pair, included in every latency above."""
+    clock = time.perf_counter_ns
+    timings = []
+    for _ in range(samples):
+        before = clock()
+        timings.append(clock() - before)
+    timings.sort()
+    return percentile(timings, 0.50)
+
+# ===============================
+# Benchmarks
+# ===============================
+def bench_calls(stub, client, samples):
+    """get/set/list through the module wrappers of RailDriverData.py and through RailDriverClient."""
+    get_value = RailDriverData.get_controller_value
+    set_value = RailDriverData.set_controller_value
+    get_list = RailDriverData.get_controller_list
+    return {
+        "get_controller_value": {
+            "module_wrapper": measure(lambda: get_value(stub, 3, 0), samples),
+            "client": measure(lambda: client.GetControllerValue(3, 0), samples),
+        },
+        "set_controller_value": {
+            "module_wrapper": measure(lambda: set_value(stub, 3, 0.5), samples),
+            "client": measure(lambda: client.SetControllerValue(3, 0.5), samples),
+        },
+        "get_controller_list": {
+            "module_wrapper": measure(lambda: get_list(stub), samples),
+            "client": measure(client.get_controller_list, samples),
+        },
+    }
+
+def bench_snapshot(stub, client, samples, sizes=SNAPSHOT_SIZES):
+    """Full snapshot (controllers + virtual 400-408) versus controller count."""
+    results = {}
+    for size in sizes:
+        controllers = {f"Controller{i:04d}": (0.0, 1.0) for i in range(size)}
+        change_loco(stub, controllers, values={i: i / size for i in range(size)})
+        client.read_layout()
+        loop_samples = max(samples * 10 // size, 50)
+        results[str(size)] = {
+            "client_read_snapshot": measure(client.read_snapshot, loop_samples, warmup=10),
+            "module_wrapper_loop": measure(
+                lambda: [RailDriverData.get_controller_value(stub, control_id, 0)
+                         for control_id in client.layout.ids],
+                max(loop_samples // 10, 20), warmup=2),
+        }
+    change_loco(stub)
+    client.read_layout()
+    return results
+
+def bench_name_resolution(stub, client, samples):
+    """
+    get_controller_id_by_name() of the set_variables scripts: controller list + ControllerResolver.
+    (The scripts themselves can't be imported, they start their keyboard loop at import.)
+    """
+    targets = {"Wipers": None, "EmergencyBrake": None, "Horn": None, "SimpleChangeDirection": None,
+               "Throttle": None, "TrainBrake": None}
+    controllers = client.get_controller_list()
+    resolver = ControllerResolver(controllers)
+    big_list = [f"Controller{i:04d}" for i in range(1000)] + list(DEFAULT_CONTROLLERS)
+    return {
+        "get_controller_id_by_name": measure(
+            lambda: ControllerResolver(RailDriverData.get_controller_list(stub)).resolve_ids(targets),
+            samples // 10),
+        "resolve_ids_prebuilt": measure(lambda: resolver.resolve_ids(targets), samples // 10),
+        "build_resolver_1000": measure(lambda: ControllerResolver(big_list), max(samples // 1000, 20),
+                                       warmup=2),
+    }
+
+def bench_addressing(stub, client, samples):
+    """
+    Reading a controller by name: ControllerNames.get() (names compiled to IDs) and getter(),
+    against a plain ID call.
+    """
+    names = ControllerNames(client).compile()
+    return {
+        "names_get": measure(lambda: names.get("SpeedometerMPH"), samples),
+        "getter": measure(names.getter("SpeedometerMPH"), samples),
+        "plain_id": measure(lambda: client.GetControllerValue(8, 0), samples),
+    }
+
+def bench_loop_iteration(stub, client, samples):
+    """
+    One iteration of the old set_variables_2.py main loop without keyboard and sleeps: keepalive,
+    a state-aware toggle (get, set, get + print) and a direction set (set, get + print), and the
+    same presses handled by KeyBindings.
+    """
+    controls = ControllerResolver(client.get_controller_list()).resolve_ids(
+        {"Wipers": None, "SimpleChangeDirection": None})
+    wipers, direction = controls["Wipers"], controls["SimpleChangeDirection"]
+    get_value = RailDriverData.get_controller_value
+    set_value = RailDriverData.set_controller_value
+
+    def module_iteration():
+        RailDriverData.set_rail_driver_connected(stub, True)
+        current_value = get_value(stub, wipers)
+        new_value = 1.0 if current_value < 0.5 else 0.0
+        set_value(stub, wipers, new_value)
+        print(f"Wipers: {'ON' if new_value > 0.5 else 'OFF'} ({new_value:.2f}), "
+              f"Current Value: {get_value(stub, wipers):.2f}")
+        set_value(stub, direction, -1.0)
+        print(f"SimpleChangeDirection: Set to {-1.0:.1f}, Active Value: {get_value(stub, direction):.1f}")
+
+    def client_iteration():
+        client.SetRailDriverConnected(True)
+        current_value = client.GetControllerValue(wipers, 0)
+        new_value = 1.0 if current_value < 0.5 else 0.0
+        client.SetControllerValue(wipers, new_value)
+        print(f"Wipers: {'ON' if new_value > 0.5 else 'OFF'} ({new_value:.2f}), "
+              f"Current Value: {client.GetControllerValue(wipers, 0):.2f}")
+        client.SetControllerValue(direction, -1.0)
+        print(f"SimpleChangeDirection: Set to {-1.0:.1f}, Active Value: "
+              f"{client.GetControllerValue(direction, 0):.1f}")
+
+    # the same two writes through the key binding engine (no debounce, so every press fires)
+    bindings = KeyBindings(client, [
+        {"key": "2", "action": "toggle", "controller": "Wipers", "debounce": 0.0},
+        {"key": "5", "action": "set", "controller": "SimpleChangeDirection", "value": -1.0, "debounce": 0.0},
+    ])
+
+    def bindings_iteration():
+        client.SetRailDriverConnected(True)
+        for key in ("2", "5"):
+            bindings.handle(key, True)
+            bindings.handle(key, False)
+
+    # prints go to a buffer: the terminal's speed is not what is measured here
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {
+            "module_wrapper": measure(module_iteration, samples // 10),
+            "client": measure(client_iteration, samples // 10),
+            "key_bindings": measure(bindings_iteration, samples // 10),
+        }
+
+def bench_live_view(stub, client, samples):
+    """
+    One live view frame (snapshot + diff render) with nothing changed, with one value changed and
+    drawn from scratch, against reprinting every controller like wipers_lights.py's old loop did
+    (without the shell it spawned to clear the screen).
+    """
+    set_value = stub_controls(stub)["SetRailSimControllerValue"]
+    view = LiveView(client, stream=io.StringIO())
+    view.size = os.terminal_size((100, 40))
+    view.render(client.read_snapshot())
+    values = iter(range(10 ** 9))
+
+    def changed_frame():
+        set_value(8, next(values) % 125)
+        view.render(client.read_snapshot())
+
+    def full_frame():
+        view.invalidate()
+        view.render(client.read_snapshot())
+
+    def reprint():
+        snapshot = client.read_snapshot()
+        for position, name in enumerate(snapshot.layout.names):
+            print(f"{snapshot.layout.ids[position]:>4} {name:<32} {snapshot.values[position]:12.3f}")
+
+    unchanged = measure(lambda: view.render(client.read_snapshot()), samples // 10)
+    changed = measure(changed_frame, samples // 10)
+    full = measure(full_frame, samples // 10)
+    with contextlib.redirect_stdout(io.StringIO()):
+        reprinted = measure(reprint, samples // 10)
+    return {"unchanged_frame": unchanged, "one_change": changed, "full_redraw": full, "reprint_all": reprinted}
+
+def bench_instrumentation(stub, samples):
+    """GetControllerValue on a client with and without Instruments attached."""
+    client = RailDriverClient(stub)
+    results = {"detached": measure(lambda: client.GetControllerValue(3, 0), samples)}
+    Instruments().attach(client)
+    results["attached"] = measure(lambda: client.GetControllerValue(3, 0), samples)
+    return results
+
+def bench_classification(stub, client, samples, rows=1000):
+    """
+    Classify + normalize every controller of a 500-controller frame: the per-controller Python loop
+    of RailDriverData.py versus ControllerArrays, and ControllerArrays over a (rows, N) matrix.
+    Skipped without NumPy.
+    """
+    if np is None:
+        return {}
+    size = 500
+    controllers = {f"Controller{i:04d}": ((0.0, 1.0) if i % 2 else (-1.0, 1.0)) for i in range(size)}
+    change_loco(stub, controllers, values={i: i / size for i in range(size)})
+    snapshot = client.read_snapshot()
+    layout = snapshot.layout
+
+    def python_loop():
+        result = []
+        for value, minimum, maximum in zip(snapshot.values, layout.mins, layout.maxs):
+            if minimum == 0.0 and maximum == 1.0:
+                result.append(value > 0.5)
+            elif maximum > minimum:
+                result.append((value - minimum) / (maximum - minimum))
+            else:
+                result.append(None)
+        return result
+
+    arrays = ControllerArrays.from_layout(layout)
+    frame = as_array(snapshot)
+    matrix = np.tile(frame, (rows, 1))
+    loop_samples = max(samples // 20, 50)
+    results = {
+        "python_loop_frame": measure(python_loop, loop_samples, warmup=10),
+        "numpy_frame": measure(lambda: arrays.classify(frame), loop_samples, warmup=10),
+        f"numpy_matrix_{rows}_rows": measure(lambda: arrays.classify(matrix), max(loop_samples // 10, 20), warmup=2),
+    }
+    change_loco(stub)
+    client.read_layout()
+    return results
+
+def bench_startup(samples):
+    """
+    Start-up of the command line against the stub: the bare interpreter, importing the package,
+    and python -m raildriver dump to its first byte of output and to the end.
+    """
+    env = dict(os.environ, RAILDRIVER_DLL=build_stub_dll())
+    runs = max(samples // 1000, 5)
+    dump = [sys.executable, "-m", "raildriver", "dump"]
+    return {
+        "interpreter": measure_process([sys.executable, "-c", "pass"], runs, env),
+        "import_package": measure_process([sys.executable, "-c", "import raildriver"], runs, env),
+        "dump_first_byte": measure_process(dump, runs, env, first_byte=True),
+        "dump": measure_process(dump, runs, env),
+    }
+
+def bench_logging(samples):
+    """A DEBUG log() call in a hot path: disabled (lazy %-args vs. a pre-built f-string) and enabled."""
+    log = raildriver_log.log
+    control_id, mode, value = 3, 0, 0.123456
+    level = raildriver_log.DEBUG_LEVEL
+    raildriver_log.set_level(1)
+    results = {
+        "disabled_lazy": measure(
+            lambda: log(3, "GetControllerValue(control_id=%s, mode=%s) returned: %s", control_id, mode, value),
+            samples),
+        "disabled_fstring": measure(
+            lambda: log(3, f"GetControllerValue(control_id={control_id}, mode={mode}) returned: {value}"),
+            samples),
+    }
+    raildriver_log.set_level(3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        results["enabled_queued"] = measure(
+            lambda: log(3, "GetControllerValue(control_id=%s, mode=%s) returned: %s", control_id, mode, value),
+            samples)
+        raildriver_log.flush()
+    raildriver_log.set_level(level)
+    return results
+
+# ===============================
+# Reporting
+# ===============================
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "commit": commit,
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+def flatten(results, prefix=""):
+    """{"a": {"b": {...metrics}}} -> {"a.b": {...metrics}} for the leaves that hold measurements."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and "p50_us" in value:
+            flat[name] = value
+        elif isinstance(value, dict):
+            flat.update(flatten(value, name))
+    return flat
+
+def print_summary(results, file=None):
+    for name, metrics in flatten(results["benchmarks"]).items():
+        print(f"{name:<70} {metrics['calls_per_s']:>12,} /s  p50 {metrics['p50_us']:>9.2f} us"
+              f"  p99 {metrics['p99_us']:>9.2f} us", file=file)
+
+def compare(results, baseline, tolerance, file=None):
+    """Prints (to file, default stdout) metrics whose p50 got more than tolerance (0.1 = 10%) slower. Returns their count."""
+    old = flatten(baseline["benchmarks"])
+    regressions = 0
+    for name, metrics in flatten(results["benchmarks"]).items():
+        if name not in old or not old[name]["p50_us"]:
+            continue
+        ratio = metrics["p50_us"] / old[name]["p50_us"]
+        if ratio > 1 + tolerance:
+            regressions += 1
+            print(f"[REGRESSION] {name}: p50 {old[name]['p50_us']:.2f} -> {metrics['p50_us']:.2f} us "
+                  f"({ratio:.2f}x)", file=file)
+    print(f"{regressions} regression(s) against {baseline['environment'].get('commit') or 'baseline'}", file=file)
+    return regressions
+
+# =============
+# Main Script
+# =============
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks the RailDriver access layer against the stub DLL.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write ('-' for stdout)")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown (default 0.10)")
+    parser.add_argument("--samples", type=int, default=20_000, help="timed calls per benchmark")
+    parser.add_argument("--quick", action="store_true", help="fewer samples, for a smoke test")
+    args = parser.parse_args(argv)
+    samples = 2_000 if args.quick else args.samples
+
+    stub = load_stub_dll()
+    client = RailDriverClient(stub)
+    client.read_layout()
+    results = {
+        "format_version": FORMAT_VERSION,
+        "environment": environment(),
+        "clock_overhead_ns": clock_overhead_ns(),
+        "benchmarks": {
+            "calls": bench_calls(stub, client, samples),
+            "snapshot": bench_snapshot(stub, client, samples),
+            "name_resolution": bench_name_resolution(stub, client, samples),
+            "addressing": bench_addressing(stub, client, samples),
+            "loop_iteration": bench_loop_iteration(stub, client, samples),
+            "live_view": bench_live_view(stub, client, samples),
+            "logging": bench_logging(samples),
+            "instrumentation": bench_instrumentation(stub, samples),
+            "classification": bench_classification(stub, client, samples),
+            "startup": bench_startup(samples),
+        },
+    }
+    report = sys.stderr if args.output == "-" else sys.stdout  # with --output -, stdout is the JSON only
+    print_summary(results, report)
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output}", file=report)
+    status = 0
+    first_byte_ms = results["benchmarks"]["startup"]["dump_first_byte"]["p50_us"] / 1000
+    if first_byte_ms > DUMP_FIRST_BYTE_BUDGET_MS:
+        print(f"python -m raildriver dump took {first_byte_ms:.0f} ms to its first output, "
+              f"budget {DUMP_FIRST_BYTE_BUDGET_MS} ms", file=report)
+        status = 1
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance, report):
+            status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# Change-driven events instead of busy-polling full values.
+#   Yields (controller, old, new, timestamp) only when a controller moved by more than its deadband.
+#   Uses the DLL's ControllerChanged/ClearChanged exports when available, so only the flagged
+#   controllers are read; otherwise (or if the DLL turns out to miss changes) it diffs values.
+
+import sys
+import time
+from array import array
+from collections import namedtuple
+from itertools import repeat
+
+from RailDriverData import RailDriverClient, log
+
+ChangeEvent = namedtuple("ChangeEvent", ["controller_id", "name", "old", "new", "timestamp"])
+
+class ChangeStream:
+    """
+    Change events for the controllers of a ControllerLayout (default: the client's, read if needed).
+
+    mode: "dll" uses ControllerChanged/ClearChanged, "diff" compares values, "auto" picks "dll" if
+    both exports exist. In "dll" mode every verify_every polls a full diff is done as well (0: never);
+    if it finds changes the DLL didn't flag, the stream switches to "diff" for good.
+    deadband applies to all controllers, deadbands ({name or id: band}) overrides it per controller.
+    Virtual controllers (400 - 408) are always diffed.
+    """
+
+    def __init__(self, client, layout=None, controllers=None, deadband=0.0, deadbands=None,
+                 mode="auto", verify_every=50):
+        self.client = client
+        layout = layout or client.layout or client.read_layout()
+        if controllers is None:
+            positions = range(len(layout))
+        else:
+            by_id = {controller_id: position for position, controller_id in enumerate(layout.ids)}
+            positions = [layout.index[c] if isinstance(c, str) else by_id[c] for c in controllers]
+        self.ids = array('i', (layout.ids[p] for p in positions))
+        self.names = [layout.names[p] for p in positions]
+        deadbands = deadbands or {}
+        self.deadbands = array('f', (deadbands.get(name, deadbands.get(cid, deadband))
+                                     for cid, name in zip(self.ids, self.names)))
+        if mode == "auto":
+            mode = "dll" if client.ControllerChanged and client.ClearChanged else "diff"
+        self.mode = mode
+        if verify_every < 0:
+            raise ValueError(f"verify_every must be 0 (never) or more, not {verify_every}")
+        self.verify_every = verify_every
+        self.callbacks = []
+        self.last = None  # last emitted value per controller
+        self.polls = 0
+
+    def subscribe(self, callback):
+        """callback(event) is called for every event of every later poll()."""
+        self.callbacks.append(callback)
+        return callback
+
+    def reset(self):
+        """Forgets the baseline; the next poll() reads everything and emits nothing."""
+        self.last = None
+
+    def poll(self):
+        """Reads what changed since the last poll and returns the events (also passed to callbacks)."""
+        client = self.client
+        now = time.time()
+        if self.last is None:
+            if self.mode == "dll":
+                client.ClearChanged()  # before the baseline: a change in between is flagged, not lost
+            self.last = array('f', map(client.GetControllerValue, self.ids, repeat(0)))
+            return []
+        self.polls += 1
+        if self.mode == "dll" and (not self.verify_every or self.polls % self.verify_every):
+            events = self._poll_flagged(now)
+        else:
+            events = self._poll_diff(now)
+        for callback in self.callbacks:
+            for event in events:
+                callback(event)
+        return events
+
+    def events(self, interval=0.05, stop_event=None):
+        """Generator of events, polling every interval seconds until stop_event (threading.Event) is set."""
+        deadline = time.perf_counter()
+        while stop_event is None or not stop_event.is_set():
+            yield from self.poll()
+            deadline += interval
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                if stop_event is not None:
+                    stop_event.wait(remaining)
+                else:
+                    time.sleep(remaining)
+            else:
+                deadline = time.perf_counter()
+
+    def _emit(self, events, index, new, now):
+        old = self.last[index]
+        if abs(new - old) > self.deadbands[index]:
+            events.append(ChangeEvent(self.ids[index], self.names[index], old, new, now))
+            self.last[index] = new
+
+    def _flagged(self):
+        """Indexes of the flagged (and the virtual) controllers. Clears the flags: a change from
+        here on is flagged for the next poll, even if the value read now already has it."""
+        changed = self.client.ControllerChanged
+        flagged = [index for index, controller_id in enumerate(self.ids)
+                   if controller_id >= 400 or changed(controller_id)]
+        self.client.ClearChanged()
+        return flagged
+
+    def _poll_flagged(self, now):
+        get = self.client.GetControllerValue
+        events = []
+        ids = self.ids
+        for index in self._flagged():
+            self._emit(events, index, get(ids[index], 0), now)
+        return events
+
+    def _poll_diff(self, now):
+        flagged = {self.ids[index] for index in self._flagged()} if self.mode == "dll" else None
+        values = array('f', map(self.client.GetControllerValue, self.ids, repeat(0)))
+        events = []
+        last = self.last
+        for index, new in enumerate(values):
+            if new != last[index]:
+                self._emit(events, index, new, now)
+        if flagged is not None:
+            changed = self.client.ControllerChanged
+            # a change after the flags were taken is flagged again since the clear
+            missed = [e for e in events if e.controller_id not in flagged and not changed(e.controller_id)]
+            if missed:
+                log(2, f"ControllerChanged missed {len(missed)} change(s), falling back to value diffing.")
+                self.mode = "diff"
+        return events
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python change_stream.py [dll_path] : prints every change until Ctrl+C
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    stream = ChangeStream(client, deadband=0.01)
+    print(f"Watching {len(stream.ids)} controllers ({stream.mode} mode). Ctrl+C to stop.")
+    try:
+        for event in stream.events(interval=0.05):
+            print(f"{time.strftime('%H:%M:%S')} [{event.controller_id:03d}] {event.name}: {event.old:.2f} -> {event.new:.2f}")
+    except KeyboardInterrupt:
+        print("\nExiting loop.")
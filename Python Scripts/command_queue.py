@@ -0,0 +1,140 @@
+# Write coalescing in front of SetControllerValue.
+#   Only the latest pending value per controller is kept, writes equal to the last confirmed value
+#   are dropped, and the queue is flushed at most max_rate times per second. A throttle ramp of
+#   hundreds of set() calls turns into one write per controller per flush.
+
+import ctypes
+import sys
+import threading
+import time
+
+from RailDriverData import RailDriverClient
+
+def as_float32(value):
+    """The value as the DLL stores it, so 0.1 set and 0.1 read back compare equal."""
+    return ctypes.c_float(value).value
+
+class CommandQueue:
+    """
+    Pending writes, one per controller. set() never calls the DLL; flush() (or the background
+    thread started with start()) does. Safe to call set() from keyboard hooks or other threads.
+
+    "Confirmed" values are the ones last written by the queue or passed to confirm(), e.g. from a
+    snapshot. If the sim can move a controller by itself, confirm() it now and then, otherwise a
+    set() back to the old value would be dropped as redundant.
+    """
+
+    def __init__(self, client, max_rate=20.0):
+        self.client = client
+        self.min_interval = 1.0 / max_rate
+        self.pending = {}
+        self.confirmed = {}
+        self.writes = 0              # SetControllerValue calls made
+        self.dropped_redundant = 0   # set() equal to the confirmed value
+        self.dropped_coalesced = 0   # pending value replaced by a newer set() before a flush
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def depth(self):
+        """Number of controllers with a pending write."""
+        return len(self.pending)
+
+    def set(self, control_id, value):
+        """Queues a write. Returns False if it was dropped as redundant."""
+        value = as_float32(value)
+        with self._lock:
+            if self.confirmed.get(control_id) == value:
+                if self.pending.pop(control_id, None) is not None:
+                    self.dropped_coalesced += 1  # back to the confirmed value: the pending write goes
+                else:
+                    self.dropped_redundant += 1
+                return False
+            if control_id in self.pending:
+                self.dropped_coalesced += 1
+            self.pending[control_id] = value
+            return True
+
+    def confirm(self, control_id, value):
+        """Records a value read from the DLL as the controller's current one."""
+        with self._lock:
+            self.confirmed[control_id] = as_float32(value)
+
+    def flush(self, force=False):
+        """
+        Writes everything pending, unless the last flush was less than 1/max_rate ago
+        (force=True skips that check). Returns the number of writes made.
+        """
+        now = time.perf_counter()
+        if not force and now - self._last_flush < self.min_interval:
+            return 0
+        with self._lock:
+            if not self.pending:
+                return 0
+            pending, self.pending = self.pending, {}
+        set_value = self.client.SetControllerValue
+        for control_id, value in pending.items():
+            set_value(control_id, value)
+        with self._lock:
+            self.confirmed.update(pending)
+        self._last_flush = now
+        self.writes += len(pending)
+        return len(pending)
+
+    def stats(self):
+        return {
+            "depth": self.depth,
+            "writes": self.writes,
+            "dropped_redundant": self.dropped_redundant,
+            "dropped_coalesced": self.dropped_coalesced,
+        }
+
+    def start(self):
+        """Flushes on a background thread at max_rate."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="RailDriverCommandQueue", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background thread after a last flush."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.flush(force=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        deadline = time.perf_counter()
+        while not self._stop.is_set():
+            self.flush(force=True)
+            deadline += self.min_interval
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                self._stop.wait(remaining)
+            else:
+                deadline = time.perf_counter()
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python command_queue.py [dll_path] : ramps controller 0 from 0 to 1 in 1000 steps over 1 s
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    with CommandQueue(client, max_rate=20) as queue:
+        for step in range(1001):
+            queue.set(0, step / 1000)
+            time.sleep(0.001)
+    print(f"1001 set() calls -> {queue.stats()}, final value {client.GetControllerValue(0, 0):.3f}")
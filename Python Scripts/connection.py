@@ -0,0 +1,191 @@
+# Connection supervision instead of fixed sleeps.
+#   wait_ready() probes GetRailSimConnected / IsLocoSet / GetControllerList with exponential
+#   backoff and jitter, so startup takes as long as the DLL and the sim need, not a fixed second.
+#   keepalive() re-asserts SetRailDriverConnected(True) only every keepalive_interval, and state
+#   changes (sim connected, loco loaded, lost...) are passed to subscribers as ConnectionEvents.
+
+import sys
+import threading
+import time
+from collections import namedtuple
+
+from RailDriverData import RailDriverClient, backoff_delays, log
+
+# ===============================
+# Global Configuration
+# ===============================
+# Connection states, in the order they are reached
+UNKNOWN = "unknown"                    # not probed yet
+DISCONNECTED = "disconnected"          # GetRailSimConnected() is False: sim not running / not in a session
+WAITING_FOR_LOCO = "waiting_for_loco"  # sim connected, but no loco or no controller list yet
+READY = "ready"                        # loco and controller list available
+
+ConnectionEvent = namedtuple("ConnectionEvent", ["old", "new", "timestamp", "reason"])
+
+# ===============================
+# Supervisor
+# ===============================
+class ConnectionSupervisor:
+    """
+    Tracks whether the DLL can deliver data and keeps the RailDriver connection asserted.
+
+    Call tick() from the main loop (cheap: it only touches the DLL when an interval is due),
+    or start() a background thread that does it. require_controllers=True also waits for a
+    non-empty GetControllerList, which is what the scripts need before anything else.
+    """
+
+    def __init__(self, client, keepalive_interval=1.0, check_interval=0.5, require_controllers=True,
+                 initial_delay=0.01, max_delay=0.25, backoff=2.0, jitter=0.5, sleep=time.sleep):
+        self.client = client
+        self.keepalive_interval = keepalive_interval
+        self.check_interval = check_interval
+        self.require_controllers = require_controllers
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.sleep = sleep
+        self.state = UNKNOWN
+        self.callbacks = []
+        self.probes = 0
+        self.keepalives = 0
+        self.transitions = 0
+        self._last_keepalive = None
+        self._last_check = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def subscribe(self, callback):
+        """callback(event) is called on every state change."""
+        self.callbacks.append(callback)
+        return callback
+
+    def keepalive(self, force=False):
+        """SetRailDriverConnected(True), if keepalive_interval has passed. Returns True if it was called."""
+        now = time.perf_counter()
+        if not force and self._last_keepalive is not None \
+                and now - self._last_keepalive < self.keepalive_interval:
+            return False
+        self._last_keepalive = now
+        set_connected = self.client.SetRailDriverConnected
+        if set_connected is not None:
+            try:
+                set_connected(True)
+            except Exception as e:
+                log(1, f"SetRailDriverConnected failed: {e}")
+                return False
+        self.keepalives += 1
+        return True
+
+    def probe(self):
+        """Asks the DLL for the current state (a few cheap calls) and returns it."""
+        self.probes += 1
+        self._last_check = time.perf_counter()
+        client = self.client
+        try:
+            if client.GetRailSimConnected is not None and not client.GetRailSimConnected():
+                return self._set_state(DISCONNECTED, "GetRailSimConnected() is False")
+            if client.IsLocoSet is not None and not client.IsLocoSet():
+                return self._set_state(WAITING_FOR_LOCO, "IsLocoSet() is False")
+            if self.require_controllers and not client.GetControllerList():
+                return self._set_state(WAITING_FOR_LOCO, "GetControllerList() returned nothing")
+        except Exception as e:
+            return self._set_state(DISCONNECTED, f"probe failed: {e}")
+        return self._set_state(READY, "loco and controller list available")
+
+    def wait_ready(self, timeout=10.0):
+        """
+        Probes with exponential backoff until READY or timeout (None: forever) seconds have passed.
+        Returns True if ready.
+        """
+        self.keepalive(force=True)
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        delays = backoff_delays(self.initial_delay, self.max_delay, self.backoff, self.jitter)
+        while self.probe() != READY:
+            delay = next(delays)
+            if deadline is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    log(1, f"RailDriver not ready after {timeout} s: {self.state}")
+                    return False
+                delay = min(delay, remaining)
+            self.sleep(delay)
+            self.keepalive()
+        return True
+
+    def tick(self):
+        """Keepalive and state check, each only when its interval is due. Returns the state."""
+        self.keepalive()
+        if self._last_check is None or time.perf_counter() - self._last_check >= self.check_interval:
+            self.probe()
+        return self.state
+
+    def start(self):
+        """Runs tick() on a background thread (callbacks are then called from that thread)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="RailDriverConnection", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "probes": self.probes,
+            "keepalives": self.keepalives,
+            "transitions": self.transitions,
+        }
+
+    def _set_state(self, state, reason):
+        old = self.state
+        if state != old:
+            self.state = state
+            self.transitions += 1
+            event = ConnectionEvent(old, state, time.time(), reason)
+            log(2, "Connection %s -> %s (%s)", old, state, reason)
+            for callback in self.callbacks:
+                callback(event)
+        return state
+
+    def _run(self):
+        interval = min(self.keepalive_interval, self.check_interval)
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(interval)
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python connection.py [dll_path] : waits for the sim, then reports state changes until Ctrl+C
+    started = time.perf_counter()
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    supervisor = ConnectionSupervisor(client)
+    supervisor.subscribe(lambda event: print(f"[{time.strftime('%H:%M:%S')}] {event.old} -> {event.new}: {event.reason}"))
+    supervisor.wait_ready(timeout=None)
+    print(f"Ready after {time.perf_counter() - started:.3f} s ({supervisor.probes} probe(s))")
+    try:
+        with supervisor:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        print(supervisor.stats())
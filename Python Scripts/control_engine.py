@@ -0,0 +1,357 @@
+# Fixed-tick closed-loop control: registered control loops (PID, bang-bang, ramps) run at a
+# deterministic rate on one snapshot per tick, and only outputs that changed are written.
+#   engine = ControlEngine(client, rate=20)
+#   cruise = engine.add(PID("SpeedometerMPH", "Regulator", target=45, kp=0.08, ki=0.01,
+#                           negative_output="TrainBrakeControl"))
+#   engine.run(seconds=60)          # or start()/stop() on a thread; cruise.target = 30 at any time
+#   print(engine.stats())           # compute time per tick, deadline misses, writes
+# Names are resolved like get_controller_id_by_name (ControllerResolver: exact, alias, prefix...)
+# when the loco's layout is first seen. Ticks are on absolute deadlines: a late tick doesn't move
+# the following ones, and ticks missed completely are counted and skipped, not caught up.
+# clock/sleep can be replaced, e.g. by stub_dll.StubPhysics's virtual time for tests
+# (python control_engine.py --stub checks that the cruise control settles that way).
+
+import math
+import sys
+import threading
+import time
+
+from RailDriverData import RailDriverClient, log
+from command_queue import as_float32
+from controller_resolver import ControllerResolver
+from instrumentation import LatencyHistogram
+
+# ===============================
+# Control loops
+# ===============================
+class ControlLoop:
+    """
+    Base class. inputs/outputs are controller names; compute(read, dt) gets read(name) -> value from
+    this tick's snapshot and returns {output name: value}. enabled = False pauses a loop.
+    """
+    inputs = ()
+    outputs = ()
+
+    def __init__(self):
+        self.enabled = True
+
+    def reset(self):
+        """Forgets internal state (integral, last error...), e.g. after a loco change."""
+
+    def compute(self, read, dt):
+        raise NotImplementedError
+
+class PID(ControlLoop):
+    """
+    PID on input toward target, output clamped to [minimum, maximum]. The integral only grows while
+    the output isn't saturated (no windup), and the derivative is taken on the input, so changing
+    the target doesn't kick the output. With negative_output, negative values go there instead
+    (as positive values), e.g. regulator for positive and train brake for negative outputs.
+    """
+
+    def __init__(self, input, output, target, kp, ki=0.0, kd=0.0, minimum=-1.0, maximum=1.0,
+                 negative_output=None):
+        super().__init__()
+        self.input = input
+        self.output = output
+        self.negative_output = negative_output
+        self.inputs = (input,)
+        self.outputs = (output,) if negative_output is None else (output, negative_output)
+        self.target = target
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.minimum = minimum
+        self.maximum = maximum
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.last_input = None
+        self.value = 0.0
+
+    def compute(self, read, dt):
+        measured = read(self.input)
+        error = self.target - measured
+        derivative = 0.0 if self.last_input is None or dt <= 0 else -(measured - self.last_input) / dt
+        self.last_input = measured
+        unclamped = self.kp * error + self.ki * (self.integral + error * dt) + self.kd * derivative
+        value = min(max(unclamped, self.minimum), self.maximum)
+        # integrate unless saturated with the error pushing further into the limit
+        if value == unclamped or (unclamped > self.maximum) != (error > 0):
+            self.integral += error * dt
+        self.value = value
+        if self.negative_output is None:
+            return {self.output: value}
+        return {self.output: max(value, 0.0), self.negative_output: max(-value, 0.0)}
+
+class BangBang(ControlLoop):
+    """
+    on_value while input is below target - hysteresis, off_value once it is above target + hysteresis,
+    unchanged in between. above=True switches the other way round (on when too high).
+    """
+
+    def __init__(self, input, output, target, hysteresis=0.0, on_value=1.0, off_value=0.0, above=False):
+        super().__init__()
+        self.input = input
+        self.output = output
+        self.inputs = (input,)
+        self.outputs = (output,)
+        self.target = target
+        self.hysteresis = hysteresis
+        self.on_value = on_value
+        self.off_value = off_value
+        self.above = above
+        self.reset()
+
+    def reset(self):
+        self.on = False
+
+    def compute(self, read, dt):
+        measured = read(self.input)
+        if self.above:
+            measured, target = -measured, -self.target
+        else:
+            target = self.target
+        if measured < target - self.hysteresis:
+            self.on = True
+        elif measured > target + self.hysteresis:
+            self.on = False
+        return {self.output: self.on_value if self.on else self.off_value}
+
+class Ramp(ControlLoop):
+    """Moves output toward target by at most rate per second, starting from its current value."""
+
+    def __init__(self, output, target, rate):
+        super().__init__()
+        self.output = output
+        self.inputs = (output,)
+        self.outputs = (output,)
+        self.target = target
+        self.rate = rate
+        self.reset()
+
+    def reset(self):
+        self.value = None
+
+    @property
+    def done(self):
+        return self.value is not None and self.value == self.target
+
+    def compute(self, read, dt):
+        current = read(self.output) if self.value is None else self.value
+        limit = self.rate * dt
+        self.value = current + min(max(self.target - current, -limit), limit)
+        return {self.output: self.value}
+
+# ===============================
+# Engine
+# ===============================
+class ControlEngine:
+    """
+    Runs control loops at rate Hz against a RailDriverClient: one read_snapshot() per tick,
+    then every enabled loop, then SetControllerValue for each output that changed since it was
+    last written (compared as float32). Loops run in the order they were added; if two write the
+    same controller, the later one wins.
+    """
+
+    def __init__(self, client, rate=20.0, clock=time.perf_counter, sleep=time.sleep):
+        self.client = client
+        self.period = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self.loops = []
+        self.layout = None
+        self.snapshot = None
+        self.ticks = 0
+        self.late_ticks = 0        # ticks that ended after the next deadline
+        self.missed_deadlines = 0  # deadlines skipped entirely
+        self.writes = 0
+        self.unchanged = 0
+        self.compute_time = LatencyHistogram()  # ns in the loops' compute()
+        self.tick_time = LatencyHistogram()     # ns for the whole tick, DLL calls included
+        self.unresolved = []
+        self._positions = {}
+        self._ids = {}
+        self._written = {}
+        self._last_tick = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, loop):
+        """Registers a control loop, returns it."""
+        self.loops.append(loop)
+        self.layout = None  # resolve its names on the next tick
+        return loop
+
+    def remove(self, loop):
+        self.loops.remove(loop)
+
+    def _bind(self, layout):
+        """Resolves every loop's controller names for this layout."""
+        resolver = ControllerResolver(layout.controllers)
+        names = {name for loop in self.loops for name in (*loop.inputs, *loop.outputs)}
+        self._positions = {}
+        self._ids = {}
+        self.unresolved = []
+        for name in sorted(names):
+            if name in layout.index:  # virtual controllers too
+                position = layout.index[name]
+            else:
+                position = resolver.resolve(name).controller_id  # regular controllers: id == position
+            if position is None:
+                self.unresolved.append(name)
+                continue
+            self._positions[name] = position
+            self._ids[name] = layout.ids[position]
+        if self.unresolved:
+            log(1, f"Control engine: controllers not found: {', '.join(self.unresolved)}")
+        if self.layout is not None and self.layout is not layout:
+            for loop in self.loops:
+                loop.reset()
+            self._written = {}
+        self.layout = layout
+
+    def tick(self):
+        """One control step. Returns the number of controllers written."""
+        started = time.perf_counter_ns()
+        now = self.clock()
+        dt = self.period if self._last_tick is None else now - self._last_tick
+        self._last_tick = now
+        snapshot = self.snapshot = self.client.read_snapshot()
+        if snapshot.layout is not self.layout:
+            self._bind(snapshot.layout)
+        values = snapshot.values
+        positions = self._positions
+        outputs = {}
+        compute_started = time.perf_counter_ns()
+        for loop in self.loops:
+            if not loop.enabled or any(name not in positions for name in (*loop.inputs, *loop.outputs)):
+                continue
+            outputs.update(loop.compute(lambda name: values[positions[name]], dt))
+        self.compute_time.record(time.perf_counter_ns() - compute_started)
+        written = 0
+        for name, value in outputs.items():
+            if value is None or math.isnan(value):
+                continue
+            control_id = self._ids[name]
+            value = as_float32(value)
+            if self._written.get(control_id) == value:
+                self.unchanged += 1
+                continue
+            self.client.SetControllerValue(control_id, value)
+            self._written[control_id] = value
+            written += 1
+        self.writes += written
+        self.ticks += 1
+        self.tick_time.record(time.perf_counter_ns() - started)
+        return written
+
+    def run(self, seconds=None, ticks=None):
+        """Ticks on absolute deadlines until stop(), for seconds (engine clock) or for ticks ticks."""
+        clock = self.clock
+        period = self.period
+        self._stop.clear()
+        deadline = started = clock()
+        count = 0
+        while not self._stop.is_set():
+            if (seconds is not None and deadline - started >= seconds) or (ticks is not None and count >= ticks):
+                break
+            self.tick()
+            count += 1
+            deadline += period
+            remaining = deadline - clock()
+            if remaining > 0:
+                self.sleep(remaining)
+            else:
+                self.late_ticks += 1
+                skipped = int(-remaining // period)
+                self.missed_deadlines += skipped
+                deadline += skipped * period
+
+    def start(self):
+        """Runs run() on a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.run, name="RailDriverControl", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        """Ticks, late and missed deadlines, writes vs. unchanged outputs, compute and tick time in microseconds."""
+        def summary(histogram):
+            return {
+                "mean": histogram.mean / 1000,
+                "p50": histogram.percentile(0.5) / 1000,
+                "p99": histogram.percentile(0.99) / 1000,
+                "max": histogram.maximum / 1000,
+            }
+        return {
+            "rate_hz": 1.0 / self.period,
+            "ticks": self.ticks,
+            "late_ticks": self.late_ticks,
+            "missed_deadlines": self.missed_deadlines,
+            "writes": self.writes,
+            "unchanged_outputs": self.unchanged,
+            "compute_us": summary(self.compute_time),
+            "tick_us": summary(self.tick_time),
+        }
+
+# =============
+# Main Script
+# =============
+def settle_on_stub(target, seconds=360.0, tolerance=0.5):
+    """
+    Runs the cruise control PID against stub_dll.StubPhysics in virtual time and prints the speed
+    every 30 simulated seconds. Returns True if the speed has settled within tolerance mph of target.
+    """
+    from stub_dll import StubPhysics, load_stub_dll
+    stub = load_stub_dll()
+    physics = StubPhysics(stub)
+    engine = ControlEngine(RailDriverClient(stub), rate=20, clock=physics.now, sleep=physics.sleep)
+    cruise = engine.add(PID("SpeedometerMPH", "Regulator", target, kp=0.08, ki=0.01,
+                            negative_output="TrainBrakeControl"))
+    speeds = []
+    while physics.time < seconds:
+        engine.run(seconds=30.0)
+        speeds.append(engine.snapshot["SpeedometerMPH"])
+        print(f"t={physics.time:5.0f} s  Speed: {speeds[-1]:6.2f} mph, output {cruise.value:+.2f}")
+    settled = all(abs(speed - target) <= tolerance for speed in speeds[-2:])
+    print(f"{'Settled' if settled else 'NOT settled'} at {speeds[-1]:.2f} mph (target {target:.0f} mph)")
+    return settled
+
+if __name__ == "__main__":
+    # python control_engine.py [dll_path] [target_mph] : cruise control until Ctrl+C
+    # python control_engine.py --stub [target_mph]     : against the stub DLL's physics, in virtual
+    #                                                    time; exit code 1 if the speed doesn't settle
+    if sys.argv[1:2] == ["--stub"]:
+        sys.exit(0 if settle_on_stub(float(sys.argv[2]) if len(sys.argv) > 2 else 45.0) else 1)
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    target = float(sys.argv[2]) if len(sys.argv) > 2 else 40.0
+    engine = ControlEngine(client, rate=20)
+    cruise = engine.add(PID("SpeedometerMPH", "Regulator", target, kp=0.08, ki=0.01,
+                            negative_output="TrainBrakeControl"))
+    print(f"Holding {target:.0f} mph, Ctrl+C to stop.")
+    try:
+        with engine:
+            while True:
+                time.sleep(1.0)
+                if engine.snapshot is not None and "SpeedometerMPH" in engine.snapshot.layout.index:
+                    print(f"Speed: {engine.snapshot['SpeedometerMPH']:6.2f} mph, output {cruise.value:+.2f}")
+    except KeyboardInterrupt:
+        pass
+    print(engine.stats())
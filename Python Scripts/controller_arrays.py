@@ -0,0 +1,235 @@
+# NumPy views of snapshots and recordings: classification, normalization, ON/OFF and speed units
+# for the whole controller vector at once, instead of one Python comparison per controller.
+#   arrays = ControllerArrays.from_layout(snapshot.layout)   # once per loco
+#   frame = as_array(snapshot)                                # zero-copy float32 view, shape (N,)
+#   arrays.normalized(frame), arrays.is_on(frame), arrays.speed(frame, "kph")
+#   timestamps, matrix = read_matrix(reader)                  # a recording as (T, N)
+#   arrays.normalized(matrix), arrays.is_on(matrix) ...       # the same calls, one row per sample
+# NumPy is optional for the other scripts; only this module needs it.
+
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from RailDriverData import RailDriverClient
+
+# ===============================
+# Global Configuration
+# ===============================
+# Controller kinds, as RailDriverData.py's printout tells them apart
+RANGE = 0     # any other min/max
+BOOLEAN = 1   # min 0, max 1: ON if the value is above the threshold
+VIRTUAL = 2   # no min/max (the virtual controllers 400-408)
+KIND_NAMES = {RANGE: "range", BOOLEAN: "boolean", VIRTUAL: "virtual"}
+BOOLEAN_THRESHOLD = 0.5
+
+# Metres per second per unit; the unit of a speedometer is the end of its name
+SPEED_UNITS = {"mph": 0.44704, "kph": 1 / 3.6, "kmh": 1 / 3.6, "mps": 1.0}
+SPEEDOMETER_PREFIX = "speedometer"
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("controller_arrays needs NumPy (pip install numpy).")
+
+def speed_unit(name):
+    """Unit of a speedometer controller ("SpeedometerMPH" -> "mph"), None if name isn't one."""
+    lower = name.lower()
+    if not lower.startswith(SPEEDOMETER_PREFIX):
+        return None
+    unit = lower[len(SPEEDOMETER_PREFIX):]
+    return unit if unit in SPEED_UNITS else None
+
+def as_array(values):
+    """
+    A Snapshot (or its array('f') values) as float32 ndarray, without copying.
+    The array shares memory with the snapshot, so don't keep it past the snapshot's lifetime.
+    """
+    _require_numpy()
+    values = getattr(values, "values", values)
+    return np.frombuffer(values, dtype=np.float32)
+
+def stack(snapshots):
+    """Snapshots of one layout as a (T, N) matrix."""
+    _require_numpy()
+    snapshots = list(snapshots)
+    if not snapshots:
+        return np.empty((0, 0), dtype=np.float32)
+    matrix = np.empty((len(snapshots), len(snapshots[0].values)), dtype=np.float32)
+    for row, snapshot in zip(matrix, snapshots):
+        row[:] = np.frombuffer(snapshot.values, dtype=np.float32)
+    return matrix
+
+def read_matrix(reader, columns=None):
+    """
+    A TelemetryReader recording as (timestamps (T,), values (T, N)), columns (names or positions)
+    in the given order, all of them by default. Copies each column once from the mapped file.
+    """
+    _require_numpy()
+    positions = range(len(reader.names)) if columns is None else \
+        [reader.index[column] if isinstance(column, str) else column for column in columns]
+    timestamps = np.frombuffer(reader.timestamps(), dtype=np.float64)
+    matrix = np.empty((len(reader), len(positions)), dtype=np.float32)
+    for index, position in enumerate(positions):
+        row = 0
+        for view in reader.column_views(position):
+            count = len(view)
+            matrix[row:row + count, index] = np.frombuffer(view, dtype=np.float32)
+            row += count
+    return timestamps, matrix
+
+# ===============================
+# Controller arrays
+# ===============================
+class ControllerArrays:
+    """
+    Per-controller constants of one layout as arrays, built once per loco. Every method takes
+    a single frame (N,) or a matrix (T, N) and works on all controllers (and rows) in one call.
+    """
+
+    def __init__(self, names, mins, maxs):
+        _require_numpy()
+        self.names = list(names)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        # None (JSON) and NaN both mean "no limits"
+        self.mins = np.array([np.nan if value is None else value for value in mins], dtype=np.float32)
+        self.maxs = np.array([np.nan if value is None else value for value in maxs], dtype=np.float32)
+        self.virtual = np.isnan(self.mins) | np.isnan(self.maxs)
+        self.boolean = (self.mins == 0.0) & (self.maxs == 1.0)
+        self.kinds = np.full(len(self.names), RANGE, dtype=np.int8)
+        self.kinds[self.boolean] = BOOLEAN
+        self.kinds[self.virtual] = VIRTUAL
+        span = self.maxs - self.mins
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # no usable span (virtual, or min == max): normalized values are NaN
+            self.scale = np.where(np.isfinite(span) & (span != 0), 1.0 / span, np.nan).astype(np.float32)
+        units = [speed_unit(name) for name in self.names]
+        self.speed_positions = np.array([position for position, unit in enumerate(units) if unit], dtype=np.intp)
+        self.speed_to_mps = np.array([SPEED_UNITS[unit] for unit in units if unit], dtype=np.float32)
+
+    @classmethod
+    def from_layout(cls, layout):
+        return cls(layout.names, layout.mins, layout.maxs)
+
+    @classmethod
+    def from_reader(cls, reader):
+        """For a TelemetryReader recording."""
+        return cls(reader.names, reader.mins, reader.maxs)
+
+    def __len__(self):
+        return len(self.names)
+
+    def normalized(self, values, clip=False, out=None):
+        """(value - min) / (max - min) per controller, NaN where there are no limits."""
+        values = np.asarray(values, dtype=np.float32)
+        out = np.subtract(values, self.mins, out=out)
+        np.multiply(out, self.scale, out=out)
+        if clip:
+            np.clip(out, 0.0, 1.0, out=out)
+        return out
+
+    def is_on(self, values, threshold=BOOLEAN_THRESHOLD):
+        """True for boolean controllers above threshold, False for every other controller."""
+        return (np.asarray(values) > threshold) & self.boolean
+
+    def speed(self, values, unit="mph"):
+        """The first speedometer converted to unit, a scalar per frame (shape (T,) for a matrix)."""
+        if not len(self.speed_positions):
+            raise KeyError("no speedometer controller in this layout")
+        position = self.speed_positions[0]
+        factor = self.speed_to_mps[0] / SPEED_UNITS[unit]
+        return np.asarray(values)[..., position] * factor
+
+    def converted(self, values, unit="kph"):
+        """A copy of values with every speedometer column converted to unit (names are unchanged)."""
+        out = np.array(values, dtype=np.float32)
+        if len(self.speed_positions):
+            out[..., self.speed_positions] *= self.speed_to_mps / SPEED_UNITS[unit]
+        return out
+
+    def classify(self, values, threshold=BOOLEAN_THRESHOLD, unit=None):
+        """
+        Everything at once: {"kinds", "normalized", "on"} and, with a unit, "values" with the
+        speedometers converted. Shapes follow values; kinds is per controller.
+        """
+        result = {
+            "kinds": self.kinds,
+            "normalized": self.normalized(values),
+            "on": self.is_on(values, threshold),
+        }
+        if unit is not None:
+            result["values"] = self.converted(values, unit)
+        return result
+
+    def describe(self, values, threshold=BOOLEAN_THRESHOLD):
+        """One frame as the lines RailDriverData.py prints: ON/OFF for booleans, value and range otherwise."""
+        values = np.asarray(values, dtype=np.float32)
+        on = self.is_on(values, threshold)
+        lines = []
+        for position, (name, kind) in enumerate(zip(self.names, self.kinds.tolist())):
+            if kind == BOOLEAN:
+                lines.append(f"[{position:02d}] {name}: (BOOLEAN): {'ON' if on[position] else 'OFF'}")
+            elif kind == RANGE:
+                lines.append(f"[{position:02d}] {name}: : {values[position]:.2f}, "
+                             f"Min/Max: [{self.mins[position]:.2f}, {self.maxs[position]:.2f}]")
+            else:
+                lines.append(f"[{position:02d}] {name}: {values[position]:.2f}")
+        return lines
+
+    def summary(self, matrix, threshold=BOOLEAN_THRESHOLD):
+        """
+        Per controller over a (T, N) recording: kind, share of rows ON (booleans), mean normalized
+        value (ranges), min and max. NaN where it doesn't apply.
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        with np.errstate(invalid="ignore"):
+            on_share = np.where(self.boolean, self.is_on(matrix, threshold).mean(axis=0), np.nan)
+            mean_normalized = self.normalized(matrix).mean(axis=0) if len(matrix) else \
+                np.full(len(self), np.nan)
+        minimum = matrix.min(axis=0) if len(matrix) else np.full(len(self), np.nan)
+        maximum = matrix.max(axis=0) if len(matrix) else np.full(len(self), np.nan)
+        return {
+            name: {
+                "kind": KIND_NAMES[kind],
+                "on_share": float(on_share[position]),
+                "mean_normalized": float(mean_normalized[position]),
+                "min": float(minimum[position]),
+                "max": float(maximum[position]),
+            }
+            for position, (name, kind) in enumerate(zip(self.names, self.kinds.tolist()))
+        }
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python controller_arrays.py [dll_path]       : classifies the current snapshot
+    # python controller_arrays.py recording.rdtl   : summary of a recording, per controller
+    _require_numpy()
+    if len(sys.argv) > 1 and sys.argv[1].endswith(".rdtl"):
+        from telemetry_recorder import TelemetryReader
+        with TelemetryReader(sys.argv[1]) as reader:
+            arrays = ControllerArrays.from_reader(reader)
+            _, matrix = read_matrix(reader)
+            print(f"{reader.loco_name}: {len(reader)} rows")
+            for name, summary in arrays.summary(matrix).items():
+                if summary["kind"] == "boolean":
+                    detail = f"ON {summary['on_share']:.1%} of the time"
+                elif summary["kind"] == "range":
+                    detail = f"mean {summary['mean_normalized']:.3f} of range"
+                else:
+                    detail = ""
+                print(f"{name:<32} {summary['kind']:<8} [{summary['min']:.2f}, {summary['max']:.2f}] {detail}")
+            if len(arrays.speed_positions):
+                print(f"Top speed: {arrays.speed(matrix, 'kph').max(initial=0.0):.1f} km/h")
+    else:
+        client = RailDriverClient.load(*sys.argv[1:2])
+        if not client:
+            sys.exit(1)
+        snapshot = client.read_snapshot()
+        arrays = ControllerArrays.from_layout(snapshot.layout)
+        print("\n".join(arrays.describe(as_array(snapshot))))
+        if len(arrays.speed_positions):
+            print(f"Speed: {arrays.speed(as_array(snapshot), 'kph'):.1f} km/h")
@@ -0,0 +1,118 @@
+# Per-loco cache of the controller list and min/max values.
+#   Those only change with the loco, so they are read once and kept in memory and on disk.
+#   The cache is dropped when GetRailSimLocoChanged() says so or the loco name changes.
+#   On restart with a known loco, the list comes from disk, skipping the (sometimes slow) discovery.
+
+import json
+import os
+import time
+
+from RailDriverData import ControllerLayout, Snapshot, log, retry_controller_list
+
+# ===============================
+# Global Configuration
+# ===============================
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "controller_cache")
+CACHE_VERSION = 1
+
+def safe_file_name(loco_name):
+    """Loco name to a file name, same replacements as the RailDriverData.py dump."""
+    return loco_name.replace(':', '_').replace('.', '').replace('/', '_').replace('\\', '_')
+
+# ===============================
+# Cache
+# ===============================
+class ControllerCache:
+    """
+    Keeps the ControllerLayout of the current loco.
+
+    layout() costs two DLL calls (GetRailSimLocoChanged, GetLocoName) while the loco stays the same.
+    Pass cache_dir=None to keep the cache in memory only.
+    """
+
+    def __init__(self, client, cache_dir=CACHE_DIR, max_attempts=8, delay=0.02):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.loco_name = None
+        self._layout = None
+
+    def layout(self):
+        """The layout of the current loco, re-read only if the loco changed."""
+        changed = self.client.GetRailSimLocoChanged()
+        loco_name = self.client.get_loco_name()
+        if changed or loco_name != self.loco_name or self._layout is None:
+            if self._layout is not None:
+                log(2, f"Loco changed: {self.loco_name} -> {loco_name}")
+            self._layout = self._load(loco_name) or self._discover(loco_name)
+            self.loco_name = loco_name
+            self.client.layout = self._layout
+        return self._layout
+
+    def read_snapshot(self):
+        """Like RailDriverClient.read_snapshot(), with the layout coming from the cache."""
+        return Snapshot.read(self.client, self.layout())
+
+    def invalidate(self, forget=False):
+        """Drops the in-memory layout. With forget=True, the disk entry for the current loco too."""
+        if forget and self.loco_name:
+            path = self.path_for(self.loco_name)
+            if path and os.path.exists(path):
+                os.remove(path)
+        self._layout = None
+        self.loco_name = None
+
+    def path_for(self, loco_name):
+        """The cache file of a loco, None if there is no disk cache."""
+        if not self.cache_dir or not loco_name:
+            return None
+        return os.path.join(self.cache_dir, safe_file_name(loco_name) + ".json")
+
+    def _load(self, loco_name):
+        """Layout from disk, None if not cached (or unreadable)."""
+        path = self.path_for(loco_name)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as infile:
+                data = json.load(infile)
+            if data.get("version") != CACHE_VERSION or data.get("loco_name") != loco_name:
+                return None
+            layout = ControllerLayout.build(data["controllers"], data["mins"], data["maxs"])
+            log(2, f"Controller list of {loco_name} loaded from {path}")
+            return layout
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            log(1, f"Ignoring broken cache file {path}: {e}")
+            return None
+
+    def _discover(self, loco_name):
+        """Reads the controller list (retrying with backoff, it sometimes fails) and min/max from the DLL, then saves it."""
+        controllers = retry_controller_list(self.client.get_controller_list, self.max_attempts, self.delay)
+        layout = ControllerLayout.read(self.client, controllers)
+        self._save(loco_name, layout)
+        return layout
+
+    def _save(self, loco_name, layout):
+        """Writes the layout to disk. Failing to save is not fatal."""
+        path = self.path_for(loco_name)
+        if not path:
+            return
+        count = layout.controller_count
+        data = {
+            "version": CACHE_VERSION,
+            "loco_name": loco_name,
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "controllers": layout.controllers,
+            "mins": layout.mins[:count].tolist(),
+            "maxs": layout.maxs[:count].tolist(),
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as outfile:
+                json.dump(data, outfile, indent=1)
+            os.replace(temp_path, path)
+            log(2, f"Controller list of {loco_name} saved to {path}")
+        except OSError as e:
+            log(1, f"Could not save controller cache {path}: {e}")
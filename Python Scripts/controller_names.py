@@ -0,0 +1,129 @@
+# Name-addressed controller calls, compiled once per loco.
+#   names = ControllerNames(client)             # names -> integer IDs (RailDriverData.py)
+#   names.get("SpeedometerMPH"); names.set("Headlights", 1.0)
+#   speed = names.getter("SpeedometerMPH")      # a ready-made call: speed() is one ctypes call
+#   names.refresh()                             # once per loop: recompiles after a loco change
+# minimal.py / wipers_lights.py called GetControllerValue(b"SpeedometerMPH") with a c_char_p
+# prototype, but the DLL exports GetControllerValue(int id, int mode) (RailDriverData.DLL_PROTOTYPES):
+# names are compiled to those IDs, and callers only ever deal with names, the virtual controllers
+# ("Latitude", "Fuel level", ... 400-408) included.
+
+import sys
+from functools import partial
+
+from RailDriverData import RailDriverClient, log
+from controller_resolver import ControllerResolver
+
+class ControllerNames:
+    """
+    Controller names -> integer IDs for the current loco. Names are resolved like
+    get_controller_id_by_name (exact, case-insensitive, alias, prefix, token), once per loco;
+    after that get()/set() are a dict lookup and one ctypes call.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.layout = None
+        self.compiles = 0
+        self._addresses = {}  # name as asked for -> int ID
+        self._resolver = None
+        self._get = client.GetControllerValue
+        self._set = client.SetControllerValue
+
+    def compile(self, layout=None):
+        """
+        Compiles every controller name of layout (default: the client's, read if needed), the
+        virtual controllers 400-408 included (current value only).
+        """
+        layout = layout or self.client.layout or self.client.read_layout()
+        self.layout = layout
+        self._resolver = ControllerResolver(layout.names)  # resolves to layout positions
+        self._addresses = {}
+        for position, name in enumerate(layout.names):
+            self._addresses[name] = layout.ids[position]
+        self.compiles += 1
+        log(3, "Compiled %d controller names", len(self._addresses))
+        return self
+
+    def refresh(self):
+        """Recompiles if the loco changed (GetRailSimLocoChanged). Returns True if it did."""
+        loco_changed = self.client.GetRailSimLocoChanged()  # always read (and so clear) the flag, also
+        if self.layout is not None and not loco_changed:    # on the first compile, see read_snapshot
+            return False
+        self.compile(self.client.read_layout())
+        return True
+
+    def address(self, name):
+        """The controller ID of name, as compiled. Other spellings ("Throttle", "speedometer") are resolved once."""
+        address = self._addresses.get(name)
+        if address is not None:
+            return address
+        if self.layout is None:
+            self.compile()
+            address = self._addresses.get(name)
+            if address is not None:
+                return address
+        match = self._resolver.resolve(name)
+        if match.controller_id is None:
+            raise KeyError(f"no controller {name!r} on this loco")
+        if match.ambiguous:
+            log(1, f"'{name}' is ambiguous, using {match.controller_name} ({self.layout.ids[match.controller_id]})")
+        address = self._addresses[name] = self._addresses[match.controller_name]
+        return address
+
+    def id(self, name):
+        """Controller ID of name, compiling first if needed."""
+        if self.layout is None:
+            self.compile()
+        position = self.layout.index.get(name)
+        if position is not None:
+            return self.layout.ids[position]  # index is the layout position, not the ID
+        match = self._resolver.resolve(name)
+        if match.controller_id is None:
+            raise KeyError(f"no controller {name!r} on this loco")
+        return self.layout.ids[match.controller_id]
+
+    def get(self, name, mode=0):
+        """Current (0), min (1) or max (2) value of a controller by name."""
+        address = self._addresses.get(name)
+        if address is None:
+            address = self.address(name)
+        return self._get(address, mode)
+
+    def set(self, name, value):
+        address = self._addresses.get(name)
+        if address is None:
+            address = self.address(name)
+        self._set(address, value)
+
+    def getter(self, name, mode=0):
+        """A call that reads name, with its address bound: getter() per tick costs one ctypes call.
+        Valid until the loco changes."""
+        address = self.address(name)
+        return partial(self._get, address, mode)
+
+    def setter(self, name):
+        """A call that writes name: setter(value). Valid until the loco changes."""
+        return partial(self._set, self.address(name))
+
+    def __contains__(self, name):
+        try:
+            self.address(name)
+        except KeyError:
+            return False
+        return True
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python controller_names.py [dll_path] [name ...] : reads controllers by name
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    names = ControllerNames(client).compile()
+    for name in sys.argv[2:] or ["SpeedometerMPH", "Regulator", "Headlights", "Wipers"]:
+        try:
+            print(f"{name}: {names.get(name):.2f} (ID {names.id(name)})")
+        except KeyError as e:
+            print(f"{name}: {e}")
@@ -0,0 +1,133 @@
+# Controller name -> ID resolution.
+#   Indexes a controller list once, then answers exact, case-insensitive, alias, prefix and
+#   token ("Brake" finds "TrainBrakeControl") lookups without scanning the whole list.
+#   Unlike the old substring scan in get_controller_id_by_name(), ambiguous names are reported
+#   instead of silently taking the first hit.
+
+import re
+from bisect import bisect_left
+
+# ===============================
+# Global Configuration
+# ===============================
+# Alternative names, tried in order when the name itself is not a controller of this loco
+ALIASES = {
+    "Throttle": ("Regulator", "VirtualThrottle", "ThrottleAndBrake"),
+    "Direction": ("Reverser", "SimpleChangeDirection", "VirtualReverser"),
+    "TrainBrake": ("TrainBrakeControl", "VirtualBrake"),
+    "LocoBrake": ("EngineBrakeControl", "VirtualEngineBrakeControl"),
+    "Speed": ("SpeedometerMPH", "SpeedometerKPH"),
+    "Lights": ("Headlights",),
+}
+
+# Match kinds, best first. A name is resolved by the first kind that finds anything.
+MATCH_KINDS = ("exact", "nocase", "alias", "prefix", "token")
+
+# CamelCase / acronym / digit runs: "AWSResetButton2" -> AWS, Reset, Button, 2
+_TOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+def split_tokens(name):
+    """Lower-case tokens of a controller name."""
+    return [token.lower() for token in _TOKEN_RE.findall(name)]
+
+# ===============================
+# Resolver
+# ===============================
+class Match:
+    """Result of a lookup. controller_id is None if nothing matched."""
+    __slots__ = ("target", "controller_id", "controller_name", "kind", "candidates")
+
+    def __init__(self, target, controller_id=None, controller_name=None, kind=None, candidates=()):
+        self.target = target
+        self.controller_id = controller_id
+        self.controller_name = controller_name
+        self.kind = kind
+        self.candidates = candidates  # every ID that matched equally well, chosen one first
+
+    @property
+    def ambiguous(self):
+        return len(self.candidates) > 1
+
+    def __repr__(self):
+        return (f"Match({self.target!r} -> {self.controller_id} {self.controller_name!r}, "
+                f"kind={self.kind}, candidates={list(self.candidates)})")
+
+class ControllerResolver:
+    """
+    Index over one controller list (build a new one when the loco changes).
+
+    Exact and case-insensitive lookups are dict hits, prefix and token lookups are a binary
+    search over sorted keys. Ties are broken by shortest controller name, then lowest ID.
+    """
+
+    def __init__(self, controllers, aliases=ALIASES):
+        self.controllers = list(controllers)
+        self.exact = {}
+        self.nocase = {}
+        names = []
+        tokens = []
+        for controller_id, name in enumerate(self.controllers):
+            lower = name.lower()
+            self.exact.setdefault(name, []).append(controller_id)
+            self.nocase.setdefault(lower, []).append(controller_id)
+            names.append((lower, controller_id))
+            # every token suffix: TrainBrakeControl -> "brakecontrol", "control"
+            parts = split_tokens(name)
+            for start in range(1, len(parts)):
+                tokens.append(("".join(parts[start:]), controller_id))
+        names.sort()
+        tokens.sort()
+        self._names = names
+        self._tokens = tokens
+        self.aliases = {alias.lower(): targets for alias, targets in aliases.items()}
+
+    def resolve(self, target):
+        """Best match for a name, see MATCH_KINDS for the order in which they are tried."""
+        ids = self.exact.get(target)
+        if ids:
+            return self._match(target, ids, "exact")
+        lower = target.lower()
+        ids = self.nocase.get(lower)
+        if ids:
+            return self._match(target, ids, "nocase")
+        for alias_target in self.aliases.get(lower, ()):
+            ids = self.exact.get(alias_target) or self.nocase.get(alias_target.lower())
+            if ids:
+                return self._match(target, ids, "alias")
+        ids = self._scan(self._names, lower)
+        if ids:
+            return self._match(target, ids, "prefix")
+        ids = self._scan(self._tokens, lower)
+        if ids:
+            return self._match(target, ids, "token")
+        return Match(target)
+
+    def resolve_ids(self, target_names):
+        """
+        {name: controller ID or None} for several names, warns about ambiguous ones.
+        Drop-in for the result of the old get_controller_id_by_name().
+        """
+        found_controls = {}
+        for target in target_names:
+            match = self.resolve(target)
+            if match.ambiguous:
+                others = ", ".join(f"{self.controllers[i]} ({i})" for i in match.candidates[1:])
+                print(f"[WARNING] '{target}' is ambiguous, using {match.controller_name} ({match.controller_id}), "
+                      f"also matches: {others}")
+            found_controls[target] = match.controller_id
+        return found_controls
+
+    def _scan(self, keys, prefix):
+        """IDs whose key starts with prefix. O(log n) plus the number of hits."""
+        ids = []
+        position = bisect_left(keys, (prefix,))
+        while position < len(keys) and keys[position][0].startswith(prefix):
+            ids.append(keys[position][1])
+            position += 1
+        return ids
+
+    def _match(self, target, ids, kind):
+        """Builds the Match, ordering the candidates by the tie-breaking rule."""
+        candidates = sorted(set(ids), key=lambda i: (len(self.controllers[i]), i))
+        chosen = candidates[0]
+        return Match(target, chosen, self.controllers[chosen], kind, tuple(candidates))
@@ -0,0 +1,271 @@
+# Per-export instrumentation: call counts, errors, NULL / -99 returns and latency histograms
+# for every RailDriver DLL function, to tell whether the DLL or our Python is slow or failing.
+#   instruments = Instruments()
+#   instruments.attach(client)                      # RailDriverClient: wraps its export attributes
+#   raildriver = InstrumentedDLL(dll, instruments)  # for the module wrappers (get_controller_list(raildriver))
+#   ... run ...
+#   print(instruments.report())  /  instruments.to_json()
+# Nothing is wrapped until you attach, and detach() puts the plain ctypes functions back,
+# so a client without instruments pays nothing.
+
+import json
+import sys
+import time
+
+from RailDriverData import DLL_PROTOTYPES, RailDriverClient, get_controller_list
+
+NO_VALUE = -99.0  # what the DLL returns for unknown controllers
+
+# ===============================
+# Histogram
+# ===============================
+class LatencyHistogram:
+    """
+    HDR-style histogram of nanosecond latencies: 16 linear sub-buckets per power of two, so every
+    recorded value is kept within 1/16 (6%) of its real value, from 1 ns to hours, in 1 KB of counts.
+    """
+    SUB_BUCKETS = 16
+    SUB_BITS = 4
+
+    __slots__ = ("counts", "count", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.counts = [0] * (self.SUB_BUCKETS * 64)
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = 0
+
+    @classmethod
+    def bucket_of(cls, value):
+        if value < cls.SUB_BUCKETS:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS - 1
+        return (shift + 1) * cls.SUB_BUCKETS + (value >> shift) - cls.SUB_BUCKETS
+
+    @classmethod
+    def bucket_value(cls, bucket):
+        """Highest value that falls into the bucket."""
+        if bucket < cls.SUB_BUCKETS:
+            return bucket
+        shift = bucket // cls.SUB_BUCKETS - 1
+        return ((bucket % cls.SUB_BUCKETS + cls.SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value):
+        self.counts[self.bucket_of(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+
+    def percentile(self, fraction):
+        """Latency (ns) below which fraction (0.99 = p99) of the calls were."""
+        if not self.count:
+            return 0
+        target = max(int(fraction * self.count + 0.5), 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.bucket_value(bucket), self.maximum)
+        return self.maximum
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+# ===============================
+# Per-export statistics
+# ===============================
+class ExportStats:
+    """What happened to one export: calls, exceptions, NULL (c_char_p) or -99 (c_float) returns, latency."""
+    __slots__ = ("name", "calls", "errors", "nulls", "no_values", "last_error", "latency")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.nulls = 0
+        self.no_values = 0
+        self.last_error = None
+        self.latency = LatencyHistogram()
+
+    def as_dict(self):
+        latency = self.latency
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "nulls": self.nulls,
+            "no_values": self.no_values,
+            "last_error": self.last_error,
+            "latency_ns": {
+                "mean": round(latency.mean),
+                "min": latency.minimum or 0,
+                "p50": latency.percentile(0.50),
+                "p90": latency.percentile(0.90),
+                "p99": latency.percentile(0.99),
+                "p999": latency.percentile(0.999),
+                "max": latency.maximum,
+            },
+        }
+
+class Instruments:
+    """Statistics of every instrumented export, by export name."""
+
+    def __init__(self):
+        self.exports = {}
+        self.started = time.time()
+
+    def stats(self, name):
+        stats = self.exports.get(name)
+        if stats is None:
+            stats = self.exports[name] = ExportStats(name)
+        return stats
+
+    def wrap(self, name, func, restype=None):
+        """
+        A function that calls func and records it under name. restype decides what a failed
+        return is: None from a c_char_p export, -99.0 from a c_float one.
+        """
+        stats = self.stats(name)
+        record = stats.latency.record
+        clock = time.perf_counter_ns
+        check_null = restype is not None and restype.__name__ == "c_char_p"
+        check_no_value = restype is not None and restype.__name__ == "c_float"
+
+        def instrumented(*args):
+            started = clock()
+            try:
+                result = func(*args)
+            except Exception as e:
+                record(clock() - started)
+                stats.calls += 1
+                stats.errors += 1
+                stats.last_error = f"{type(e).__name__}: {e}"
+                raise
+            record(clock() - started)
+            stats.calls += 1
+            if check_null and result is None:
+                stats.nulls += 1
+            elif check_no_value and result == NO_VALUE:
+                stats.no_values += 1
+            return result
+
+        instrumented.__wrapped__ = func
+        instrumented.__name__ = name
+        return instrumented
+
+    def attach(self, client):
+        """Wraps every export attribute of a RailDriverClient (the ones found in the DLL)."""
+        for name, (restype, _) in DLL_PROTOTYPES.items():
+            func = getattr(client, name)
+            if func is not None and not hasattr(func, "__wrapped__"):
+                setattr(client, name, self.wrap(name, func, restype))
+        return client
+
+    @staticmethod
+    def detach(client):
+        """Puts the plain ctypes functions back."""
+        for name in DLL_PROTOTYPES:
+            func = getattr(client, name)
+            if func is not None and hasattr(func, "__wrapped__"):
+                setattr(client, name, func.__wrapped__)
+        return client
+
+    def reset(self):
+        """Clears the counts, keeping the wrapped functions recording into fresh ones."""
+        for stats in self.exports.values():
+            stats.calls = stats.errors = stats.nulls = stats.no_values = 0
+            stats.last_error = None
+            stats.latency.__init__()
+        self.started = time.time()
+
+    def as_dict(self):
+        return {
+            "started": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+            "exports": {name: stats.as_dict() for name, stats in sorted(self.exports.items()) if stats.calls},
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.as_dict(), indent=indent)
+
+    def report(self):
+        """The statistics as a text table, busiest export first."""
+        lines = [f"{'Export':<32} {'calls':>10} {'errors':>7} {'NULL':>6} {'-99':>6} "
+                 f"{'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for stats in sorted(self.exports.values(), key=lambda stats: -stats.calls):
+            if not stats.calls:
+                continue
+            latency = stats.latency
+            lines.append(f"{stats.name:<32} {stats.calls:>10} {stats.errors:>7} {stats.nulls:>6} "
+                         f"{stats.no_values:>6} {latency.mean / 1000:>9.2f} {latency.percentile(0.5) / 1000:>9.2f} "
+                         f"{latency.percentile(0.99) / 1000:>9.2f} {latency.maximum / 1000:>9.2f}")
+            if stats.last_error:
+                lines.append(f"    last error: {stats.last_error}")
+        return "\n".join(lines)
+
+# ===============================
+# Instrumented DLL
+# ===============================
+class _InstrumentedExport:
+    """Like a ctypes function (restype/argtypes can be set, as the module wrappers do), but recorded."""
+
+    def __init__(self, instruments, name, func):
+        object.__setattr__(self, "_instruments", instruments)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_func", func)
+        object.__setattr__(self, "_call", instruments.wrap(name, func, func.restype))
+
+    def __call__(self, *args):
+        return self._call(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._func, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._func, name, value)
+        if name == "restype":
+            # what counts as a failed return depends on it
+            object.__setattr__(self, "_call", self._instruments.wrap(self._name, self._func, value))
+
+class InstrumentedDLL:
+    """
+    A loaded DLL whose functions are recorded in instruments. Works with the module wrappers of
+    RailDriverData.py (raildriver.GetControllerValue) and with RailDriverClient (raildriver[name]).
+    """
+
+    def __init__(self, dll, instruments=None):
+        self._dll = dll
+        self.instruments = instruments if instruments is not None else Instruments()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        export = _InstrumentedExport(self.instruments, name, getattr(self._dll, name))
+        self.__dict__[name] = export  # shared, like ctypes' cached dll.name functions
+        return export
+
+    def __getitem__(self, name):
+        return _InstrumentedExport(self.instruments, name, self._dll[name])
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python instrumentation.py [dll_path] [seconds] : snapshots for a while, then prints the report
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    instruments = Instruments()
+    instruments.attach(client)
+    get_controller_list(InstrumentedDLL(client.dll, instruments))  # the module wrapper path, too
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        client.read_snapshot()
+        client.SetRailDriverConnected(True)
+        time.sleep(0.02)
+    print(instruments.report())
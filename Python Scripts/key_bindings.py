@@ -0,0 +1,290 @@
+# Declarative key bindings: a table maps keys to controller actions, keyboard hooks deliver the
+# key events, and the actions run through a RailDriverClient.
+#   bindings = KeyBindings(client, [
+#       {"key": "2", "action": "toggle", "controller": "Wipers"},
+#       {"key": "4", "action": "hold",   "controller": "Horn"},
+#       {"key": "w", "action": "step",   "controller": "Regulator", "step": 0.05},
+#       {"key": "5", "action": "set",    "controller": "Reverser", "value": -1.0},
+#   ])
+#   bindings.run(stop_key="0", tick=supervisor.tick)
+# The hook thread only queues events; run() takes them off the queue and calls the DLL, so the DLL
+# is called from one thread and a key press reaches it within a few ms. Debounce is a timestamp per
+# key (events inside the window are dropped), nothing sleeps, and the tick (keepalive) keeps running.
+#
+# Actions:
+#   toggle  off if the current value is above threshold, else on (on=1.0, off=0.0, threshold=0.5)
+#   set     value on press
+#   step    current value + step on press and on key repeat, clamped to the controller's min/max
+#   hold    value on press (default on), released on release (default off)
+
+import queue
+import sys
+import time
+from collections import namedtuple
+
+from RailDriverData import RailDriverClient, log
+from connection import ConnectionSupervisor
+from controller_resolver import ControllerResolver
+from instrumentation import NO_VALUE, LatencyHistogram
+
+keyboard = None  # pip install keyboard; imported by start(), handle() and feed() work without it
+
+# ===============================
+# Global Configuration
+# ===============================
+ACTIONS = ("toggle", "set", "step", "hold")
+DEFAULT_DEBOUNCE = 0.3       # seconds between two presses of the same key (toggle/set)
+DEFAULT_STEP_DEBOUNCE = 0.05  # seconds between two steps while a step key is held
+TICK_INTERVAL = 0.05         # run() calls tick at least this often
+
+KeyEvent = namedtuple("KeyEvent", ["key", "pressed", "time_ns"])  # time_ns: perf_counter_ns() at the hook
+
+class Binding:
+    """One table row, with the controller resolved. See the top of the file for the actions."""
+    __slots__ = ("key", "action", "controller", "value", "on", "off", "threshold", "step", "released",
+                 "debounce", "controller_id", "minimum", "maximum", "fired")
+
+    def __init__(self, key, action, controller, value=None, on=1.0, off=0.0, threshold=0.5, step=0.1,
+                 released=None, debounce=None):
+        if action not in ACTIONS:
+            raise ValueError(f"unknown action {action!r} for key {key!r}, expected one of {', '.join(ACTIONS)}")
+        self.key = key.lower()
+        self.action = action
+        self.controller = controller
+        self.value = value
+        self.on = on
+        self.off = off
+        self.threshold = threshold
+        self.step = step
+        self.released = released
+        if debounce is None:
+            debounce = DEFAULT_STEP_DEBOUNCE if action == "step" else 0.0 if action == "hold" else DEFAULT_DEBOUNCE
+        self.debounce = debounce
+        self.controller_id = None
+        self.minimum = None
+        self.maximum = None
+        self.fired = 0
+
+    @classmethod
+    def from_dict(cls, row):
+        return cls(**row)
+
+    def __repr__(self):
+        return f"Binding({self.key!r}, {self.action!r}, {self.controller!r} -> {self.controller_id})"
+
+def _import_keyboard():
+    """Imports keyboard on first use: it is slow to import and only needed to hook the keyboard."""
+    global keyboard
+    if keyboard is None:
+        try:
+            import keyboard as module
+        except ImportError:
+            raise ImportError("Key bindings need the keyboard module (pip install keyboard).") from None
+        keyboard = module
+    return keyboard
+
+# ===============================
+# Engine
+# ===============================
+class KeyBindings:
+    """
+    Runs a binding table against a RailDriverClient. handle() is the whole engine and works without
+    the keyboard module (tests, replays); start() hooks the keyboard and feeds it through a queue.
+
+    on_action(binding, value) is called after every write, by default it prints like the old scripts.
+    """
+
+    def __init__(self, client, table, on_action=None, controllers=None):
+        self.client = client
+        self.bindings = {}
+        for row in table:
+            binding = row if isinstance(row, Binding) else Binding.from_dict(row)
+            self.bindings.setdefault(binding.key, []).append(binding)
+        self.on_action = on_action or self._print_action
+        self.events = queue.SimpleQueue()
+        self.latency = LatencyHistogram()  # hook -> DLL write done, ns
+        self.received = 0
+        self.debounced = 0
+        self.unresolved = []
+        self._down = set()
+        self._last_fired = {}
+        self._hook = None
+        self.resolve(controllers)
+
+    def resolve(self, controllers=None):
+        """Controller names -> IDs (and min/max for step) for the current loco. Call again after a loco change."""
+        if controllers is None:
+            controllers = self.client.get_controller_list() or []
+        resolver = ControllerResolver(controllers)
+        names = {binding.controller for bindings in self.bindings.values() for binding in bindings}
+        ids = resolver.resolve_ids(names)
+        self.unresolved = sorted(name for name, controller_id in ids.items() if controller_id is None)
+        for bindings in self.bindings.values():
+            for binding in bindings:
+                binding.controller_id = ids[binding.controller]
+                if binding.action == "step" and binding.controller_id is not None:
+                    binding.minimum = self.client.GetControllerValue(binding.controller_id, 1)
+                    binding.maximum = self.client.GetControllerValue(binding.controller_id, 2)
+        if self.unresolved:
+            log(1, f"Key bindings: controllers not found: {', '.join(self.unresolved)}")
+        return self.unresolved
+
+    # ---- keyboard ----
+    def start(self):
+        """Hooks the keyboard. Events are only queued here; run() or process() dispatches them."""
+        _import_keyboard()
+        if self._hook is None:
+            self._hook = keyboard.hook(self._on_keyboard_event)
+
+    def stop(self):
+        if self._hook is not None:
+            keyboard.unhook(self._hook)
+            self._hook = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _on_keyboard_event(self, event):
+        # keyboard's hook thread: no DLL calls here
+        if event.name:
+            self.events.put(KeyEvent(event.name.lower(), event.event_type == keyboard.KEY_DOWN, time.perf_counter_ns()))
+
+    def feed(self, key, pressed=True):
+        """Queues a key event as the hook would (for tests and scripted input)."""
+        self.events.put(KeyEvent(key.lower(), pressed, time.perf_counter_ns()))
+
+    # ---- dispatch ----
+    def process(self, timeout=0.0):
+        """Handles queued events, waiting up to timeout for the first. Returns the keys handled."""
+        keys = []
+        try:
+            event = self.events.get(timeout=timeout) if timeout > 0 else self.events.get_nowait()
+            while True:
+                if self.handle(event.key, event.pressed, event.time_ns):
+                    keys.append(event.key)
+                event = self.events.get_nowait()
+        except queue.Empty:
+            pass
+        return keys
+
+    def run(self, stop_key=None, tick=None, tick_interval=TICK_INTERVAL):
+        """
+        Hooks the keyboard and dispatches until stop_key is pressed. tick() (e.g. the connection
+        supervisor's) is called at least every tick_interval, key presses or not.
+        """
+        self.start()
+        try:
+            while True:
+                if tick is not None:
+                    tick()
+                if stop_key is not None and stop_key.lower() in self.process(tick_interval):
+                    return
+        finally:
+            self.stop()
+
+    def handle(self, key, pressed, time_ns=None):
+        """One key event. Returns True for a press (repeats included), bound or not."""
+        self.received += 1
+        repeat = pressed and key in self._down
+        if pressed:
+            self._down.add(key)
+        else:
+            self._down.discard(key)
+        bindings = self.bindings.get(key)
+        if not bindings:
+            return pressed
+        now = time.perf_counter()
+        for binding in bindings:
+            if binding.controller_id is None:
+                continue
+            if pressed:
+                if repeat and binding.action != "step":
+                    continue  # auto-repeat of a held key
+                last = self._last_fired.get(binding)
+                if last is not None and now - last < binding.debounce:
+                    self.debounced += 1
+                    continue
+                self._last_fired[binding] = now
+            elif binding.action != "hold":
+                continue
+            value = self._apply(binding, pressed)
+            if value is None:
+                continue
+            binding.fired += 1
+            if time_ns is not None:
+                self.latency.record(time.perf_counter_ns() - time_ns)
+            self.on_action(binding, value)
+        return pressed
+
+    def _apply(self, binding, pressed):
+        """Does the DLL write for one binding and returns the value written (None if nothing was)."""
+        client = self.client
+        controller_id = binding.controller_id
+        action = binding.action
+        if action == "set":
+            value = binding.value
+        elif action == "hold":
+            if pressed:
+                value = binding.on if binding.value is None else binding.value
+            else:
+                value = binding.off if binding.released is None else binding.released
+        else:
+            current = client.GetControllerValue(controller_id, 0)
+            if current == NO_VALUE:  # failed read or unknown controller
+                log(1, f"Could not read current {binding.controller} value.")
+                return None
+            if action == "toggle":
+                value = binding.off if current > binding.threshold else binding.on
+            else:
+                value = current + binding.step
+                if binding.minimum is not None and binding.maximum is not None \
+                        and binding.minimum < binding.maximum:
+                    value = min(max(value, binding.minimum), binding.maximum)
+        client.SetControllerValue(controller_id, value)
+        return value
+
+    @staticmethod
+    def _print_action(binding, value):
+        if binding.action == "toggle":
+            print(f"{binding.controller}: {'ON' if value > binding.threshold else 'OFF'} ({value:.2f})")
+        else:
+            print(f"{binding.controller}: Set to {value:.2f}")
+
+    def stats(self):
+        """Events received, writes per binding, debounced presses and hook-to-DLL latency."""
+        latency = self.latency
+        return {
+            "events": self.received,
+            "debounced": self.debounced,
+            "fired": {f"{binding.key}:{binding.action}:{binding.controller}": binding.fired
+                      for bindings in self.bindings.values() for binding in bindings},
+            "latency_ms": {
+                "p50": latency.percentile(0.5) / 1e6,
+                "p99": latency.percentile(0.99) / 1e6,
+                "max": latency.maximum / 1e6,
+            },
+        }
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python key_bindings.py [dll_path] : 2 Wipers, 3 EmergencyBrake, 4 Horn (held), 0 exits
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    supervisor = ConnectionSupervisor(client)
+    if not supervisor.wait_ready(timeout=30):
+        sys.exit(1)
+    bindings = KeyBindings(client, [
+        {"key": "2", "action": "toggle", "controller": "Wipers"},
+        {"key": "3", "action": "toggle", "controller": "EmergencyBrake"},
+        {"key": "4", "action": "hold", "controller": "Horn"},
+    ])
+    print("'2' Wipers, '3' EmergencyBrake, hold '4' for the Horn, '0' to exit.")
+    bindings.run(stop_key="0", tick=supervisor.tick)
+    print(bindings.stats())
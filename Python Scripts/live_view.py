@@ -0,0 +1,372 @@
+# Terminal live view of all controllers (controller list + virtual 400-408), redrawn by diff.
+#   Every frame is rendered into cells (ID, name, value, state, min/max) and only the cells whose
+#   text changed since the last frame are written, with ANSI cursor positioning, in one write.
+#   No shell is spawned and nothing is cleared, so 30 frames/s cost little more than the snapshot.
+#   Sorting and filtering work on the last snapshot in memory; they never query the DLL again.
+#
+# Keys: s = next sort order, f = filter (type text, Enter/Esc ends), j/k = scroll, q = quit
+
+import os
+import shutil
+import sys
+import time
+
+from RailDriverData import RailDriverClient
+
+# ===============================
+# Global Configuration
+# ===============================
+SORT_ORDERS = ("id", "name", "value", "changed")
+FRAME_RATE = 30.0
+
+# (column, width) of each cell of a controller row
+COLUMNS = {
+    "id": (1, 5),
+    "name": (7, 32),
+    "value": (40, 12),
+    "state": (53, 14),
+    "range": (68, 22),
+}
+
+CSI = "\x1b["
+ENTER_SCREEN = "\x1b[?1049h\x1b[?25l\x1b[2J"  # alternate screen, hide cursor, clear
+LEAVE_SCREEN = "\x1b[?25h\x1b[?1049l"
+
+def enable_ansi():
+    """Turns on ANSI escape processing in the Windows console (a no-op elsewhere)."""
+    if os.name != 'nt':
+        return True
+    import ctypes
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+    mode = ctypes.c_uint32()
+    if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        return False
+    return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+
+# ===============================
+# Keyboard (non-blocking)
+# ===============================
+class KeyReader:
+    """Single key presses without Enter and without blocking; does nothing if stdin isn't a terminal."""
+
+    def __init__(self, stream=sys.stdin):
+        self.stream = stream
+        self.enabled = hasattr(stream, "isatty") and stream.isatty()
+        self._saved = None
+
+    def __enter__(self):
+        if self.enabled and os.name != 'nt':
+            import termios
+            import tty
+            self._saved = termios.tcgetattr(self.stream)
+            tty.setcbreak(self.stream.fileno())
+        return self
+
+    def __exit__(self, *exc):
+        if self._saved is not None:
+            import termios
+            termios.tcsetattr(self.stream, termios.TCSADRAIN, self._saved)
+            self._saved = None
+
+    def keys(self):
+        """Keys pressed since the last call."""
+        if not self.enabled:
+            return []
+        pressed = []
+        if os.name == 'nt':
+            import msvcrt
+            while msvcrt.kbhit():
+                pressed.append(msvcrt.getwch())
+        else:
+            import select
+            while select.select([self.stream], [], [], 0)[0]:
+                key = os.read(self.stream.fileno(), 1).decode("utf-8", "replace")
+                if not key:
+                    break
+                pressed.append(key)
+        return pressed
+
+# ===============================
+# Live view
+# ===============================
+class LiveView:
+    """
+    Renders snapshots as a table that is updated in place. render() returns the escape sequences
+    for one frame (empty if nothing changed), so it can be written anywhere or tested on a string.
+
+    names: only these controllers (in this order, unless sorted otherwise). status(): extra header
+    lines, e.g. a script's own state.
+    """
+
+    def __init__(self, client, rate=FRAME_RATE, stream=sys.stdout, sort="id", filter="", names=None,
+                 status=None):
+        self.client = client
+        self.period = 1.0 / rate
+        self.stream = stream
+        self.sort = sort
+        self.filter = filter
+        self.names = names
+        self.status = status
+        self.offset = 0
+        self.size = shutil.get_terminal_size()
+        self.message = ""
+        self.editing = False
+        self.snapshot = None
+        self.frames = 0
+        self.cells_written = 0
+        self.bytes_written = 0
+        self._screen = {}        # (row, column) -> text on screen
+        self._lines = {}         # row -> (position, value) drawn there
+        self._used = 0           # controller rows drawn in the last frame
+        self._rows = None        # positions shown, in order (None: recompute)
+        self._rows_key = None
+        self._last_values = None
+        self._changed_at = None  # position -> frame number it last changed in
+        self._loco_layout = None
+        self._loco_name = "Unknown"
+        self._fps_time = time.perf_counter()
+        self._fps_frames = 0
+        self.fps = 0.0
+
+    # ---- in-memory sorting / filtering ----
+    def set_sort(self, sort):
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"unknown sort order {sort!r}, expected one of {', '.join(SORT_ORDERS)}")
+        self.sort = sort
+        self._rows = None
+
+    def next_sort(self):
+        self.set_sort(SORT_ORDERS[(SORT_ORDERS.index(self.sort) + 1) % len(SORT_ORDERS)])
+
+    def set_filter(self, text):
+        self.filter = text
+        self.offset = 0
+        self._rows = None
+
+    def rows(self, snapshot):
+        """Positions of the controllers to show, filtered and sorted from the snapshot alone."""
+        layout = snapshot.layout
+        key = (layout, self.sort, self.filter)
+        if self._rows is not None and self._rows_key == key and self.sort not in ("value", "changed"):
+            return self._rows
+        if self.names is not None:
+            positions = [layout.index[name] for name in self.names if name in layout.index]
+        else:
+            positions = list(range(len(layout)))
+        if self.filter:
+            text = self.filter.lower()
+            positions = [position for position in positions if text in layout.names[position].lower()]
+        if self.sort == "name":
+            positions.sort(key=lambda position: layout.names[position].lower())
+        elif self.sort == "value":
+            values = snapshot.values
+            positions.sort(key=lambda position: -values[position])
+        elif self.sort == "changed":
+            changed_at = self._changed_at
+            positions.sort(key=lambda position: -changed_at[position])
+        self._rows = positions
+        self._rows_key = key
+        return positions
+
+    # ---- rendering ----
+    @staticmethod
+    def cells(layout, position, value):
+        """The cell texts of one controller row."""
+        minimum = layout.mins[position]
+        maximum = layout.maxs[position]
+        if minimum != minimum:  # virtual controller, no min/max
+            state = ""
+            limits = ""
+        elif minimum == 0.0 and maximum == 1.0:
+            state = "ON" if value > 0.5 else "OFF"
+            limits = "BOOLEAN"
+        else:
+            span = maximum - minimum
+            filled = round((value - minimum) / span * 10) if span > 0 else 0
+            filled = min(max(filled, 0), 10)
+            state = "[" + "#" * filled + "." * (10 - filled) + "]"
+            limits = f"[{minimum:.2f}, {maximum:.2f}]"
+        return {
+            "id": f"{layout.ids[position]:>4}",
+            "name": layout.names[position],
+            "value": f"{value:12.3f}",
+            "state": state,
+            "range": limits,
+        }
+
+    def _header(self, snapshot):
+        loco_name = self.loco_name
+        lines = [
+            f"{loco_name[:60]}  |  {len(snapshot.layout)} controllers  |  {self.fps:4.1f} fps",
+            f"sort: {self.sort}  filter: {self.filter + ('_' if self.editing else '') or '-'}  "
+            f"|  s sort, f filter, j/k scroll, q quit  {self.message}",
+            f"{'ID':>5} {'Controller':<32} {'Value':>12} {'State':<14} {'Min/Max':<22}",
+        ]
+        if self.status is not None:
+            lines[2:2] = self.status()
+        return lines
+
+    def render(self, snapshot):
+        """Escape sequences that bring the screen from the last frame to this snapshot."""
+        self.snapshot = snapshot
+        layout = snapshot.layout
+        values = snapshot.values
+        if self._last_values is None or len(self._last_values) != len(values) or self._rows_key is None \
+                or self._rows_key[0] is not layout:
+            self._changed_at = [0] * len(values)
+            self._screen = {}
+            self._lines = {}
+            self._rows = None
+        else:
+            last = self._last_values
+            changed_at = self._changed_at
+            for position, value in enumerate(values):
+                if value != last[position]:
+                    changed_at[position] = self.frames
+        self._last_values = values
+
+        out = []
+        header = self._header(snapshot)
+        width = self.size.columns
+        for row, text in enumerate(header, 1):
+            self._put(out, row, 1, text[:width], width)
+        top = len(header) + 1
+        visible = max(self.size.lines - top, 1)
+        rows = self.rows(snapshot)
+        self.offset = min(self.offset, max(len(rows) - visible, 0))
+        shown = rows[self.offset:self.offset + visible]
+        columns = [(name, column, min(cell_width, width - column + 1))
+                   for name, (column, cell_width) in COLUMNS.items() if column <= width]
+        lines = self._lines
+        for line, position in enumerate(shown, top):
+            value = values[position]
+            if lines.get(line) == (position, value):
+                continue  # same controller, same value: every cell is already on screen
+            lines[line] = (position, value)
+            cells = self.cells(layout, position, value)
+            for name, column, cell_width in columns:
+                self._put(out, line, column, cells[name][:cell_width], cell_width)
+        for line in range(top + len(shown), top + self._used):  # rows no longer used
+            out.append(f"{CSI}{line};1H{CSI}K")
+            lines.pop(line, None)
+            for _, column, _ in columns:
+                self._screen.pop((line, column), None)
+        self._used = len(shown)
+        self.frames += 1
+        return "".join(out)
+
+    def _put(self, out, row, column, text, width):
+        """Adds the cell to out if it differs from what is on screen."""
+        key = (row, column)
+        if self._screen.get(key, None) == text:
+            return
+        self._screen[key] = text
+        out.append(f"{CSI}{row};{column}H{text:<{width}}")
+        self.cells_written += 1
+
+    def invalidate(self):
+        """Forgets the screen contents: the next frame is drawn completely (after a resize, ...)."""
+        self._screen = {}
+        self._lines = {}
+        self._used = 0
+        self.write(f"{CSI}2J")
+
+    def write(self, text):
+        if text:
+            self.stream.write(text)
+            self.stream.flush()
+            self.bytes_written += len(text)
+
+    # ---- input ----
+    def handle_key(self, key):
+        """One key press. Returns False to quit."""
+        if self.editing:
+            if key in ("\r", "\n", "\x1b"):
+                self.editing = False
+            elif key in ("\x7f", "\b"):
+                self.set_filter(self.filter[:-1])
+            elif key.isprintable():
+                self.set_filter(self.filter + key)
+            return True
+        if key == "q":
+            return False
+        if key == "s":
+            self.next_sort()
+        elif key == "f":
+            self.editing = True
+            self.set_filter("")
+        elif key == "j":
+            self.offset += 1
+        elif key == "k":
+            self.offset = max(self.offset - 1, 0)
+        return True
+
+    # ---- main loop ----
+    @property
+    def loco_name(self):
+        if self._loco_layout is not self.snapshot.layout:
+            self._loco_layout = self.snapshot.layout
+            self._loco_name = self.client.get_loco_name() or "Unknown"
+        return self._loco_name
+
+    def run(self, on_tick=None, seconds=None):
+        """
+        Draws at up to rate frames/s until q (or seconds have passed). on_tick(view) runs every
+        frame before the snapshot is read, e.g. to handle a script's own keys.
+        """
+        enable_ansi()
+        self.write(ENTER_SCREEN)
+        deadline = started = time.perf_counter()
+        try:
+            with KeyReader() as keys:
+                while seconds is None or time.perf_counter() - started < seconds:
+                    if not all(self.handle_key(key) for key in keys.keys()):
+                        break
+                    if on_tick is not None:
+                        on_tick(self)
+                    size = shutil.get_terminal_size()
+                    if size != self.size:
+                        self.size = size
+                        self.invalidate()
+                    self.write(self.render(self.client.read_snapshot()))
+                    self._count_fps()
+                    deadline += self.period
+                    remaining = deadline - time.perf_counter()
+                    if remaining > 0:
+                        time.sleep(remaining)
+                    else:
+                        deadline = time.perf_counter()  # late: don't try to catch up
+        finally:
+            self.write(LEAVE_SCREEN)
+
+    def _count_fps(self):
+        self._fps_frames += 1
+        now = time.perf_counter()
+        if now - self._fps_time >= 1.0:
+            self.fps = self._fps_frames / (now - self._fps_time)
+            self._fps_time = now
+            self._fps_frames = 0
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "cells_written": self.cells_written,
+            "bytes_written": self.bytes_written,
+            "cells_per_frame": self.cells_written / self.frames if self.frames else 0.0,
+        }
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python live_view.py [dll_path] [rate]
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    view = LiveView(client, rate=float(sys.argv[2]) if len(sys.argv) > 2 else FRAME_RATE)
+    try:
+        view.run()
+    except KeyboardInterrupt:
+        pass
+    print(view.stats())
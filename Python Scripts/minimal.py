@@ -1,6 +1,8 @@
 import os
 import ctypes
-from ctypes import c_int, c_char_p, c_float, POINTER
+from ctypes import c_int, c_char_p
+from RailDriverData import RailDriverClient
+from controller_names import ControllerNames
 
 DLL_PATH = os.path.join(os.getcwd(), "C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dll")
 
@@ -20,8 +22,8 @@ rd_dll.GetRailSimConnected.restype = c_int
 
 rd_dll.GetLocoName.restype = c_char_p
 
-rd_dll.GetControllerValue.argtypes = [c_char_p]
-rd_dll.GetControllerValue.restype = c_float
+# Controllers are addressed by name; ControllerNames compiles the names to IDs once per loco
+controllers = ControllerNames(RailDriverClient(rd_dll))
 
 # Connect to RailDriver
 try:
@@ -47,7 +49,7 @@ except Exception as e:
 
 # Get Speed
 try:
-    speed = rd_dll.GetControllerValue(b"SpeedometerMPH")
+    speed = controllers.get("SpeedometerMPH")
     print(f"Speed: {speed} MPH")
 except Exception as e:
     print(f"Error getting speed: {e}")
@@ -0,0 +1,80 @@
+# The RailDriver scripts as one importable package with one command line:
+#   python -m raildriver dump              # loco name and every controller, see __main__.py
+#   import raildriver
+#   client = raildriver.client()           # the DLL is loaded here, on first use
+#   names = raildriver.ControllerNames(client)
+# Importing the package imports nothing else: each name is imported from its module (the scripts
+# next to this folder, RailDriverData.py, live_view.py, ...) when it is first used, so keyboard,
+# numpy or pyarrow are only imported by the code that needs them.
+
+import importlib
+import os
+import sys
+
+_SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SCRIPTS not in sys.path:
+    # the scripts import each other by module name. Appended, not inserted first: their generic
+    # names (connection, replay, sampler...) don't shadow installed modules of the same name.
+    sys.path.append(_SCRIPTS)
+
+# public name -> module that defines it
+_EXPORTS = {
+    "DLL_NAME": "RailDriverData",
+    "VIRTUAL_CONTROLLERS": "RailDriverData",
+    "RailDriverClient": "RailDriverData",
+    "ControllerLayout": "RailDriverData",
+    "Snapshot": "RailDriverData",
+    "load_raildriver_dll": "RailDriverData",
+    "log": "raildriver_log",
+    "set_level": "raildriver_log",
+    "ConnectionSupervisor": "connection",
+    "ControllerResolver": "controller_resolver",
+    "ControllerNames": "controller_names",
+    "ControllerCache": "controller_cache",
+    "Instruments": "instrumentation",
+    "CommandQueue": "command_queue",
+    "ChangeStream": "change_stream",
+    "AsyncRailDriver": "async_raildriver",
+    "Sampler": "sampler",
+    "KeyBindings": "key_bindings",
+    "LiveView": "live_view",
+    "ControlEngine": "control_engine",
+    "PID": "control_engine",
+    "BangBang": "control_engine",
+    "Ramp": "control_engine",
+    "ControllerArrays": "controller_arrays",
+    "Rollups": "rollups",
+    "TelemetryRecorder": "telemetry_recorder",
+    "TelemetryReader": "telemetry_recorder",
+    "TelemetryServer": "telemetry_server",
+    "TelemetryClient": "telemetry_server",
+    "TelemetryPublisher": "shared_telemetry",
+    "TelemetrySubscriber": "shared_telemetry",
+    "ReplayBackend": "replay",
+}
+
+__all__ = sorted(_EXPORTS) + ["client"]
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # later lookups don't come here
+    return value
+
+def __dir__():
+    return __all__
+
+_client = None
+
+def client(dll_name=None):
+    """
+    The process-wide RailDriverClient. The first call loads the DLL (dll_name, default
+    RailDriverData.DLL_NAME); None if loading failed, and the next call tries again.
+    """
+    global _client
+    if _client is None:
+        from RailDriverData import RailDriverClient
+        _client = RailDriverClient.load(dll_name) if dll_name else RailDriverClient.load()
+    return _client
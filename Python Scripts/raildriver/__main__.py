@@ -0,0 +1,108 @@
+# One command line for the RailDriver scripts:
+#   python -m raildriver dump [--dll PATH] [--json] [--wait SECONDS]
+#   python -m raildriver live [dll_path] [rate]          (and the other commands below)
+# dump is built in: it imports RailDriverData only and prints the loco name as soon as the DLL
+# answers, then every controller (current, min, max), virtual controllers 400-408 included.
+# The other commands run a script's own command line (its "Main Script"), with the arguments
+# that follow the command; only that script's module, and what it imports, is loaded.
+
+import argparse
+import os
+import runpy
+import sys
+
+if not __package__:  # python raildriver/ or python raildriver/__main__.py: make the package importable
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# command -> (module, description)
+COMMANDS = {
+    "live": ("live_view", "terminal live view of all controllers"),
+    "keys": ("key_bindings", "key bindings demo (needs keyboard)"),
+    "cruise": ("control_engine", "cruise control: hold a speed"),
+    "names": ("controller_names", "read controllers by name"),
+    "changes": ("change_stream", "print every controller change"),
+    "connection": ("connection", "wait for the sim, report connection state changes"),
+    "record": ("telemetry_recorder", "record all controllers to a .rdtl file"),
+    "export": ("telemetry_export", "export a recording to CSV, .rdtc or Parquet"),
+    "replay": ("replay", "replay a recording"),
+    "rollups": ("rollups", "rolled up min/max/mean of the snapshot stream"),
+    "serve": ("telemetry_server", "serve telemetry over TCP and HTTP/JSON"),
+    "shared": ("shared_telemetry", "publish or watch telemetry in shared memory"),
+    "bench": (os.path.join("benchmarks", "run_benchmarks.py"), "benchmark suite against the stub DLL"),
+}
+
+def dump(args):
+    """Prints the loco and all controllers once. Returns the exit code."""
+    import raildriver
+    client = raildriver.client(args.dll)
+    if not client:
+        return 1
+    if args.wait:
+        from connection import ConnectionSupervisor
+        if not ConnectionSupervisor(client).wait_ready(timeout=args.wait):
+            print("Train Simulator not ready. Is a scenario running?", file=sys.stderr)
+            return 1
+    loco_name = client.get_loco_name()
+    if not args.json:
+        print(f"Loco: {loco_name or 'Unknown'}", flush=True)  # first output before the controllers are read
+    try:
+        snapshot = client.read_snapshot()
+    except RuntimeError as e:
+        print(f"{e} Is Train Simulator running AND are you in a driving session?", file=sys.stderr)
+        return 1
+    layout = snapshot.layout
+    if args.json:
+        import json
+
+        def number(value):
+            return None if value != value else value  # NaN (no min/max) -> null
+        json.dump({
+            "loco": loco_name,
+            "timestamp": snapshot.timestamp,
+            "controllers": [
+                {"id": layout.ids[position], "name": name, "value": number(snapshot.values[position]),
+                 "min": number(layout.mins[position]), "max": number(layout.maxs[position])}
+                for position, name in enumerate(layout.names)
+            ],
+        }, sys.stdout, indent=2)
+        print()
+        return 0
+    for position, name in enumerate(layout.names):
+        minimum = layout.mins[position]
+        limits = "" if minimum != minimum else f"  [{minimum:.2f}, {layout.maxs[position]:.2f}]"
+        print(f"[{layout.ids[position]:03d}] {name:<32} {snapshot.values[position]:12.3f}{limits}")
+    return 0
+
+def run_script(command, argv):
+    """Runs a script's Main Script as if it was started as python <script> argv..."""
+    module = COMMANDS[command][0]
+    sys.argv = [module if module.endswith(".py") else module + ".py"] + argv
+    if module.endswith(".py"):
+        from raildriver import _SCRIPTS
+        runpy.run_path(os.path.join(_SCRIPTS, module), run_name="__main__")
+    else:
+        import raildriver  # puts the scripts folder on sys.path
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = argparse.ArgumentParser(prog="python -m raildriver", description="RailDriver tools.")
+    commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+    dump_parser = commands.add_parser("dump", help="print the loco name and every controller once")
+    dump_parser.add_argument("--dll", help="RailDriver DLL (or the stub DLL), default RailDriverData.DLL_NAME")
+    dump_parser.add_argument("--json", action="store_true", help="JSON instead of a table")
+    dump_parser.add_argument("--wait", type=float, default=0.0, metavar="SECONDS",
+                             help="wait up to SECONDS for the sim first (default: don't wait)")
+    for command, (_, description) in COMMANDS.items():
+        commands.add_parser(command, help=description, add_help=False)
+    if argv and argv[0] in COMMANDS:  # the script parses its own arguments
+        return run_script(argv[0], argv[1:])
+    args = parser.parse_args(argv)
+    return dump(args)
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,97 @@
+# Logging for the RailDriver scripts: log(level, message, *args) with the usual
+# "[timestamp] [LEVEL] message" output, but cheap enough for the hot paths.
+#   - Messages are formatted lazily, %-style: log(3, "GetControllerValue(%d) returned: %s", control_id, value).
+#     Below the current level a call is one comparison, nothing is formatted.
+#   - Hot loops can skip even the call: if raildriver_log.DEBUG_LEVEL >= 3: log(3, ...)
+#   - Emitted messages go through a queue to a writer thread, which does the strftime, the
+#     formatting and the print(), so DEBUG tracing doesn't slow down the code being traced.
+#     The args are formatted on that thread: pass immutable values (numbers, strings, tuples).
+
+import atexit
+import queue
+import sys
+import threading
+import time
+
+# ===============================
+# Global Configuration
+# ===============================
+DEBUG_LEVEL = 1  # 0: NONE, 1: ERROR, 2: INFO, 3: DEBUG
+LOG_LEVELS = {
+    0: "NONE",
+    1: "ERROR",
+    2: "INFO",
+    3: "DEBUG"
+}
+
+_queue = queue.SimpleQueue()
+_writer = None
+_writer_lock = threading.Lock()
+_STOP = object()
+
+def set_level(level):
+    """Sets the level for every module logging through here."""
+    global DEBUG_LEVEL
+    DEBUG_LEVEL = level
+
+def log(level, message, *args):
+    """Centralized logging function with level control. message % args is done by the writer thread."""
+    if level > DEBUG_LEVEL:
+        return
+    if _writer is None:
+        _start_writer()
+    _queue.put((time.time(), level, message, args))
+
+def flush():
+    """Waits until everything logged so far is printed (e.g. before printing to the console yourself)."""
+    if _writer is None:
+        return
+    done = threading.Event()
+    _queue.put(done)
+    done.wait()
+
+# ===============================
+# Writer Thread
+# ===============================
+def _format(record):
+    timestamp, level, message, args = record
+    if args:
+        try:
+            message = message % args
+        except (TypeError, ValueError) as e:
+            message = f"{message} {args!r} (format error: {e})"
+    log_level_name = LOG_LEVELS.get(level, "UNKNOWN")
+    return f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}] [{log_level_name}] {message}"
+
+def _write():
+    while True:
+        record = _queue.get()
+        if record is _STOP:
+            return
+        if isinstance(record, threading.Event):
+            sys.stdout.flush()
+            record.set()
+            continue
+        try:
+            print(_format(record))
+        except Exception:
+            pass  # stdout gone (closed pipe), nothing left to log to
+
+def _start_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is not None:
+            return
+        _writer = threading.Thread(target=_write, name="RailDriverLog", daemon=True)
+        _writer.start()
+        atexit.register(_stop_writer)
+
+def _stop_writer():
+    """At exit: prints what is still queued."""
+    global _writer
+    writer = _writer
+    if writer is None:
+        return
+    _queue.put(_STOP)
+    writer.join(timeout=5)
+    _writer = None
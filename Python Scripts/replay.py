@@ -0,0 +1,234 @@
+# Replay backend: plays a recorded .rdtl session (see telemetry_recorder.py) through the DLL interface.
+#   A ReplayBackend stands in for the loaded DLL: it works with the module wrappers
+#   (get_controller_value(backend, ...)) and with RailDriverClient(backend), on any OS, no ctypes.
+#   Time is virtual: in real-time mode it follows the wall clock (times speed), otherwise it only
+#   moves when the code under test calls backend.sleep() or backend.step(), so hours of driving
+#   replay in seconds, deterministically.
+
+import sys
+import time
+from bisect import bisect_right
+
+from RailDriverData import RailDriverClient, get_controller_value
+from telemetry_recorder import TelemetryReader
+
+NO_VALUE = -99.0  # what the DLL returns for unknown controllers
+
+class _Export:
+    """A callable that, like a ctypes function, accepts restype/argtypes being set on it."""
+    __slots__ = ("func", "restype", "argtypes")
+
+    def __init__(self, func):
+        self.func = func
+        self.restype = None
+        self.argtypes = None
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+def _plain(value):
+    """Unwraps ctypes.c_float(...) / c_bool(...) arguments, as the module wrappers pass them."""
+    return getattr(value, "value", value)
+
+class ReplayBackend:
+    """
+    A recorded session behind the RailDriver DLL exports.
+
+    realtime=True: the session plays along the wall clock at speed; sleep() is time.sleep().
+    realtime=False: time only advances through sleep(seconds) or step() (next recorded frame).
+    Values set with SetControllerValue are returned by GetControllerValue until the next frame
+    and are logged in writes as (session time, controller id, value).
+    """
+
+    EXPORTS = ("GetControllerList", "GetLocoName", "GetControllerValue", "GetCurrentControllerValue",
+               "SetControllerValue", "GetRailSimLocoChanged", "GetRailSimConnected", "IsLocoSet",
+               "SetRailDriverConnected", "GetRailDriverConnected")
+
+    def __init__(self, path, realtime=False, speed=1.0):
+        self.reader = TelemetryReader(path)
+        self.realtime = realtime
+        self.speed = speed
+        reader = self.reader
+        self.timestamps = reader.timestamps()
+        self.start_time = self.timestamps[0] if len(self.timestamps) else 0.0
+        self.end_time = self.timestamps[-1] if len(self.timestamps) else 0.0
+        self.position_of = {controller_id: position for position, controller_id in enumerate(reader.ids)}
+        self.columns = [reader.column_views(position) for position in range(len(reader.names))]
+        self.controller_list = "::".join(reader.names[:reader.metadata["controller_count"]]).encode("utf-8")
+        self.loco_name = reader.loco_name.encode("utf-8")
+        self.writes = []
+        self.connected = False
+        self._overrides = {}
+        self._override_frame = -1
+        self._loco_changed = True
+        self._now = self.start_time
+        self._frame = 0
+        self._wall_start = time.perf_counter()
+        for name in self.EXPORTS:
+            setattr(self, name, _Export(getattr(self, "_" + name)))
+
+    def __getitem__(self, name):
+        """raildriver[name], as RailDriverClient resolves exports."""
+        export = getattr(self, name, None)
+        if not isinstance(export, _Export):
+            raise AttributeError(f"function '{name}' not found")
+        return export
+
+    # ---- session clock ----
+    @property
+    def now(self):
+        """Current session time (same clock as the recorded timestamps)."""
+        if self.realtime:
+            return self.start_time + (time.perf_counter() - self._wall_start) * self.speed
+        return self._now
+
+    @property
+    def frame(self):
+        """Index of the recorded frame at the current session time."""
+        if not self.realtime:
+            return self._frame  # only moves in sleep()/step()
+        return max(bisect_right(self.timestamps, self.now) - 1, 0)
+
+    @property
+    def finished(self):
+        return self.now >= self.end_time
+
+    def sleep(self, seconds):
+        """Use instead of time.sleep() in the code under test."""
+        if self.realtime:
+            time.sleep(seconds / self.speed)
+        else:
+            self._now += seconds
+            self._frame = max(bisect_right(self.timestamps, self._now) - 1, 0)
+
+    def step(self):
+        """Jumps to the next recorded frame. Returns False at the end of the session."""
+        frame = self.frame + 1
+        if frame >= len(self.timestamps):
+            return False
+        if self.realtime:
+            self._wall_start -= (self.timestamps[frame] - self.now) / self.speed
+        else:
+            self._now = self.timestamps[frame]
+            self._frame = frame
+        return True
+
+    def rewind(self):
+        """Back to the start of the session (loco-changed fires again)."""
+        self._now = self.start_time
+        self._frame = 0
+        self._wall_start = time.perf_counter()
+        self._overrides.clear()
+        self._loco_changed = True
+
+    def close(self):
+        self.columns = []
+        self.reader.close()
+
+    # ---- exports ----
+    def _value(self, position, frame):
+        segment_rows = self.reader.segment_rows
+        return self.columns[position][frame // segment_rows][frame % segment_rows]
+
+    def _GetControllerValue(self, control_id, mode=0):
+        control_id = _plain(control_id)
+        position = self.position_of.get(control_id)
+        if position is None:
+            return NO_VALUE
+        if mode == 1:
+            return self.reader.mins[position]
+        if mode == 2:
+            return self.reader.maxs[position]
+        if mode != 0 or not len(self.timestamps):
+            return NO_VALUE
+        frame = self.frame
+        if self._overrides:
+            if frame != self._override_frame:
+                self._overrides.clear()
+            elif control_id in self._overrides:
+                return self._overrides[control_id]
+        return self._value(position, frame)
+
+    def _GetCurrentControllerValue(self, control_id):
+        return self._GetControllerValue(control_id, 0)
+
+    def _SetControllerValue(self, control_id, value):
+        control_id, value = _plain(control_id), _plain(value)
+        self.writes.append((self.now, control_id, value))
+        self._override_frame = self.frame
+        self._overrides[control_id] = value
+
+    def _GetControllerList(self):
+        return self.controller_list
+
+    def _GetLocoName(self):
+        return self.loco_name
+
+    def _GetRailSimLocoChanged(self):
+        changed, self._loco_changed = self._loco_changed, False
+        return changed
+
+    def _GetRailSimConnected(self):
+        return True
+
+    def _IsLocoSet(self):
+        return bool(self.loco_name)
+
+    def _SetRailDriverConnected(self, value):
+        self.connected = bool(_plain(value))
+
+    def _GetRailDriverConnected(self):
+        return self.connected
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python replay.py recording.rdtl : replays as fast as possible, module wrappers vs. RailDriverClient
+    if len(sys.argv) < 2:
+        print("Usage: python replay.py recording.rdtl")
+        sys.exit(1)
+    backend = ReplayBackend(sys.argv[1])
+    client = RailDriverClient(backend)
+    frames = len(backend.timestamps)
+    width = len(backend.reader.names)
+    if not frames:
+        print(f"{backend.reader.loco_name}: no frames in {sys.argv[1]}, nothing to replay")
+        backend.close()
+        sys.exit(1)
+    print(f"{backend.reader.loco_name}: {frames} frames of {width} controllers, "
+          f"{backend.end_time - backend.start_time:.1f} s of driving")
+
+    started = time.perf_counter()
+    raw_calls = 0
+    while True:
+        for position in range(width):
+            backend.GetControllerValue(backend.reader.ids[position], 0)
+        raw_calls += width
+        if not backend.step():
+            break
+    raw = (time.perf_counter() - started) / raw_calls
+
+    backend.rewind()
+    started = time.perf_counter()
+    calls = 0
+    while True:
+        for position in range(width):
+            get_controller_value(backend, backend.reader.ids[position], 0)
+        calls += width
+        if not backend.step():
+            break
+    wrapper = (time.perf_counter() - started) / calls
+
+    backend.rewind()
+    started = time.perf_counter()
+    while True:
+        client.read_snapshot()
+        if not backend.step():
+            break
+    elapsed = time.perf_counter() - started
+    print(f"backend alone:         {raw * 1e9:8.0f} ns/value")
+    print(f"module wrapper:        {wrapper * 1e9:8.0f} ns/value ({(wrapper - raw) * 1e9:.0f} ns wrapper overhead)")
+    print(f"client.read_snapshot:  {elapsed / frames * 1e6:8.1f} us/frame, "
+          f"{frames / elapsed:,.0f} frames/s ({(backend.end_time - backend.start_time) / elapsed:,.0f}x real time)")
+    backend.close()
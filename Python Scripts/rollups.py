@@ -0,0 +1,308 @@
+# Multi-resolution rollups of the snapshot stream: min, max, mean and last per controller for
+# 1 s, 10 s and 1 min buckets, so dashboards never need the raw 100 Hz values.
+#   rollups = Rollups.from_layout(client.read_layout())
+#   rollups.add_snapshot(client.read_snapshot())                # per sample
+#   rollups.query(time.time() - 600, time.time())               # buckets of the finest fitting resolution
+#   rollups.series("SpeedometerMPH", start, end, resolution=10)
+# Each sample only updates the current bucket of the finest resolution (elementwise min/max/sum
+# over the controller vector). A finished bucket is merged into the next resolution once, so the
+# cost per sample doesn't depend on how many resolutions there are or how long the session is.
+# Every resolution keeps at most a fixed number of buckets in a ring; older buckets are overwritten.
+# The rings grow as buckets are written, so a short session or a coarse resolution that hasn't
+# filled up yet only takes what it holds (20 bytes per bucket and controller when full).
+
+import operator
+import sys
+import threading
+import time
+from array import array
+from collections import namedtuple
+from itertools import repeat
+
+from RailDriverData import RailDriverClient, log
+
+# ===============================
+# Global Configuration
+# ===============================
+# (bucket seconds, buckets kept): 1 s for 10 minutes, 10 s for an hour, 1 min for a day
+# (at most 42 KB per controller; pass longer retention for long-term dashboards)
+DEFAULT_RESOLUTIONS = ((1.0, 600), (10.0, 360), (60.0, 1440))
+
+Bucket = namedtuple("Bucket", ["start", "count", "mins", "maxs", "means", "lasts"])
+
+# ===============================
+# One resolution
+# ===============================
+class Rollup:
+    """
+    Buckets of one resolution in a ring of up to capacity slots. Slot i holds bucket number n
+    (start n * seconds) with (n - origin) % capacity == i, origin being the first bucket number
+    written; numbers tells which one, -1 for none. Slots are allocated as they are first used.
+    """
+
+    def __init__(self, seconds, capacity, width):
+        self.seconds = seconds
+        self.capacity = capacity
+        self.width = width
+        self.numbers = array('q')
+        self.counts = array('I')
+        self.mins = array('f')
+        self.maxs = array('f')
+        self.sums = array('d')
+        self.lasts = array('f')
+        self.origin = None
+        self.current = -1  # newest bucket number
+        self.late = 0      # samples older than their bucket's slot, dropped
+
+    def _slot(self, number):
+        """The slot of bucket number, None if it isn't kept."""
+        if self.origin is None or number <= self.current - self.capacity:
+            return None
+        slot = (number - self.origin) % self.capacity
+        if slot >= len(self.numbers) or self.numbers[slot] != number:
+            return None
+        return slot
+
+    def _grow(self, slots):
+        """Allocates slots up to (excluding) slots."""
+        added = slots - len(self.numbers)
+        self.numbers.extend(repeat(-1, added))
+        self.counts.extend(repeat(0, added))
+        values = added * self.width
+        self.mins.extend(repeat(0.0, values))
+        self.maxs.extend(repeat(0.0, values))
+        self.sums.extend(repeat(0.0, values))
+        self.lasts.extend(repeat(0.0, values))
+
+    @property
+    def nbytes(self):
+        """Memory taken by the buckets."""
+        return sum(len(buffer) * buffer.itemsize
+                   for buffer in (self.numbers, self.counts, self.mins, self.maxs, self.sums, self.lasts))
+
+    def add(self, timestamp, values):
+        """One sample (array('f') of width). Returns the bucket number it closed, or None."""
+        return self.merge(timestamp, 1, values, values, values, values)
+
+    def merge(self, timestamp, count, mins, maxs, sums, lasts):
+        """count samples summarized as elementwise mins/maxs/sums/lasts. Returns the bucket number closed, or None."""
+        number = int(timestamp // self.seconds)
+        slot = self._slot(number)
+        if slot is not None:
+            start = slot * self.width
+            end = start + self.width
+            self.counts[slot] += count
+            self.mins[start:end] = array('f', map(min, self.mins[start:end], mins))
+            self.maxs[start:end] = array('f', map(max, self.maxs[start:end], maxs))
+            self.sums[start:end] = array('d', map(operator.add, self.sums[start:end], sums))
+            if number == self.current:
+                self.lasts[start:end] = array('f', lasts)
+            return None
+        if number < self.current:
+            self.late += count
+            return None
+        closed = self.current if self.current >= 0 else None
+        if self.origin is None:
+            self.origin = number
+        slot = (number - self.origin) % self.capacity
+        if slot >= len(self.numbers):
+            self._grow(slot + 1)
+        start = slot * self.width
+        end = start + self.width
+        self.current = number
+        self.numbers[slot] = number
+        self.counts[slot] = count
+        self.mins[start:end] = array('f', mins)
+        self.maxs[start:end] = array('f', maxs)
+        self.sums[start:end] = array('d', sums)
+        self.lasts[start:end] = array('f', lasts)
+        return closed
+
+    def raw(self, number):
+        """(count, mins, maxs, sums, lasts) of a bucket as array slices, None if it isn't kept."""
+        slot = self._slot(number)
+        if slot is None:
+            return None
+        start = slot * self.width
+        end = start + self.width
+        return (self.counts[slot], self.mins[start:end], self.maxs[start:end],
+                self.sums[start:end], self.lasts[start:end])
+
+    def bucket(self, number):
+        """A kept bucket as Bucket (means instead of sums), None if it isn't kept."""
+        raw = self.raw(number)
+        if raw is None:
+            return None
+        count, mins, maxs, sums, lasts = raw
+        return Bucket(number * self.seconds, count, mins, maxs, array('f', (total / count for total in sums)), lasts)
+
+    @property
+    def oldest(self):
+        """Start of the oldest bucket still in the ring (nothing older is kept), None if empty."""
+        if self.current < 0:
+            return None
+        return max(self.current - self.capacity + 1, self.origin) * self.seconds
+
+    def numbers_between(self, start, end):
+        """Numbers of the buckets overlapping [start, end) that are still kept, oldest first."""
+        if self.current < 0:
+            return []
+        first = max(int(start // self.seconds), self.current - self.capacity + 1)
+        last = min(int(-(-end // self.seconds)) - 1, self.current)
+        return [number for number in range(first, last + 1) if self._slot(number) is not None]
+
+# ===============================
+# All resolutions
+# ===============================
+class Rollups:
+    """
+    Rollups of one controller layout at several resolutions, finest first. Thread safe: one thread
+    can add while others query. Coarser resolutions contain everything up to the last finished
+    bucket of the resolution below them; query() picks the finest one that covers the range.
+    """
+
+    def __init__(self, names, resolutions=DEFAULT_RESOLUTIONS, layout=None):
+        self.resolutions = tuple(resolutions)
+        self._lock = threading.Lock()
+        self._reset(names, layout)
+
+    def _reset(self, names, layout):
+        """Empty rollups for names (with the lock held, or before anyone else has the object)."""
+        self.names = list(names)
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.layout = layout
+        self.levels = [Rollup(seconds, capacity, len(self.names)) for seconds, capacity in self.resolutions]
+        self.samples = 0
+        self.first = None  # timestamp of the oldest sample
+
+    @classmethod
+    def from_layout(cls, layout, resolutions=DEFAULT_RESOLUTIONS):
+        return cls(layout.names, resolutions, layout)
+
+    def add(self, timestamp, values):
+        """One sample: timestamp (time.time()) and an array('f') with a value per name."""
+        with self._lock:
+            self._add(timestamp, values)
+
+    def _add(self, timestamp, values):
+        self.samples += 1
+        if self.first is None or timestamp < self.first:
+            self.first = timestamp
+        finest = self.levels[0]
+        late = finest.late
+        closed = finest.add(timestamp, values)
+        if int(timestamp // finest.seconds) < finest.current and finest.late == late:
+            # late, into a finished bucket: that one was merged upwards already, so the sample goes up by itself
+            for level in self.levels[1:]:
+                level.add(timestamp, values)
+            return
+        for lower, upper in zip(self.levels, self.levels[1:]):
+            if closed is None:
+                break
+            raw = lower.raw(closed)
+            if raw is None:
+                break
+            closed = upper.merge(closed * lower.seconds, *raw)
+
+    def add_snapshot(self, snapshot):
+        """A Snapshot. A different layout (loco change) starts the rollups over for the new one."""
+        with self._lock:
+            if self.layout is not None and snapshot.layout is not self.layout:
+                log(2, "Loco changed, rollups start over")
+                self._reset(snapshot.layout.names, snapshot.layout)
+            self._add(snapshot.timestamp, snapshot.values)
+
+    def level(self, start, resolution=None):
+        """
+        The Rollup for resolution (seconds), or the finest one that still has buckets from start.
+        A start before the first sample counts as the first sample, so a range reaching back before
+        the session doesn't fall back to the coarsest resolution; the bucket start falls into may
+        already be gone (at most one bucket of the range).
+        """
+        if resolution is not None:
+            for level in self.levels:
+                if level.seconds == resolution:
+                    return level
+            raise ValueError(f"no {resolution} s resolution, there are {[level.seconds for level in self.levels]}")
+        if self.first is not None:
+            start = max(start, self.first)
+        for level in self.levels:
+            oldest = level.oldest
+            if oldest is not None and oldest < start + level.seconds:
+                return level
+        return self.levels[-1]
+
+    def query(self, start, end, resolution=None):
+        """Buckets overlapping [start, end), oldest first, from level(start, resolution)."""
+        with self._lock:
+            level = self.level(start, resolution)
+            return [level.bucket(number) for number in level.numbers_between(start, end)]
+
+    def series(self, name, start, end, resolution=None):
+        """One controller over [start, end): {"start", "min", "max", "mean", "last"} lists, for plotting."""
+        position = self.index[name]
+        buckets = self.query(start, end, resolution)
+        return {
+            "start": [bucket.start for bucket in buckets],
+            "min": [bucket.mins[position] for bucket in buckets],
+            "max": [bucket.maxs[position] for bucket in buckets],
+            "mean": [bucket.means[position] for bucket in buckets],
+            "last": [bucket.lasts[position] for bucket in buckets],
+        }
+
+    def summary(self, start, end, resolution=None):
+        """The buckets of [start, end) merged into one Bucket (None if there are none)."""
+        with self._lock:
+            level = self.level(start, resolution)
+            raws = [level.raw(number) for number in level.numbers_between(start, end)]
+            if not raws:
+                return None
+            count, mins, maxs, sums, lasts = raws[0]
+            mins, maxs, sums = array('f', mins), array('f', maxs), array('d', sums)
+            for raw in raws[1:]:
+                count += raw[0]
+                mins = array('f', map(min, mins, raw[1]))
+                maxs = array('f', map(max, maxs, raw[2]))
+                sums = array('d', map(operator.add, sums, raw[3]))
+                lasts = raw[4]
+            return Bucket(start, count, mins, maxs, array('f', (total / count for total in sums)), lasts)
+
+    def stats(self):
+        return {
+            "samples": self.samples,
+            "late": sum(level.late for level in self.levels),
+            "buckets": {f"{level.seconds:g}s": sum(number >= 0 for number in level.numbers) for level in self.levels},
+            "bytes": sum(level.nbytes for level in self.levels),
+        }
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python rollups.py [dll_path] [rate] : rolls up all controllers, prints the last minute of speed every 10 s
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    period = 1.0 / (float(sys.argv[2]) if len(sys.argv) > 2 else 50.0)
+    snapshot = client.read_snapshot()
+    rollups = Rollups.from_layout(snapshot.layout)
+    name = next((name for name in snapshot.layout.names if name.startswith("Speedometer")), snapshot.layout.names[0])
+    deadline = report = time.perf_counter()
+    try:
+        while True:
+            rollups.add_snapshot(client.read_snapshot())
+            now = time.perf_counter()
+            if now >= report:
+                report += 10.0
+                series = rollups.series(name, time.time() - 60, time.time(), resolution=10.0)
+                print(f"{name}, last minute in 10 s buckets:")
+                for start, low, high, mean in zip(series["start"], series["min"], series["max"], series["mean"]):
+                    print(f"  {time.strftime('%H:%M:%S', time.localtime(start))}  "
+                          f"min {low:8.2f}  max {high:8.2f}  mean {mean:8.2f}")
+            deadline += period
+            if deadline > now:
+                time.sleep(deadline - now)
+            else:
+                deadline = now
+    except KeyboardInterrupt:
+        print(rollups.stats())
@@ -0,0 +1,201 @@
+# Background sampler: polls selected controllers on its own thread at a fixed rate.
+#   Deadlines are absolute (start + n * period), so timing errors don't add up like with time.sleep() loops.
+#   Samples go into a preallocated ring buffer. Readers never block the poller (no locks):
+#   the writer fills a slot first and publishes it by bumping a sequence number afterwards.
+
+import sys
+import threading
+import time
+from array import array
+from itertools import repeat
+
+from RailDriverData import RailDriverClient
+
+# ===============================
+# Ring Buffer
+# ===============================
+class RingBuffer:
+    """
+    capacity frames of width float32 values plus a timestamp each, allocated once.
+
+    One writer, any number of readers. sequence is the number of frames published so far,
+    frame n lives in slot n % capacity. A reader copies a slot and then checks the writer
+    hasn't come round to it meanwhile; if it did, the copy is retried.
+    """
+
+    def __init__(self, capacity, width):
+        if capacity < 2:
+            raise ValueError("capacity must be at least 2")
+        self.capacity = capacity
+        self.width = width
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.data = array('f', bytes(4 * capacity * width))
+        self._view = memoryview(self.data)
+        self.sequence = 0
+
+    def publish(self, timestamp, values):
+        """Writer side: stores one frame (values must be an array('f') of width) and publishes it."""
+        slot = self.sequence % self.capacity
+        start = slot * self.width
+        self._view[start:start + self.width] = values
+        self.timestamps[slot] = timestamp
+        self.sequence += 1  # a single store, so readers see either the old or the new count
+
+    def latest(self, out=None):
+        """
+        Copies the newest frame into out (an array('f') of width, allocated if None).
+        Returns (sequence, timestamp, out), or None if nothing was published yet.
+        """
+        if out is None:
+            out = array('f', bytes(4 * self.width))
+        out_view = memoryview(out)
+        while True:
+            sequence = self.sequence
+            if sequence == 0:
+                return None
+            slot = (sequence - 1) % self.capacity
+            start = slot * self.width
+            out_view[:] = self._view[start:start + self.width]
+            timestamp = self.timestamps[slot]
+            # the slot is only rewritten once the writer is capacity - 1 frames further
+            if self.sequence - sequence < self.capacity - 1:
+                return sequence, timestamp, out
+
+    def since(self, sequence):
+        """
+        Frames published after sequence, oldest first, as (sequence, timestamp, array('f')).
+        Frames already overwritten are skipped; check the first sequence returned to notice.
+        """
+        frames = []
+        newest = self.sequence
+        first = max(sequence + 1, newest - self.capacity + 2, 1)
+        for number in range(first, newest + 1):
+            slot = (number - 1) % self.capacity
+            start = slot * self.width
+            values = array('f', self._view[start:start + self.width])
+            timestamp = self.timestamps[slot]
+            if self.sequence - number < self.capacity - 1:
+                frames.append((number, timestamp, values))
+        return frames
+
+# ===============================
+# Sampler
+# ===============================
+class Sampler:
+    """
+    Polls GetControllerValue(id, 0) for the given IDs rate times per second on a daemon thread.
+
+    The thread waits on an Event until spin seconds before each deadline and busy-waits the rest,
+    which keeps jitter well below the OS sleep granularity. Late samples are taken immediately;
+    deadlines missed completely are skipped (and counted) instead of being caught up in a burst.
+    """
+
+    def __init__(self, client, controller_ids, rate=50.0, capacity=1024, spin=0.001):
+        self.client = client
+        self.controller_ids = array('i', controller_ids)
+        self.period = 1.0 / rate
+        self.spin = spin
+        self.buffer = RingBuffer(capacity, len(self.controller_ids))
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.samples = 0
+        self.missed_deadlines = 0
+        self.started = None
+        self.stopped = None
+        self._jitter_sum = 0.0
+        self._jitter_max = 0.0
+
+    def start(self):
+        """Starts the sampling thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._reset_stats()
+        self._thread = threading.Thread(target=self._run, name="RailDriverSampler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stops the sampling thread and waits for it."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+            self.stopped = time.perf_counter()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def latest(self, out=None):
+        """Newest sample, see RingBuffer.latest()."""
+        return self.buffer.latest(out)
+
+    def stats(self):
+        """Achieved rate, jitter (lateness of each sample vs. its deadline) and missed deadlines."""
+        elapsed = (self.stopped or time.perf_counter()) - self.started if self.started else 0.0
+        samples = self.samples
+        return {
+            "target_rate_hz": 1.0 / self.period,
+            "achieved_rate_hz": samples / elapsed if elapsed > 0 else 0.0,
+            "samples": samples,
+            "missed_deadlines": self.missed_deadlines,
+            "jitter_mean_ms": self._jitter_sum / samples * 1000 if samples else 0.0,
+            "jitter_max_ms": self._jitter_max * 1000,
+        }
+
+    def _run(self):
+        get = self.client.GetControllerValue
+        ids = self.controller_ids
+        period = self.period
+        publish = self.buffer.publish
+        wait = self._stop.wait
+        clock = time.perf_counter
+        self.started = deadline = clock()
+        while not self._stop.is_set():
+            remaining = deadline - clock()
+            if remaining > self.spin:
+                if wait(remaining - self.spin):
+                    break
+                continue
+            while clock() < deadline:
+                pass
+            now = clock()
+            publish(time.time(), array('f', map(get, ids, repeat(0))))
+            lateness = now - deadline
+            self.samples += 1
+            self._jitter_sum += lateness
+            if lateness > self._jitter_max:
+                self._jitter_max = lateness
+            deadline += period
+            behind = clock() - deadline
+            if behind >= period:
+                # the next deadline is late anyway (sampled right away), the ones before it are lost
+                skipped = int(behind // period)
+                self.missed_deadlines += skipped
+                deadline += skipped * period
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python sampler.py [dll_path] [rate] : samples the first controllers for 3 s, prints the stats
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 100.0
+    controllers = client.get_controller_list() or []
+    ids = list(range(min(len(controllers), 16)))
+    with Sampler(client, ids, rate=rate) as sampler:
+        time.sleep(3)
+    latest = sampler.latest()
+    if latest:
+        sequence, timestamp, values = latest
+        print(f"Sample #{sequence}: " + ", ".join(f"{controllers[i]}={v:.2f}" for i, v in zip(ids, values)))
+    for key, value in sampler.stats().items():
+        print(f"{key:>18}: {value:.3f}" if isinstance(value, float) else f"{key:>18}: {value}")
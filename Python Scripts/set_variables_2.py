@@ -1,31 +1,13 @@
-# VERSION: 2.1 with state-aware toggle with get_controller_value()
+# VERSION: 2.2 with state-aware toggle, keys bound declaratively (key_bindings.py)
 
 import ctypes
-import os
-import time
-import keyboard  # Requires `pip install keyboard`
 import sys  # sys module for explicit exiting
+from RailDriverData import RailDriverClient, load_raildriver_dll
+from connection import ConnectionSupervisor
+from key_bindings import KeyBindings  # hooks the keyboard, requires `pip install keyboard`
 
 # RailDriver DLL path
-DLL_NAME = r"C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dlcl"
-
-# Load RailDriver DLL
-def load_raildriver_dll(dll_name=DLL_NAME):
-    try:
-        raildriver = ctypes.CDLL(dll_name)
-        print(f"[INFO] loaded RailDriver(64).dll")
-        time.sleep(1)  # Testing if it stops the loading error
-        return raildriver
-    except OSError as e:
-        raise RuntimeError(f"Error loading {dll_name}: {e}. Ending...")
-
-
-def set_controller_value(raildriver, control_id, value):
-    if raildriver:
-        try:
-            raildriver.SetControllerValue(control_id, ctypes.c_float(value))
-        except Exception as e:
-            print(f"Error setting controller {control_id}: {e}")
+DLL_NAME = r"C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dll"
 
 def get_controller_list(raildriver):
     """Retrieves the controller list."""
@@ -44,91 +26,46 @@ def get_controller_list(raildriver):
     except Exception as e:
         raise RuntimeError(f"Failed controller list: {e}")
 
-def get_controller_value(raildriver, control_id):
-    """Retrieves the current value of a controller (mode 0)."""
-    if not raildriver:
-        print(f"[ERROR] get_controller_value.")
-        #return None
-        raise RuntimeError("[ERROR] get_controller_value.")
-    try:
-        GetControllerValue = raildriver.GetControllerValue
-        GetControllerValue.restype = ctypes.c_float
-        value = GetControllerValue(control_id, 0)
-        return value
-    except Exception as e:
-        print(f"[ERROR] Error in get_controller_value, ID {control_id}: {e}")
-        return None
-
-def get_controller_id_by_name(raildriver, target_names):
-    """
-    Retrieves controller IDs based on target names.
-
-    Args:
-        raildriver: The loaded RailDriver from DLL.
-        target_names: Dict with control names to search for.
-
-    Returns:
-        A dict with keys as target_names, values as controller IDs (None if not found).
-    """
-    if not raildriver:
-        return {name: None for name in target_names}
-    try:
-        controllers = get_controller_list(raildriver)
-        found_controls = {name: None for name in target_names}
-        for i, controller_name in enumerate(controllers):
-            for target_name in target_names:
-                if target_name in controller_name:
-                    found_controls[target_name] = i
-                    print(f"Found {target_name} at ID: {i}, Name: {controller_name}")
-                    break
-        return found_controls
-    except RuntimeError as e:
-        raise  # Propagate the critical error
-    except Exception as e:
-        print(f"Error in get_controller_id_by_name: {e}")
-        return {name: None for name in target_names}
-
-# Define controls to find.
-controls_to_find = {
-    "Wipers": None,
-    "EmergencyBrake": None,
-    "Horn": None,
-    "SimpleChangeDirection": None,
-}
+# Key bindings: key -> controller action (see key_bindings.py for the actions)
+KEY_BINDINGS = [
+    {"key": "2", "action": "toggle", "controller": "Wipers"},
+    {"key": "3", "action": "toggle", "controller": "EmergencyBrake"},
+    {"key": "4", "action": "toggle", "controller": "Horn", "threshold": 0.1},
+    {"key": "5", "action": "set", "controller": "SimpleChangeDirection", "value": -1.0},
+    {"key": "6", "action": "set", "controller": "SimpleChangeDirection", "value": 0.0},
+    {"key": "7", "action": "set", "controller": "SimpleChangeDirection", "value": 1.0},
+]
 
-raildriver_lib = load_raildriver_dll()
+raildriver_lib = load_raildriver_dll(DLL_NAME)
 
 if raildriver_lib:
-    try:
-        SetRailDriverConnected = raildriver_lib.SetRailDriverConnected
-        SetRailDriverConnected.argtypes = [ctypes.c_bool]
-        SetRailDriverConnected.restype = None
-    except AttributeError as e:
-        print(f"[ERROR] Could not find SetRailDriverConnected function in RailDriver64.dll: {e}")
+    # waits for the sim with backoff instead of a fixed sleep, keeps the connection asserted
+    supervisor = ConnectionSupervisor(RailDriverClient(raildriver_lib), keepalive_interval=1.0)
+    if supervisor.client.SetRailDriverConnected is None:
+        print(f"[ERROR] Could not find SetRailDriverConnected function in RailDriver64.dll")
         sys.exit(1)
 
 try:
     if not raildriver_lib:
         raise RuntimeError("RailDriver DLL not loaded. Aborting...")
 
-    # Initially try to establish the connection
-    if raildriver_lib:
-        try:
-            SetRailDriverConnected(True)
-        except Exception as e:
-            print(f"[WARNING] Error calling SetRailDriverConnected initially: {e}")
+    # Establish the connection and wait until the controller list is there
+    if not supervisor.wait_ready(timeout=30):
+        raise RuntimeError(f"Train Simulator not ready ({supervisor.state}). Is a scenario running?")
 
-    # Get the controller IDs
-    controls = get_controller_id_by_name(raildriver_lib, controls_to_find)
+    # Resolve the controller IDs once; key presses are then dispatched from keyboard hooks
+    bindings = KeyBindings(supervisor.client, KEY_BINDINGS, controllers=get_controller_list(raildriver_lib))
 
     # Check if all required controls were found
-    if not all(value is not None for value in controls.values()):
+    if bindings.unresolved:
         print("[ERROR]: Not all required controls found:")
-        for control_name, control_id in controls.items():
-            print(f"    {control_name}: {control_id}")
+        for control_name in bindings.unresolved:
+            print(f"    {control_name}: None")
         raise RuntimeError("Not all required controls found :(")
 
     print("\nControls Found:")
+    controls = {binding.controller: binding.controller_id
+                for key_bindings in bindings.bindings.values() for binding in key_bindings}
     for control_name, control_id in controls.items():
         print(f"{control_name}: {control_id}")
 
@@ -137,93 +74,9 @@ try:
     print("'5' or '6' or '7' to play with SimpleChangeDirection")
     print("'0' to exit.")
 
-    while True:
-        if raildriver_lib:
-            try:
-                SetRailDriverConnected(True)
-            except Exception as e:
-                print(f"[ERROR] SetRailDriverConnected: {e}")
-
-        # check the status of the controls and toggle accordingly
-        def toggle_control(control_name, control_id, on_value=1.0, off_value=0.0, threshold=0.5):
-            if control_id is not None:
-                current_value = get_controller_value(raildriver_lib, control_id)
-                if current_value is not None:
-                    new_value = off_value if current_value > threshold else on_value
-                    set_controller_value(raildriver_lib, control_id, new_value)
-                    print(f"{control_name}: {'ON' if new_value > threshold else 'OFF'} ({new_value:.2f})")
-
-        if keyboard.is_pressed("2"):
-            if controls.get("Wipers") is not None:
-                current_value = get_controller_value(raildriver_lib, controls["Wipers"])
-                if current_value is not None:
-                    new_value = 1.0 if current_value < 0.5 else 0.0
-                    set_controller_value(raildriver_lib, controls["Wipers"], new_value)
-                    print(f"Wipers: {'ON' if new_value > 0.5 else 'OFF'} ({new_value:.2f}), Current Value: {get_controller_value(raildriver_lib, controls['Wipers']):.2f}")
-                else:
-                    print("[WARNING] Could not read current Wipers value.")
-            time.sleep(0.3)
-
-        if keyboard.is_pressed("3"):
-            if controls.get("EmergencyBrake") is not None:
-                current_value = get_controller_value(raildriver_lib, controls["EmergencyBrake"])
-                if current_value is not None:
-                    new_value = 1.0 if current_value < 0.5 else 0.0
-                    set_controller_value(raildriver_lib, controls["EmergencyBrake"], new_value)
-                    print(f"EmergencyBrake: {'ON' if new_value > 0.5 else 'OFF'} ({new_value:.2f}), Current Value: {get_controller_value(raildriver_lib, controls['EmergencyBrake']):.2f}")
-                else:
-                    print("[WARNING] Could not read current EmergencyBrake value.")
-            time.sleep(0.3)
-
-        if keyboard.is_pressed("4"):
-            if controls.get("Horn") is not None:
-                current_value = get_controller_value(raildriver_lib, controls["Horn"])
-                if current_value is not None:
-                    new_value = 1.0 if current_value < 0.1 else 0.0 
-                    set_controller_value(raildriver_lib, controls["Horn"], new_value)
-                    print(f"Horn: {'ON' if new_value > 0.1 else 'OFF'} ({new_value:.2f}), Current Value: {get_controller_value(raildriver_lib, controls['Horn']):.2f}")
-                else:
-                    print("[WARNING] Could not read current Horn value.")
-            time.sleep(0.3)
-
-        if keyboard.is_pressed("5"): # # value = (-1)
-            if controls.get("SimpleChangeDirection") is not None:
-                target_value = -1.0
-                set_controller_value(raildriver_lib, controls["SimpleChangeDirection"], target_value)
-                current_value = get_controller_value(raildriver_lib, controls["SimpleChangeDirection"])
-                if current_value is not None:
-                    print(f"SimpleChangeDirection: Set to {target_value:.1f}, Active Value: {current_value:.1f}")
-                else:
-                    print(f"[WARNING] SimpleChangeDirection: Set to {target_value:.1f}, cannot read value.")
-            time.sleep(0.3)
-
-        if keyboard.is_pressed("6"): # value = (0)
-            if controls.get("SimpleChangeDirection") is not None:
-                target_value = 0.0
-                set_controller_value(raildriver_lib, controls["SimpleChangeDirection"], target_value)
-                current_value = get_controller_value(raildriver_lib, controls["SimpleChangeDirection"])
-                if current_value is not None:
-                    print(f"SimpleChangeDirection: Set to {target_value:.1f}, Active Value: {current_value:.1f}")
-                else:
-                    print(f"[WARNING] SimpleChangeDirection: Set to {target_value:.1f}, cannot read value.")
-            time.sleep(0.3)
-
-        if keyboard.is_pressed("7"): # value = (1)
-            if controls.get("SimpleChangeDirection") is not None:
-                target_value = 1.0
-                set_controller_value(raildriver_lib, controls["SimpleChangeDirection"], target_value)
-                current_value = get_controller_value(raildriver_lib, controls["SimpleChangeDirection"])
-                if current_value is not None:
-                    print(f"SimpleChangeDirection: Set to {target_value:.1f}, Active Value: {current_value:.1f}")
-                else:
-                    print(f"[WARNING] SimpleChangeDirection: Set to {target_value:.1f}, cannot read value..")
-            time.sleep(0.3)
-
-        if keyboard.is_pressed("0"):  # Exit condition
-            print("\"0\" pressed, exit program...")
-            break
-
-        time.sleep(0.05) # Small delay to avoid busy-waiting
+    # No polling and no blocking debounce: the keepalive keeps running while keys are handled
+    bindings.run(stop_key="0", tick=supervisor.tick)  # SetRailDriverConnected only every keepalive_interval
+    print("\"0\" pressed, exit program...")
 
 except RuntimeError as e:
     print(f"[ERROR]: {e}")
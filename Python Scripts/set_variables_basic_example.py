@@ -4,20 +4,13 @@ import os
 import time
 import keyboard  # Requires `pip install keyboard`
 import sys  # Import the sys module for explicit exiting
+from controller_resolver import ControllerResolver
+from RailDriverData import RailDriverClient, load_raildriver_dll
+from connection import ConnectionSupervisor
 
 # RailDriver DLL path
 DLL_NAME = r"C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dll"
 
-# Load RailDriver DLL
-def load_raildriver_dll(dll_name=DLL_NAME):
-    try:
-        raildriver = ctypes.CDLL(dll_name)
-        print(f"[INFO] loaded RailDriver(64).dll")
-        time.sleep(1)  # Small delay after loading
-        return raildriver
-    except OSError as e:
-        raise RuntimeError(f"Error loading {dll_name}: {e}. Ending...")
-
 # Set controller values
 def set_controller_value(raildriver, control_id, value):
     if raildriver:
@@ -58,14 +51,8 @@ def get_controller_id_by_name(raildriver, target_names):
         return {name: None for name in target_names}
     try:
         controllers = get_controller_list(raildriver)
-        found_controls = {name: None for name in target_names}
-        for i, controller_name in enumerate(controllers):
-            for target_name in target_names:
-                if target_name in controller_name:
-                    found_controls[target_name] = i
-                    print(f"Found {target_name} at ID: {i}, Name: {controller_name}")
-                    break
-        return found_controls
+        # indexed lookup (exact, case-insensitive, alias, prefix, token), warns on ambiguous names
+        return ControllerResolver(controllers).resolve_ids(target_names)
     except RuntimeError as e:
         raise  # Propagate the critical error
     except Exception as e:
@@ -82,27 +69,22 @@ controls_to_find = {
 # Initialize controller states
 controller_states = {control: 0.0 for control in controls_to_find}
 
-raildriver_lib = load_raildriver_dll()
+raildriver_lib = load_raildriver_dll(DLL_NAME)
 
 if raildriver_lib:
-    try:
-        SetRailDriverConnected = raildriver_lib.SetRailDriverConnected
-        SetRailDriverConnected.argtypes = [ctypes.c_bool]
-        SetRailDriverConnected.restype = None
-    except AttributeError as e:
-        print(f"[ERROR] Could not find SetRailDriverConnected function in RailDriver64.dll: {e}")
+    # waits for the sim with backoff instead of a fixed sleep, keeps the connection asserted
+    supervisor = ConnectionSupervisor(RailDriverClient(raildriver_lib), keepalive_interval=1.0)
+    if supervisor.client.SetRailDriverConnected is None:
+        print(f"[ERROR] Could not find SetRailDriverConnected function in RailDriver64.dll")
         sys.exit(1)
 
 try:
     if not raildriver_lib:
         raise RuntimeError("RailDriver DLL not loaded. Aborting...")
 
-    # Initially try to establish the connection
-    if raildriver_lib:
-        try:
-            SetRailDriverConnected(True)
-        except Exception as e:
-            print(f"[WARNING] Error calling SetRailDriverConnected initially: {e}")
+    # Establish the connection and wait until the controller list is there
+    if not supervisor.wait_ready(timeout=30):
+        raise RuntimeError(f"Train Simulator not ready ({supervisor.state}). Is a scenario running?")
 
     # Get the controller IDs
     controls = get_controller_id_by_name(raildriver_lib, controls_to_find)
@@ -122,11 +104,7 @@ try:
     print("Press '0' to exit.")
 
     while True:
-        if raildriver_lib:
-            try:
-                SetRailDriverConnected(True)
-            except Exception as e:
-                print(f"[WARNING] Error calling SetRailDriverConnected in loop: {e}")
+        supervisor.tick()  # SetRailDriverConnected only every keepalive_interval
 
         if keyboard.is_pressed("2"):
             if controls.get("Wipers") is not None:
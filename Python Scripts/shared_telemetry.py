@@ -0,0 +1,455 @@
+# Telemetry fan-out over shared memory: one process owns the DLL, any number of others read.
+#   The publisher polls snapshots (RailDriverClient.read_snapshot()) at a fixed rate and writes them
+#   into a multiprocessing.shared_memory segment. Subscribers map the segment read-only and get the
+#   newest frame without touching the DLL, either copied into their own array (latest()) or as a
+#   zero-copy view of the shared memory (frame()).
+#
+# Segment layout (native byte order, every part 64-byte aligned):
+#   header  : magic "RDSHM001", version, max_width, layout capacity, latest frame number,
+#             layout generation (begin/end), publisher pid
+#   layout  : JSON length (u32) + JSON (names, ids, mins, maxs, controller_count, loco_name)
+#   2 slots : begin (u64), end (u64), timestamp (f64), layout generation (u64), width (u32),
+#             padding to 64 bytes, then max_width float32 values
+# Frame n is written into slot n % 2 (double buffer) under a seqlock: the writer stores begin = n,
+# the data, then end = n, then publishes latest = n. A reader copies the slot and accepts it if
+# end == n before and begin == n after the copy; otherwise the writer came round and it retries.
+# The writer always fills the other slot first, so a reader has a whole period to read a frame.
+
+import json
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from multiprocessing import shared_memory
+
+from RailDriverData import ControllerLayout, RailDriverClient, Snapshot, log
+
+# ===============================
+# Global Configuration
+# ===============================
+DEFAULT_NAME = "raildriver_telemetry"
+MAGIC = b"RDSHM001"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("=8sIII")   # magic, version, max_width, layout capacity
+HEADER_SIZE = 64
+SLOT_HEADER_SIZE = 64
+DEFAULT_MAX_WIDTH = 1024 + 9       # the stub's controller maximum plus the virtual controllers
+# u64 positions in the header / a slot header
+LATEST, LAYOUT_BEGIN, LAYOUT_END, PUBLISHER_PID = 3, 4, 5, 6
+BEGIN, END, TIMESTAMP, GENERATION, WIDTH = 0, 1, 2, 3, 4
+
+def _align(size, alignment=64):
+    return (size + alignment - 1) // alignment * alignment
+
+def _layout_capacity(max_width):
+    return _align(4 + 4096 + 160 * max_width)
+
+def _slot_size(max_width):
+    return _align(SLOT_HEADER_SIZE + 4 * max_width)
+
+_attach_lock = threading.Lock()
+
+def _attach(name):
+    """Opens an existing segment without registering it for clean-up (it belongs to the publisher)."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Before 3.13 attaching registers the segment with the resource tracker, which unlinks it when
+    # this process exits. Unregistering afterwards would also drop the publisher's registration
+    # (child processes share its tracker), so registration of this one segment is skipped while
+    # attaching. The lock keeps two attaches from restoring each other's patch.
+    from multiprocessing import resource_tracker
+    with _attach_lock:
+        register = resource_tracker.register
+
+        def register_others(resource, rtype):
+            if rtype != "shared_memory" or resource.lstrip("/") != name.lstrip("/"):
+                register(resource, rtype)
+        resource_tracker.register = register_others
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def _pid_alive(pid):
+    """True if a process with this pid is running."""
+    if pid <= 0:
+        return False
+    if os.name == "nt":  # os.kill(pid, 0) would terminate it on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        try:
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))) and exit_code.value == 259
+        finally:
+            kernel32.CloseHandle(handle)  # 259: STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by another user
+    return True
+
+class _Segment:
+    """Typed views of a mapped segment. Views are released in close(), before the mapping."""
+
+    def __init__(self, shm, max_width, readonly):
+        self.shm = shm
+        self.max_width = max_width
+        buf = shm.buf.toreadonly() if readonly else shm.buf
+        self.layout_capacity = _layout_capacity(max_width)
+        self.header = buf[:HEADER_SIZE].cast('Q')
+        self.layout_data = buf[HEADER_SIZE:HEADER_SIZE + self.layout_capacity]
+        slots_offset = HEADER_SIZE + self.layout_capacity
+        slot_size = _slot_size(max_width)
+        self.slot_headers = []
+        self.slot_times = []
+        self.slot_values = []
+        for slot in range(2):
+            start = slots_offset + slot * slot_size
+            self.slot_headers.append(buf[start:start + SLOT_HEADER_SIZE].cast('Q'))
+            self.slot_times.append(buf[start:start + SLOT_HEADER_SIZE].cast('d'))
+            values_start = start + SLOT_HEADER_SIZE
+            self.slot_values.append(buf[values_start:values_start + 4 * max_width].cast('f'))
+        self._views = [self.header, self.layout_data] + self.slot_headers + self.slot_times + self.slot_values
+        self._buf = buf
+
+    @staticmethod
+    def size(max_width):
+        return HEADER_SIZE + _layout_capacity(max_width) + 2 * _slot_size(max_width)
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._views = []
+        if self._buf is not self.shm.buf:
+            self._buf.release()
+        self.shm.close()
+
+# ===============================
+# Publisher
+# ===============================
+class TelemetryPublisher:
+    """
+    Owns the DLL client and publishes a snapshot rate times per second into shared memory.
+
+    Use start()/stop() (or with) for a background thread, run() in the foreground, or publish()
+    to push snapshots you read yourself. close() removes the segment.
+    """
+
+    def __init__(self, client, name=DEFAULT_NAME, rate=50.0, max_width=DEFAULT_MAX_WIDTH):
+        self.client = client
+        self.name = name
+        self.period = 1.0 / rate
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=_Segment.size(max_width))
+        except FileExistsError:
+            # left over from a publisher that crashed (readers of it get the new data), unless
+            # its publisher is still running
+            old = _attach(name)  # not registered: this process must not remove a running publisher's segment
+            pid = 0
+            if old.size >= HEADER_SIZE and bytes(old.buf[:len(MAGIC)]) == MAGIC:
+                pid = struct.unpack_from("=Q", old.buf, PUBLISHER_PID * 8)[0]
+            old.close()
+            if pid != os.getpid() and _pid_alive(pid):
+                raise RuntimeError(f"Shared memory {name!r} is in use by the publisher with pid {pid}.")
+            old = shared_memory.SharedMemory(name=name)
+            old.close()
+            old.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=_Segment.size(max_width))
+        self.segment = _Segment(shm, max_width, readonly=False)
+        HEADER.pack_into(shm.buf, 0, MAGIC, FORMAT_VERSION, max_width, self.segment.layout_capacity)
+        self.segment.header[PUBLISHER_PID] = os.getpid()
+        self.frames = 0
+        self.missed_deadlines = 0
+        self.generation = 0
+        self._layout = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def publish(self, snapshot, loco_name=""):
+        """Writes one snapshot (and its layout, if it is a new one). Returns the frame number."""
+        segment = self.segment
+        if snapshot.layout is not self._layout:
+            self._publish_layout(snapshot.layout, loco_name)
+        width = len(snapshot.values)
+        number = segment.header[LATEST] + 1
+        slot = number & 1
+        slot_header = segment.slot_headers[slot]
+        slot_header[BEGIN] = number
+        segment.slot_times[slot][TIMESTAMP] = snapshot.timestamp
+        slot_header[GENERATION] = self.generation
+        slot_header[WIDTH] = width
+        segment.slot_values[slot][:width] = snapshot.values
+        slot_header[END] = number
+        segment.header[LATEST] = number
+        self.frames += 1
+        return number
+
+    def run(self):
+        """Polls and publishes until stop() (from another thread) or Ctrl+C."""
+        clock = time.perf_counter
+        period = self.period
+        deadline = clock()
+        while not self._stop.is_set():
+            self.publish(self.client.read_snapshot())
+            deadline += period
+            remaining = deadline - clock()
+            if remaining > 0:
+                self._stop.wait(remaining)
+            else:
+                skipped = int(-remaining // period)
+                self.missed_deadlines += skipped
+                deadline += skipped * period
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="RailDriverPublisher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """Stops publishing and removes the segment (mapped subscribers keep their old view)."""
+        self.stop()
+        if self.segment is None:
+            return
+        shm = self.segment.shm
+        self.segment.close()
+        self.segment = None
+        shm.unlink()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _publish_layout(self, layout, loco_name):
+        if len(layout) > self.segment.max_width:
+            raise ValueError(f"{len(layout)} controllers don't fit into a segment of max_width "
+                             f"{self.segment.max_width}")
+        data = json.dumps({
+            "loco_name": loco_name or (self.client.get_loco_name() if self.client else "") or "",
+            "names": list(layout.names),
+            "ids": layout.ids.tolist(),
+            "mins": [None if value != value else value for value in layout.mins],  # NaN isn't JSON
+            "maxs": [None if value != value else value for value in layout.maxs],
+            "controller_count": layout.controller_count,
+        }).encode("utf-8")
+        if 4 + len(data) > self.segment.layout_capacity:
+            raise ValueError(f"Controller layout too big for the segment ({len(data)} bytes)")
+        self.generation += 1
+        header = self.segment.header
+        header[LAYOUT_BEGIN] = self.generation
+        struct.pack_into("=I", self.segment.layout_data, 0, len(data))
+        self.segment.layout_data[4:4 + len(data)] = data
+        header[LAYOUT_END] = self.generation
+        self._layout = layout
+        log(2, "Published layout %d: %d controllers", self.generation, len(layout))
+
+# ===============================
+# Subscriber
+# ===============================
+class SharedFrame:
+    """
+    A frame read in place: values is a read-only memoryview into the shared memory, no copy.
+    Its content stays valid until the publisher has written two more frames; check consistent()
+    after using the values (or use TelemetrySubscriber.latest() to get a copy instead).
+    The view itself is released by the subscriber's next frame() call or close().
+    """
+    __slots__ = ("number", "timestamp", "layout", "values", "_slot_header")
+
+    def __init__(self, number, timestamp, layout, values, slot_header):
+        self.number = number
+        self.timestamp = timestamp
+        self.layout = layout
+        self.values = values
+        self._slot_header = slot_header
+
+    def consistent(self):
+        """True if the publisher hasn't started overwriting this frame's slot."""
+        return self._slot_header[BEGIN] == self.number
+
+    def __getitem__(self, name):
+        return self.values[self.layout.index[name]]
+
+class TelemetrySubscriber:
+    """Read-only view of a publisher's segment. Never calls the DLL."""
+
+    def __init__(self, name=DEFAULT_NAME):
+        shm = _attach(name)
+        magic, version, max_width, _ = HEADER.unpack_from(shm.buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            shm.close()
+            raise ValueError(f"Shared memory {name} is not a RailDriver telemetry segment.")
+        self.name = name
+        self.segment = _Segment(shm, max_width, readonly=True)
+        self.layout = None
+        self.loco_name = ""
+        self.generation = 0
+        self.retries = 0  # reads repeated because the publisher was writing the same slot
+        self._frame_values = None
+
+    @property
+    def latest_number(self):
+        """Number of the newest published frame (0: none yet)."""
+        return self.segment.header[LATEST]
+
+    @property
+    def publisher_pid(self):
+        return self.segment.header[PUBLISHER_PID]
+
+    def latest(self, out=None):
+        """
+        Copies the newest frame into out (array('f'), reallocated if its size doesn't fit).
+        Returns (frame number, Snapshot), or None if nothing was published yet.
+        """
+        segment = self.segment
+        while True:
+            number = segment.header[LATEST]
+            if number == 0:
+                return None
+            slot = number & 1
+            slot_header = segment.slot_headers[slot]
+            if slot_header[END] != number:
+                self.retries += 1
+                continue
+            generation = slot_header[GENERATION]
+            width = slot_header[WIDTH]
+            timestamp = segment.slot_times[slot][TIMESTAMP]
+            if out is None or len(out) != width:
+                out = array('f', bytes(4 * width))
+            memoryview(out)[:] = segment.slot_values[slot][:width]
+            if slot_header[BEGIN] != number:
+                self.retries += 1
+                continue
+            if generation > self.generation:
+                self._read_layout(generation)
+            if generation != self.generation:
+                # the layout was replaced since this frame: wait for a frame of the new one
+                self.retries += 1
+                continue
+            return number, Snapshot(timestamp, self.layout, out)
+
+    def frame(self):
+        """The newest frame as a zero-copy SharedFrame, or None if nothing was published yet."""
+        segment = self.segment
+        while True:
+            number = segment.header[LATEST]
+            if number == 0:
+                return None
+            slot = number & 1
+            slot_header = segment.slot_headers[slot]
+            if slot_header[END] != number:
+                self.retries += 1
+                continue
+            generation = slot_header[GENERATION]
+            width = slot_header[WIDTH]
+            timestamp = segment.slot_times[slot][TIMESTAMP]
+            if slot_header[BEGIN] != number:
+                self.retries += 1
+                continue
+            if generation > self.generation:
+                self._read_layout(generation)
+            if generation != self.generation:
+                # the layout was replaced since this frame: wait for a frame of the new one
+                self.retries += 1
+                continue
+            if self._frame_values is not None:
+                self._frame_values.release()
+            self._frame_values = segment.slot_values[slot][:width]
+            return SharedFrame(number, timestamp, self.layout, self._frame_values, slot_header)
+
+    def wait(self, after=0, timeout=None, poll=0.0005):
+        """Waits for a frame newer than after. Returns its number, or None on timeout."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while True:
+            number = self.segment.header[LATEST]
+            if number > after:
+                return number
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        if self._frame_values is not None:
+            self._frame_values.release()
+            self._frame_values = None
+        if self.segment is not None:
+            self.segment.close()
+            self.segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_layout(self, generation):
+        segment = self.segment
+        header = segment.header
+        while True:
+            end = header[LAYOUT_END]
+            length, = struct.unpack_from("=I", segment.layout_data, 0)
+            data = bytes(segment.layout_data[4:4 + length])
+            if header[LAYOUT_BEGIN] == end:
+                break
+        metadata = json.loads(data.decode("utf-8"))
+        nan = float("nan")
+        count = metadata["controller_count"]
+        self.layout = ControllerLayout(
+            metadata["names"], array('i', metadata["ids"]),
+            array('f', (nan if value is None else value for value in metadata["mins"])),
+            array('f', (nan if value is None else value for value in metadata["maxs"])), count)
+        self.loco_name = metadata["loco_name"]
+        self.generation = end
+        if end != generation:
+            log(2, "Layout %d replaced by %d while reading a frame, reading the next frame", generation, end)
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python shared_telemetry.py publish [dll_path] [rate] : owns the DLL and publishes until Ctrl+C
+    # python shared_telemetry.py watch                     : prints the published speed, no DLL
+    if len(sys.argv) > 1 and sys.argv[1] == "watch":
+        with TelemetrySubscriber() as subscriber:
+            number = 0
+            try:
+                while True:
+                    subscriber.wait(number)
+                    number, snapshot = subscriber.latest()
+                    age = (time.time() - snapshot.timestamp) * 1000
+                    speed = snapshot.values[snapshot.layout.index["SpeedometerMPH"]] \
+                        if "SpeedometerMPH" in snapshot.layout.index else float("nan")
+                    print(f"\rframe {number}: {subscriber.loco_name} speed {speed:6.1f}, age {age:5.1f} ms", end="")
+            except KeyboardInterrupt:
+                print()
+        sys.exit(0)
+
+    client = RailDriverClient.load(*sys.argv[2:3])
+    if not client:
+        sys.exit(1)
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 50.0
+    publisher = TelemetryPublisher(client, rate=rate)
+    print(f"Publishing to shared memory '{publisher.name}' at {rate:.0f} Hz, Ctrl+C to stop")
+    try:
+        publisher.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"{publisher.frames} frames, {publisher.missed_deadlines} missed deadlines")
+        publisher.close()
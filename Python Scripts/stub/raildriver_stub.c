@@ -0,0 +1,360 @@
+/*
+ * Stand-in for RailDriver64.dll, so the Python scripts can run on Linux.
+ * Exports the same symbols as dll_dumbs/RailDriver64_Function_List.txt.
+ *
+ * Build (Linux):  cc -O2 -shared -fPIC -o libraildriver_stub.so raildriver_stub.c
+ * or just run:    python stub_dll.py
+ *
+ * The Set* exports are the ones the game itself uses to push data into the
+ * DLL, so the stub is configured through them (controller list, loco name,
+ * min/max, values), exactly like the real thing.
+ *
+ * Extra Stub* exports (not in the real DLL) inject per-call latency and
+ * failures, for throughput and tail latency measurements:
+ *   StubSetLatency(base_us, jitter_us)  every driver-side call takes base + [0, jitter) us
+ *   StubSetFailureRate(rate)            share of calls that fail: NULL strings, -99.0 values,
+ *                                       dropped writes
+ *   StubSeed(seed)                      makes jitter and failures reproducible
+ *   StubCallCount() / StubFailureCount()
+ */
+#define _POSIX_C_SOURCE 200809L
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+
+#ifdef _WIN32
+#define EXPORT __declspec(dllexport)
+#else
+#define EXPORT __attribute__((visibility("default")))
+#endif
+
+#define MAX_CONTROLLERS 1024
+#define VIRTUAL_FIRST 400
+#define VIRTUAL_COUNT 9   /* 400 - 408 */
+#define NO_VALUE -99.0f   /* what the real DLL returns for unknown controllers */
+
+static char controller_list[65536] =
+    "Regulator::Reverser::TrainBrakeControl::EngineBrakeControl::"
+    "Wipers::Headlights::Horn::EmergencyBrake::SpeedometerMPH::"
+    "SimpleChangeDirection";
+static char loco_name[256] = "StubProvider.:.StubProduct.:.Class 00 Stub";
+static int controller_count = 10;
+
+static float values[MAX_CONTROLLERS];
+static float mins[MAX_CONTROLLERS];
+static float maxs[MAX_CONTROLLERS];
+static bool changed[MAX_CONTROLLERS];
+static float virtual_values[VIRTUAL_COUNT];
+
+static unsigned int latency_us = 0;
+static unsigned int jitter_us = 0;
+static float failure_rate = 0.0f;
+static uint64_t rng_state = 0x9E3779B97F4A7C15ull;
+static uint64_t call_count = 0;
+static uint64_t failure_count = 0;
+
+static bool raildriver_connected = false;
+static bool railsim_connected = true;
+static bool loco_changed = false;
+
+static int count_controllers(const char *list)
+{
+    int count = 0;
+    const char *p = list;
+    if (!*list)
+        return 0;
+    while ((p = strstr(p, "::")) != NULL) {
+        count++;
+        p += 2;
+    }
+    return count + 1;
+}
+
+static void reset_controllers(void)
+{
+    int i;
+    for (i = 0; i < MAX_CONTROLLERS; i++) {
+        values[i] = 0.0f;
+        mins[i] = 0.0f;
+        maxs[i] = 1.0f;
+        changed[i] = false;
+    }
+}
+
+static float *value_slot(int id)
+{
+    if (id >= 0 && id < controller_count)
+        return &values[id];
+    if (id >= VIRTUAL_FIRST && id < VIRTUAL_FIRST + VIRTUAL_COUNT)
+        return &virtual_values[id - VIRTUAL_FIRST];
+    return NULL;
+}
+
+static void store_value(int id, float value)
+{
+    float *slot = value_slot(id);
+    if (!slot)
+        return;
+    if (*slot != value && id < controller_count)
+        changed[id] = true;
+    *slot = value;
+}
+
+static uint64_t next_random(void)
+{
+    /* xorshift64*, deterministic for a given seed */
+    rng_state ^= rng_state >> 12;
+    rng_state ^= rng_state << 25;
+    rng_state ^= rng_state >> 27;
+    return rng_state * 0x2545F4914F6CDD1Dull;
+}
+
+static double now_us(void)
+{
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec * 1e6 + ts.tv_nsec / 1e3;
+}
+
+/* Called at the start of every driver-side export. Returns true if this call should fail. */
+static bool stub_call(void)
+{
+    unsigned int delay = latency_us;
+    call_count++;
+    if (jitter_us)
+        delay += (unsigned int)(next_random() % jitter_us);
+    if (delay) {
+        double end = now_us() + delay;
+        if (delay > 2000) {
+            /* sleep most of it, spin the last millisecond */
+            long sleep_ns = (long)(delay - 1000) * 1000L;
+            struct timespec ts = { sleep_ns / 1000000000L, sleep_ns % 1000000000L };
+            nanosleep(&ts, NULL);
+        }
+        while (now_us() < end)
+            ;
+    }
+    if (failure_rate > 0.0f && (next_random() >> 11) * (1.0 / 9007199254740992.0) < failure_rate) {
+        failure_count++;
+        return true;
+    }
+    return false;
+}
+
+__attribute__((constructor)) static void stub_init(void)
+{
+    reset_controllers();
+}
+
+/* ---- stub controls ---- */
+
+EXPORT void StubSetLatency(unsigned int base_us, unsigned int jitter)
+{
+    latency_us = base_us;
+    jitter_us = jitter;
+}
+
+EXPORT void StubSetFailureRate(float rate)
+{
+    failure_rate = rate;
+}
+
+EXPORT void StubSeed(unsigned long long seed)
+{
+    rng_state = seed ? seed : 0x9E3779B97F4A7C15ull;
+    call_count = 0;
+    failure_count = 0;
+}
+
+EXPORT unsigned long long StubCallCount(void)
+{
+    return call_count;
+}
+
+EXPORT unsigned long long StubFailureCount(void)
+{
+    return failure_count;
+}
+
+/* ---- change tracking ---- */
+
+EXPORT void ClearChanged(void)
+{
+    stub_call();
+    memset(changed, 0, sizeof(changed));
+}
+
+EXPORT bool ControllerChanged(int id)
+{
+    if (stub_call())
+        return false;
+    return id >= 0 && id < controller_count && changed[id];
+}
+
+/* ---- driver side (what the scripts call) ---- */
+
+EXPORT const char *GetControllerList(void)
+{
+    if (stub_call())
+        return NULL;
+    return controller_list;
+}
+
+static float controller_value(int id, int mode)
+{
+    if (id >= VIRTUAL_FIRST && id < VIRTUAL_FIRST + VIRTUAL_COUNT)
+        return mode == 0 ? virtual_values[id - VIRTUAL_FIRST] : NO_VALUE;
+    if (id < 0 || id >= controller_count)
+        return NO_VALUE;
+    switch (mode) {
+    case 0: return values[id];
+    case 1: return mins[id];
+    case 2: return maxs[id];
+    default: return NO_VALUE;
+    }
+}
+
+EXPORT float GetControllerValue(int id, int mode)
+{
+    if (stub_call())
+        return NO_VALUE;
+    return controller_value(id, mode);
+}
+
+EXPORT float GetCurrentControllerValue(int id)
+{
+    return GetControllerValue(id, 0);
+}
+
+EXPORT const char *GetLocoName(void)
+{
+    if (stub_call())
+        return NULL;
+    return loco_name;
+}
+
+EXPORT int GetNextRailDriverId(void)
+{
+    return 0;
+}
+
+EXPORT bool GetRailDriverConnected(void)
+{
+    return raildriver_connected;
+}
+
+EXPORT int GetRailDriverGetId(int index)
+{
+    return index;
+}
+
+EXPORT int GetRailDriverGetType(int index)
+{
+    (void)index;
+    return 0;
+}
+
+EXPORT float GetRailDriverValue(int id)
+{
+    return GetControllerValue(id, 0);
+}
+
+EXPORT bool GetRailSimCombinedThrottleBrake(void)
+{
+    return false;
+}
+
+EXPORT bool GetRailSimConnected(void)
+{
+    if (stub_call())
+        return false;
+    return railsim_connected;
+}
+
+EXPORT bool GetRailSimLocoChanged(void)
+{
+    bool result;
+    stub_call();
+    result = loco_changed;
+    loco_changed = false;
+    return result;
+}
+
+EXPORT float GetRailSimValue(int id, int mode)
+{
+    return GetControllerValue(id, mode);
+}
+
+EXPORT bool IsLocoSet(void)
+{
+    if (stub_call())
+        return false;
+    return loco_name[0] != '\0';
+}
+
+EXPORT void SetControllerValue(int id, float value)
+{
+    if (stub_call())
+        return;
+    store_value(id, value);
+}
+
+EXPORT void SetRailDriverConnected(bool connected)
+{
+    stub_call();
+    raildriver_connected = connected;
+}
+
+EXPORT void SetRailDriverValue(int id, float value)
+{
+    store_value(id, value);
+}
+
+/* ---- game side (used here to configure the stub) ---- */
+
+EXPORT void SetControllerList(const char *list)
+{
+    strncpy(controller_list, list ? list : "", sizeof(controller_list) - 1);
+    controller_list[sizeof(controller_list) - 1] = '\0';
+    controller_count = count_controllers(controller_list);
+    if (controller_count > MAX_CONTROLLERS)
+        controller_count = MAX_CONTROLLERS;
+    reset_controllers();
+}
+
+EXPORT void SetLocoName(const char *name)
+{
+    strncpy(loco_name, name ? name : "", sizeof(loco_name) - 1);
+    loco_name[sizeof(loco_name) - 1] = '\0';
+    loco_changed = true;
+}
+
+EXPORT void SetRailDriverLocoChanged(bool value)
+{
+    loco_changed = value;
+}
+
+EXPORT void SetRailSimConnected(bool connected)
+{
+    railsim_connected = connected;
+}
+
+EXPORT void SetRailSimControllerMinMax(int id, float min, float max)
+{
+    if (id < 0 || id >= controller_count)
+        return;
+    mins[id] = min;
+    maxs[id] = max;
+}
+
+EXPORT void SetRailSimControllerValue(int id, float value)
+{
+    store_value(id, value);
+}
+
+EXPORT void SetRailSimValue(int id, float value)
+{
+    store_value(id, value);
+}
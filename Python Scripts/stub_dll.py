@@ -0,0 +1,175 @@
+# Builds and configures the stub RailDriver DLL (stub/raildriver_stub.c), so the scripts run without Train Simulator.
+#   python stub_dll.py            -> builds it and prints the path
+#   load_raildriver_dll(build_stub_dll()) then works like with the real DLL, and so does
+#   RAILDRIVER_DLL=<that path> python RailDriverData.py   (or full_debug.py)
+#   load_stub_dll(controllers=..., latency_us=..., failure_rate=...) gives a configured one.
+
+import ctypes
+import os
+import subprocess
+import sys
+
+STUB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stub")
+STUB_SOURCE = os.path.join(STUB_DIR, "raildriver_stub.c")
+STUB_LIBRARY = os.path.join(STUB_DIR, "raildriver_stub.dll" if os.name == 'nt' else "libraildriver_stub.so")
+
+# Default controller set of the stub (a typical UK loco), with (min, max)
+DEFAULT_CONTROLLERS = {
+    "Regulator": (0.0, 1.0),
+    "Reverser": (-1.0, 1.0),
+    "TrainBrakeControl": (0.0, 1.0),
+    "EngineBrakeControl": (0.0, 1.0),
+    "Wipers": (0.0, 1.0),
+    "Headlights": (0.0, 2.0),
+    "Horn": (0.0, 1.0),
+    "EmergencyBrake": (0.0, 1.0),
+    "SpeedometerMPH": (0.0, 125.0),
+    "SimpleChangeDirection": (-1.0, 1.0),
+}
+DEFAULT_LOCO_NAME = "StubProvider.:.StubProduct.:.Class 00 Stub"
+
+# The stub's own exports, on top of RailDriverData.DLL_PROTOTYPES
+STUB_PROTOTYPES = {
+    "StubSetLatency":     (None,                [ctypes.c_uint, ctypes.c_uint]),
+    "StubSetFailureRate": (None,                [ctypes.c_float]),
+    "StubSeed":           (None,                [ctypes.c_ulonglong]),
+    "StubCallCount":      (ctypes.c_ulonglong,  []),
+    "StubFailureCount":   (ctypes.c_ulonglong,  []),
+    # game side exports used for configuration
+    "SetControllerList":          (None, [ctypes.c_char_p]),
+    "SetLocoName":                (None, [ctypes.c_char_p]),
+    "SetRailSimControllerMinMax": (None, [ctypes.c_int, ctypes.c_float, ctypes.c_float]),
+    "SetRailSimControllerValue":  (None, [ctypes.c_int, ctypes.c_float]),
+    "SetRailSimConnected":        (None, [ctypes.c_bool]),
+}
+
+def build_stub_dll(compiler=None, force=False):
+    """Compiles the stub DLL if it is missing or older than its source. Returns the library path."""
+    if not force and os.path.exists(STUB_LIBRARY) \
+            and os.path.getmtime(STUB_LIBRARY) >= os.path.getmtime(STUB_SOURCE):
+        return STUB_LIBRARY
+    compiler = compiler or os.environ.get("CC", "cc")
+    command = [compiler, "-O2", "-shared", "-fPIC", "-o", STUB_LIBRARY, STUB_SOURCE]
+    try:
+        subprocess.run(command, check=True, capture_output=True, text=True)
+    except FileNotFoundError:
+        raise RuntimeError(f"No C compiler found ({compiler}). Set CC or install gcc.")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Building the stub DLL failed:\n{e.stderr}")
+    return STUB_LIBRARY
+
+def stub_controls(stub):
+    """Types the stub's configuration exports on a loaded stub (CDLL). Returns a name -> function dict."""
+    controls = {}
+    for name, (restype, argtypes) in STUB_PROTOTYPES.items():
+        func = stub[name]
+        func.restype = restype
+        func.argtypes = argtypes
+        controls[name] = func
+    return controls
+
+def change_loco(stub, controllers=None, loco_name=DEFAULT_LOCO_NAME, values=None):
+    """
+    Puts a loco into the stub, like the game does when the player changes locos:
+    sets the controller list and min/max, resets all values and raises GetRailSimLocoChanged.
+    controllers: {name: (min, max)}, values: {name or id: value}, also for virtual controllers 400-408.
+    """
+    controls = stub_controls(stub)
+    controllers = DEFAULT_CONTROLLERS if controllers is None else controllers
+    names = list(controllers)
+    controls["SetControllerList"]("::".join(names).encode("utf-8"))
+    for controller_id, name in enumerate(names):
+        minimum, maximum = controllers[name]
+        controls["SetRailSimControllerMinMax"](controller_id, minimum, maximum)
+    for key, value in (values or {}).items():
+        controls["SetRailSimControllerValue"](names.index(key) if isinstance(key, str) else key, value)
+    controls["SetLocoName"](loco_name.encode("utf-8"))
+
+def load_stub_dll(controllers=None, loco_name=DEFAULT_LOCO_NAME, values=None,
+                  latency_us=0, jitter_us=0, failure_rate=0.0, seed=0):
+    """
+    Builds (if needed) and loads the stub, configured with a loco and a latency/failure model.
+    The stub's state is per process: loading it again returns the same, reconfigured, library.
+    """
+    stub = ctypes.CDLL(build_stub_dll())
+    controls = stub_controls(stub)
+    controls["StubSeed"](seed)
+    controls["StubSetLatency"](latency_us, jitter_us)
+    controls["StubSetFailureRate"](failure_rate)
+    change_loco(stub, controllers, loco_name, values)
+    return stub
+
+class StubPhysics:
+    """
+    A simple longitudinal model of the stub's train, for closed-loop tests: the regulator accelerates,
+    the train brake decelerates, rolling resistance, drag and the gradient slow the train down, and
+    the speed is written to the speedometer as the game would. Time is virtual: sleep(seconds) moves
+    it forward in steps of step seconds, so control loops run deterministically and faster than real
+    time (pass now/sleep as the loop's clock and sleep).
+    """
+    NO_VALUE = -99.0
+
+    def __init__(self, stub, regulator="Regulator", brake="TrainBrakeControl", speedometer="SpeedometerMPH",
+                 max_acceleration=0.6, max_braking=1.2, rolling=0.02, drag=0.0004, gradient=0.0,
+                 speed=0.0, step=0.01):
+        get_value = stub["GetControllerValue"]
+        get_value.restype = ctypes.c_float
+        get_value.argtypes = [ctypes.c_int, ctypes.c_int]
+        get_list = stub["GetControllerList"]
+        get_list.restype = ctypes.c_char_p
+        controllers = (get_list() or b"").decode("utf-8").split("::")
+        self._get = get_value
+        self._set = stub_controls(stub)["SetRailSimControllerValue"]
+        self.regulator = controllers.index(regulator)
+        self.brake = controllers.index(brake) if brake in controllers else None
+        self.speedometer = controllers.index(speedometer)
+        self.mps_per_unit = 0.44704 if speedometer.lower().endswith("mph") else 1 / 3.6
+        self.max_acceleration = max_acceleration  # m/s^2 at full regulator
+        self.max_braking = max_braking            # m/s^2 at full brake
+        self.rolling = rolling                    # m/s^2
+        self.drag = drag                          # 1/m, times speed squared
+        self.gradient = gradient                  # percent, positive uphill
+        self.speed = speed                        # m/s
+        self.step = step
+        self.time = 0.0
+        self._regulator_value = 0.0
+        self._brake_value = 0.0
+        self._publish()
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        """Advances virtual time by seconds, integrating the speed."""
+        end = self.time + max(seconds, 0.0)
+        while self.time < end:
+            self.advance(min(self.step, end - self.time))
+
+    def advance(self, dt):
+        """One integration step of dt seconds."""
+        regulator = self._read(self.regulator, "_regulator_value")
+        brake = self._read(self.brake, "_brake_value") if self.brake is not None else 0.0
+        acceleration = (regulator * self.max_acceleration - brake * self.max_braking
+                        - self.drag * self.speed * self.speed - 9.81 * self.gradient / 100.0)
+        if self.speed > 0.0 or acceleration > 0.0:
+            acceleration -= self.rolling
+        self.speed = max(self.speed + acceleration * dt, 0.0)
+        self.time += dt
+        self._publish()
+
+    def _read(self, controller_id, cache):
+        value = self._get(controller_id, 0)
+        if value == self.NO_VALUE:  # injected failure: keep the last value
+            return getattr(self, cache)
+        setattr(self, cache, value)
+        return value
+
+    def _publish(self):
+        self._set(self.speedometer, self.speed / self.mps_per_unit)
+
+if __name__ == "__main__":
+    try:
+        print(build_stub_dll(force="--force" in sys.argv))
+    except RuntimeError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
@@ -0,0 +1,240 @@
+# Streaming export of recorded sessions (.rdtl, see telemetry_recorder.py) to CSV, a chunked columnar
+# file or Parquet. The export is a chain of generators over bounded chunks of rows:
+#   chunks = read_chunks(reader, ["SpeedometerMPH", "Regulator"])   # chunk_rows rows at a time
+#   chunks = time_range(chunks, start, end)                          # optional filters
+#   chunks = downsample(chunks, interval=0.1)
+#   write_csv(chunks, "out.csv", names)
+# Only one chunk is in memory at a time (the recording itself is memory-mapped), so memory stays
+# the same however long the session is.
+#
+# Chunked columnar file (.rdtc, little endian):
+#   header : magic "RDTCOL01", JSON length (u32), JSON metadata (loco name, names, ids, mins, maxs)
+#   chunks : magic "RDCK", rows (u32), timestamps (f64 x rows), then one f32 x rows column per name
+# A writer appends chunks as they come; read_columnar() streams them back one by one.
+
+import argparse
+import csv
+import json
+import struct
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+from telemetry_recorder import TelemetryReader
+
+# ===============================
+# Global Configuration
+# ===============================
+CHUNK_ROWS = 4096
+COLUMNAR_MAGIC = b"RDTCOL01"
+CHUNK_MAGIC = b"RDCK"
+COLUMNAR_HEADER = struct.Struct("<8sI")  # magic, JSON length
+CHUNK_HEADER = struct.Struct("<4sI")     # magic, rows
+FORMATS = ("csv", "columnar", "parquet")
+
+Chunk = namedtuple("Chunk", ["timestamps", "columns"])  # array('d'), [array('f') per column]
+
+def _copy(view, typecode):
+    values = array(typecode)
+    values.frombytes(view.cast('B'))
+    return values
+
+# ===============================
+# Sources
+# ===============================
+def read_chunks(reader, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Rows of a TelemetryReader as Chunks of at most chunk_rows rows, for the given columns
+    (names or positions, all by default). Each chunk is a copy, so it stays valid after the reader is closed.
+    """
+    positions = range(len(reader.names)) if columns is None else \
+        [reader.index[column] if isinstance(column, str) else column for column in columns]
+    column_views = [reader.column_views(position) for position in positions]
+    for segment, times in enumerate(reader.timestamp_views()):
+        for start in range(0, len(times), chunk_rows):
+            end = start + chunk_rows
+            yield Chunk(_copy(times[start:end], 'd'),
+                        [_copy(views[segment][start:end], 'f') for views in column_views])
+
+def read_columnar(path):
+    """Metadata and a generator of the Chunks of a chunked columnar file: (metadata, chunks)."""
+    file = open(path, "rb")
+    magic, metadata_length = COLUMNAR_HEADER.unpack(file.read(COLUMNAR_HEADER.size))
+    if magic != COLUMNAR_MAGIC:
+        file.close()
+        raise ValueError(f"{path} is not a chunked columnar file.")
+    metadata = json.loads(file.read(metadata_length).decode("utf-8"))
+    width = len(metadata["names"])
+
+    def chunks():
+        with file:
+            while True:
+                header = file.read(CHUNK_HEADER.size)
+                if len(header) < CHUNK_HEADER.size:
+                    return
+                magic, rows = CHUNK_HEADER.unpack(header)
+                if magic != CHUNK_MAGIC:
+                    raise ValueError(f"{path}: corrupt chunk header")
+                timestamps = array('d')
+                timestamps.fromfile(file, rows)
+                columns = []
+                for _ in range(width):
+                    column = array('f')
+                    column.fromfile(file, rows)
+                    columns.append(column)
+                yield Chunk(timestamps, columns)
+
+    return metadata, chunks()
+
+# ===============================
+# Filters
+# ===============================
+def select(chunk, rows):
+    """A new Chunk with only the given row indices (any iterable of ints)."""
+    rows = list(rows)
+    return Chunk(array('d', map(chunk.timestamps.__getitem__, rows)),
+                 [array('f', map(column.__getitem__, rows)) for column in chunk.columns])
+
+def time_range(chunks, start=None, end=None):
+    """Rows with start <= timestamp < end (time.time() values, None: open). Stops reading after end."""
+    for chunk in chunks:
+        timestamps = chunk.timestamps
+        if not timestamps:
+            continue
+        if end is not None and timestamps[0] >= end:
+            return
+        first = 0 if start is None or timestamps[0] >= start else bisect_left(timestamps, start)
+        last = len(timestamps) if end is None or timestamps[-1] < end else bisect_left(timestamps, end)
+        if first == 0 and last == len(timestamps):
+            yield chunk
+        elif first < last:
+            yield Chunk(timestamps[first:last], [column[first:last] for column in chunk.columns])
+        if last < len(timestamps):
+            return
+
+def downsample(chunks, every=None, interval=None):
+    """
+    Keeps every every-th row and/or the first row of each interval seconds (a fixed grid from
+    the first row, so gaps in the recording don't shift it).
+    """
+    row = 0
+    grid_start = next_time = None
+    for chunk in chunks:
+        count = len(chunk.timestamps)
+        if every and every > 1:
+            offset = -row % every
+            row += count
+            chunk = Chunk(chunk.timestamps[offset::every], [column[offset::every] for column in chunk.columns])
+        if interval:
+            keep = []
+            for index, timestamp in enumerate(chunk.timestamps):
+                if next_time is None:
+                    grid_start = timestamp
+                    next_time = timestamp
+                if timestamp >= next_time:
+                    keep.append(index)
+                    next_time = grid_start + ((timestamp - grid_start) // interval + 1) * interval
+            if len(keep) != len(chunk.timestamps):
+                chunk = select(chunk, keep)
+        if chunk.timestamps:
+            yield chunk
+
+# ===============================
+# Writers
+# ===============================
+def write_csv(chunks, path, names, float_format="{:.6g}"):
+    """CSV with a timestamp column and one column per name. Returns the number of rows written."""
+    rows = 0
+    formatter = float_format.format
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["timestamp", *names])
+        for chunk in chunks:
+            columns = [map(formatter, column) for column in chunk.columns]
+            writer.writerows(zip(map("{:.6f}".format, chunk.timestamps), *columns))
+            rows += len(chunk.timestamps)
+    return rows
+
+def write_columnar(chunks, path, metadata):
+    """The chunked columnar format (see the top of the file). metadata needs "names". Returns rows written."""
+    rows = 0
+    metadata_bytes = json.dumps(metadata).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(COLUMNAR_HEADER.pack(COLUMNAR_MAGIC, len(metadata_bytes)) + metadata_bytes)
+        for chunk in chunks:
+            count = len(chunk.timestamps)
+            f.write(CHUNK_HEADER.pack(CHUNK_MAGIC, count))
+            chunk.timestamps.tofile(f)
+            for column in chunk.columns:
+                column.tofile(f)
+            rows += count
+    return rows
+
+def write_parquet(chunks, path, names, metadata=None):
+    """Parquet, one row group per chunk (needs pyarrow). Returns the number of rows written."""
+    try:
+        import pyarrow  # imported here: ~0.2 s to import, CSV and .rdtc exports never need it
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow).") from None
+    schema = pyarrow.schema([("timestamp", pyarrow.float64())] + [(name, pyarrow.float32()) for name in names],
+                            metadata={"raildriver": json.dumps(metadata or {})})
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            arrays = [pyarrow.array(chunk.timestamps, pyarrow.float64())]
+            arrays.extend(pyarrow.array(column, pyarrow.float32()) for column in chunk.columns)
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk.timestamps)
+    return rows
+
+def export(reader, path, fmt="csv", columns=None, start=None, end=None, every=None, interval=None,
+           chunk_rows=CHUNK_ROWS):
+    """
+    The whole pipeline for one recording. start/end are seconds from the start of the recording.
+    Returns the number of rows written.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    positions = range(len(reader.names)) if columns is None else \
+        [reader.index[column] if isinstance(column, str) else column for column in columns]
+    names = [reader.names[position] for position in positions]
+    chunks = read_chunks(reader, positions, chunk_rows)
+    if start is not None or end is not None:
+        first = next((times[0] for times in reader.timestamp_views() if len(times)), 0.0)
+        chunks = time_range(chunks, None if start is None else first + start, None if end is None else first + end)
+    if every or interval:
+        chunks = downsample(chunks, every, interval)
+    metadata = {
+        "loco_name": reader.loco_name,
+        "names": names,
+        "ids": [reader.ids[position] for position in positions],
+        "mins": [reader.mins[position] for position in positions],
+        "maxs": [reader.maxs[position] for position in positions],
+    }
+    if fmt == "csv":
+        return write_csv(chunks, path, names)
+    if fmt == "columnar":
+        return write_columnar(chunks, path, metadata)
+    return write_parquet(chunks, path, names, metadata)
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports a recorded .rdtl session in bounded-size chunks.")
+    parser.add_argument("recording", help=".rdtl file from telemetry_recorder.py")
+    parser.add_argument("output", help="output file (.csv, .rdtc or .parquet)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the output file extension")
+    parser.add_argument("--columns", help="comma separated controller names (default: all)")
+    parser.add_argument("--start", type=float, help="seconds from the start of the recording")
+    parser.add_argument("--end", type=float, help="seconds from the start of the recording")
+    parser.add_argument("--every", type=int, help="keep every n-th row")
+    parser.add_argument("--interval", type=float, help="keep one row per interval seconds")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+    fmt = args.format or {"rdtc": "columnar", "parquet": "parquet"}.get(args.output.rsplit(".", 1)[-1].lower(), "csv")
+    with TelemetryReader(args.recording) as reader:
+        rows = export(reader, args.output, fmt, args.columns.split(",") if args.columns else None,
+                      args.start, args.end, args.every, args.interval, args.chunk_rows)
+    print(f"{rows} rows written to: {args.output}")
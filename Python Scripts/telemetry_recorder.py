@@ -0,0 +1,325 @@
+# Binary telemetry recorder: timestamped snapshots into a memory-mapped columnar file.
+#   One float32 column per controller (and a float64 timestamp column), preallocated in segments,
+#   so recording costs a memcpy per tick into a staging block that is written out every block_rows.
+#   A reader maps the file and reads single columns without loading the rest.
+#
+# File layout (little endian):
+#   file header : magic "RDTLOG01", header size (u32), JSON length (u32), JSON metadata
+#                 (loco name, controller names/ids/min/max, segment size), padded to the mmap granularity
+#   segments    : magic "RDSEG001", rows used (u64), row capacity (u64), padding to 64 bytes,
+#                 timestamps (f64 x capacity), then one f32 x capacity column per controller
+# Every segment but the last has segment_rows capacity; close() shrinks the last one to the rows
+# written, so the file holds no preallocated space once the recording is finished.
+# A file has one controller layout: after a loco change, record into a new file (see Main Script).
+
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from RailDriverData import RailDriverClient
+
+# ===============================
+# Global Configuration
+# ===============================
+MAGIC = b"RDTLOG01"
+SEGMENT_MAGIC = b"RDSEG001"
+FILE_HEADER = struct.Struct("<8sII")       # magic, header size, JSON length
+SEGMENT_HEADER = struct.Struct("<8sQQ")    # magic, rows used, row capacity
+SEGMENT_HEADER_SIZE = 64
+FORMAT_VERSION = 1
+
+def _align(size, alignment=mmap.ALLOCATIONGRANULARITY):
+    return (size + alignment - 1) // alignment * alignment
+
+def _segment_size(capacity, columns):
+    return _align(SEGMENT_HEADER_SIZE + capacity * 8 + columns * capacity * 4)
+
+class LayoutChanged(RuntimeError):
+    """The snapshot's controllers differ from the recording's (the loco changed)."""
+
+# ===============================
+# Recorder
+# ===============================
+class TelemetryRecorder:
+    """
+    Appends snapshots to a telemetry file. Rows land in a RAM staging block first (one memcpy
+    per append) and are spread over the mapped columns every block_rows, so a crash loses at
+    most one block. The file grows by one preallocated segment of segment_rows at a time.
+    """
+
+    def __init__(self, path, layout, loco_name="", segment_rows=65536, block_rows=256):
+        self.path = path
+        self.layout = layout
+        self.width = len(layout)
+        self.segment_rows = segment_rows
+        self.block_rows = min(block_rows, segment_rows)
+        self.segment_size = _segment_size(segment_rows, self.width)
+        metadata = {
+            "version": FORMAT_VERSION,
+            "loco_name": loco_name,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "names": list(layout.names),
+            "ids": layout.ids.tolist(),
+            "mins": layout.mins.tolist(),
+            "maxs": layout.maxs.tolist(),
+            "controller_count": layout.controller_count,
+            "segment_rows": segment_rows,
+            "segment_size": self.segment_size,
+        }
+        metadata_bytes = json.dumps(metadata).encode("utf-8")
+        self.header_size = _align(FILE_HEADER.size + len(metadata_bytes))
+        self.file = open(path, "w+b")
+        self.file.write(FILE_HEADER.pack(MAGIC, self.header_size, len(metadata_bytes)) + metadata_bytes)
+        self.file.truncate(self.header_size)
+
+        self.rows = 0
+        self._staging = array('f', bytes(4 * self.block_rows * self.width))
+        self._staging_view = memoryview(self._staging)
+        self._staging_times = array('d', bytes(8 * self.block_rows))
+        self._block_fill = 0
+        self._segment_count = 0
+        self._segment_fill = 0
+        self._mm = None
+        self._views = []
+        self._new_segment()
+
+    def append(self, timestamp, values):
+        """Adds one row. values: array('f') with one value per layout position (e.g. Snapshot.values)."""
+        if len(values) != self.width:
+            raise LayoutChanged(f"{len(values)} values for a recording of {self.width} controllers")
+        fill = self._block_fill
+        start = fill * self.width
+        self._staging_view[start:start + self.width] = values
+        self._staging_times[fill] = timestamp
+        fill += 1
+        self._block_fill = fill
+        if fill == self.block_rows or self._segment_fill + fill == self.segment_rows:
+            self._flush_block()
+
+    def append_snapshot(self, snapshot):
+        """Adds a Snapshot. Raises LayoutChanged if it is of another loco than the recording."""
+        layout = snapshot.layout
+        if layout is not self.layout:
+            if layout.names != self.layout.names or layout.ids != self.layout.ids:
+                raise LayoutChanged(f"Loco changed, the recording in {self.path} has other controllers")
+            self.layout = layout  # re-read, same controllers
+        self.append(snapshot.timestamp, snapshot.values)
+
+    def flush(self):
+        """Writes the staging block out and syncs the mapped segment to disk."""
+        self._flush_block()
+        self._mm.flush()
+
+    def close(self):
+        """Writes the last rows, shrinks the last segment to them and closes the file."""
+        if self.file.closed:
+            return
+        self._flush_block()
+        size = self._shrink_segment()
+        self._mm.flush()
+        self._unmap()
+        self.file.truncate(size)
+        self.file.close()
+
+    def _shrink_segment(self):
+        """Moves the columns of the mapped (last) segment together. Returns the new file size."""
+        offset = self.header_size + (self._segment_count - 1) * self.segment_size
+        rows = self._segment_fill
+        if not rows:
+            return offset  # nothing written to it: drop it
+        capacity = self.segment_rows
+        source = SEGMENT_HEADER_SIZE + capacity * 8  # the timestamps stay where they are
+        destination = SEGMENT_HEADER_SIZE + rows * 8
+        for _ in range(self.width):
+            self._mm.move(destination, source, rows * 4)  # destination <= source: front to back is safe
+            source += capacity * 4
+            destination += rows * 4
+        SEGMENT_HEADER.pack_into(self._mm, 0, SEGMENT_MAGIC, rows, rows)
+        return offset + destination
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_segment(self):
+        self._unmap()
+        offset = self.header_size + self._segment_count * self.segment_size
+        fileno = self.file.fileno()
+        self.file.truncate(offset + self.segment_size)
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(fileno, offset, self.segment_size)
+        self._mm = mmap.mmap(fileno, self.segment_size, offset=offset)
+        SEGMENT_HEADER.pack_into(self._mm, 0, SEGMENT_MAGIC, 0, self.segment_rows)
+        view = memoryview(self._mm)
+        capacity = self.segment_rows
+        start = SEGMENT_HEADER_SIZE
+        self._times_view = view[start:start + capacity * 8].cast('d')
+        start += capacity * 8
+        self._column_views = []
+        for _ in range(self.width):
+            self._column_views.append(view[start:start + capacity * 4].cast('f'))
+            start += capacity * 4
+        self._views = [view, self._times_view] + self._column_views
+        self._segment_count += 1
+        self._segment_fill = 0
+
+    def _flush_block(self):
+        count = self._block_fill
+        if not count:
+            return
+        row = self._segment_fill
+        width = self.width
+        self._times_view[row:row + count] = self._staging_times[:count]
+        staging = self._staging
+        for column, view in enumerate(self._column_views):
+            view[row:row + count] = staging[column:count * width:width]
+        self._segment_fill += count
+        self.rows += count
+        self._block_fill = 0
+        SEGMENT_HEADER.pack_into(self._mm, 0, SEGMENT_MAGIC, self._segment_fill, self.segment_rows)
+        if self._segment_fill == self.segment_rows:
+            self._new_segment()
+
+    def _unmap(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+# ===============================
+# Reader
+# ===============================
+class TelemetryReader:
+    """
+    Read-only view of a telemetry file (also one still being recorded: rows are as of opening).
+    column_views() is zero-copy, column() copies just that column into an array('f').
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_size, metadata_length = FILE_HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a telemetry file.")
+        start = FILE_HEADER.size
+        self.metadata = json.loads(self.mm[start:start + metadata_length].decode("utf-8"))
+        self.names = self.metadata["names"]
+        self.ids = self.metadata["ids"]
+        self.mins = self.metadata["mins"]
+        self.maxs = self.metadata["maxs"]
+        self.loco_name = self.metadata["loco_name"]
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.segment_rows = self.metadata["segment_rows"]
+        segment_size = self.metadata["segment_size"]
+        self.segments = []  # (offset, rows used, row capacity)
+        offset = header_size
+        while offset + SEGMENT_HEADER.size <= len(self.mm):
+            magic, rows, capacity = SEGMENT_HEADER.unpack_from(self.mm, offset)
+            if magic != SEGMENT_MAGIC:
+                break
+            self.segments.append((offset, rows, capacity))
+            offset += segment_size if capacity == self.segment_rows else _segment_size(capacity, len(self.names))
+        self.rows = sum(rows for _, rows, _ in self.segments)
+        self._view = memoryview(self.mm)
+        self._views = []
+
+    def __len__(self):
+        return self.rows
+
+    def column_views(self, name_or_position):
+        """Zero-copy memoryviews (format 'f') of one controller's values, one per segment."""
+        position = self.index[name_or_position] if isinstance(name_or_position, str) else name_or_position
+        views = []
+        for offset, rows, capacity in self.segments:
+            start = offset + SEGMENT_HEADER_SIZE + capacity * 8 + position * capacity * 4
+            views.append(self._view[start:start + rows * 4].cast('f'))
+        self._views.extend(views)
+        return views
+
+    def column(self, name_or_position):
+        """One controller's values over the whole recording, as an array('f')."""
+        values = array('f')
+        for view in self.column_views(name_or_position):
+            values.frombytes(view.cast('B'))
+        return values
+
+    def timestamp_views(self):
+        """Zero-copy memoryviews (format 'd') of the timestamps, one per segment."""
+        views = []
+        for offset, rows, _ in self.segments:
+            start = offset + SEGMENT_HEADER_SIZE
+            views.append(self._view[start:start + rows * 8].cast('d'))
+        self._views.extend(views)
+        return views
+
+    def timestamps(self):
+        """Timestamps (time.time()) of all rows, as an array('d')."""
+        values = array('d')
+        for offset, rows, _ in self.segments:
+            start = offset + SEGMENT_HEADER_SIZE
+            values.frombytes(self._view[start:start + rows * 8])
+        return values
+
+    def close(self):
+        for view in self._views:
+            view.release()
+        self._view.release()
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# =============
+# Main Script
+# =============
+if __name__ == "__main__":
+    # python telemetry_recorder.py [dll_path] [rate] [seconds] : records all controllers
+    client = RailDriverClient.load(*sys.argv[1:2])
+    if not client:
+        sys.exit(1)
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 50.0
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+    def new_recording(snapshot):
+        """A recorder for the loco of snapshot, in a file named after it."""
+        loco_name = client.get_loco_name() or "Unknown"
+        safe_loco_name = loco_name.replace(':', '_').replace('.', '')
+        filename = f"{time.strftime('%Y%m%d_%H%M%S')}_{safe_loco_name}.rdtl"
+        return TelemetryRecorder(filename, snapshot.layout, loco_name)
+
+    def report(recorder):
+        print(f"{recorder.rows} rows of {recorder.width} controllers written to: {recorder.path}")
+
+    recorder = new_recording(client.read_snapshot())
+    try:
+        period = 1.0 / rate
+        deadline = time.perf_counter()
+        end = deadline + seconds
+        while deadline < end:
+            snapshot = client.read_snapshot()
+            try:
+                recorder.append_snapshot(snapshot)
+            except LayoutChanged:
+                recorder.close()  # the loco changed: the new one goes into a new file
+                report(recorder)
+                recorder = new_recording(snapshot)
+                recorder.append_snapshot(snapshot)
+            deadline += period
+            remaining = deadline - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+    finally:
+        recorder.close()
+    report(recorder)
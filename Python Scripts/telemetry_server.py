@@ -0,0 +1,511 @@
+# Local telemetry server: one poller, many clients, over a plain TCP socket.
+#   The server reads one snapshot per tick through AsyncRailDriver (so the DLL is only ever called
+#   from its one thread) and fans it out to every connected client: full snapshots or only the
+#   changed values, for the controllers each client subscribed to. Clients with the same
+#   subscription share one encoded message per tick. Writes from all clients go through one
+#   CommandQueue, so they are coalesced and rate limited before they reach SetControllerValue.
+#   The same port answers plain HTTP with JSON (GET /layout, GET /snapshot, POST /set) for
+#   convenience; the binary protocol is for anything that polls at a high rate.
+#
+# Binary protocol (little endian): every message is type (u8), payload length (u32), payload.
+#   client -> server
+#     SUBSCRIBE  mode (u8: 0 snapshots, 1 deltas), count (u16), count x controller id (i32).
+#                count 0 subscribes to every controller in layout order.
+#     SET        count (u16), count x (controller id i32, value f32)
+#     GET_LAYOUT (no payload)
+#   server -> client
+#     LAYOUT     JSON: loco_name, names, ids, mins, maxs (null for the virtual controllers), controller_count.
+#                Sent on connect and whenever the loco changes; subscriptions are re-applied to it.
+#     SNAPSHOT   frame (u32), timestamp (f64), count (u16), count x value (f32), in subscription order
+#     DELTA      frame (u32), timestamp (f64), count (u16), count x (subscription index u16, value f32)
+#     SET_ACK    count (u16) of writes queued
+#     ERROR      UTF-8 message
+# A delta client is sent a full SNAPSHOT after subscribing, after a loco change and after any tick
+# it was skipped because it didn't read its socket fast enough.
+
+import argparse
+import asyncio
+import json
+import struct
+import sys
+from array import array
+
+from RailDriverData import DLL_NAME, log
+from async_raildriver import AsyncRailDriver
+from command_queue import CommandQueue
+
+# ===============================
+# Global Configuration
+# ===============================
+DEFAULT_PORT = 47820
+MSG_HEADER = struct.Struct("<BI")
+SUBSCRIBE, SET, GET_LAYOUT = 0x01, 0x02, 0x03
+LAYOUT, SNAPSHOT, DELTA, SET_ACK, ERROR = 0x81, 0x82, 0x83, 0x84, 0xFF
+MODE_SNAPSHOTS, MODE_DELTAS = 0, 1
+FRAME_HEADER = struct.Struct("<IdH")  # frame, timestamp, count
+DELTA_ITEM = struct.Struct("<Hf")
+SET_ITEM = struct.Struct("<if")
+MAX_PAYLOAD = 1 << 20
+_NAN = array('f', [float("nan")])
+
+def encode(message_type, payload=b""):
+    return MSG_HEADER.pack(message_type, len(payload)) + payload
+
+def layout_dict(layout, loco_name):
+    """The layout as JSON-able dict (NaN min/max of the virtual controllers become None)."""
+    return {
+        "loco_name": loco_name,
+        "names": list(layout.names),
+        "ids": layout.ids.tolist(),
+        "mins": [None if value != value else value for value in layout.mins],
+        "maxs": [None if value != value else value for value in layout.maxs],
+        "controller_count": layout.controller_count,
+    }
+
+# ===============================
+# Server
+# ===============================
+class _Group:
+    """Clients with the same subscription: their last sent values and this tick's messages."""
+    __slots__ = ("mode", "ids", "positions", "unknown", "last", "clients")
+
+    def __init__(self, mode, ids):
+        self.mode = mode
+        self.ids = ids  # as subscribed, () = all
+        self.positions = None
+        self.unknown = False  # some ids aren't controllers of this loco (sent as NaN)
+        self.last = None  # bits of the values sent last (deltas)
+        self.clients = set()
+
+class _Client:
+    __slots__ = ("writer", "group", "needs_full", "sent", "skipped")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.group = None
+        self.needs_full = True
+        self.sent = 0
+        self.skipped = 0
+
+class TelemetryServer:
+    """
+    Serves snapshots/deltas of an AsyncRailDriver to TCP clients at rate Hz.
+
+    max_buffer: a client with more than this many bytes unsent is skipped for the tick (and
+    gets a full snapshot later), so one slow client never holds up the poller or the others.
+    """
+
+    def __init__(self, raildriver, host="127.0.0.1", port=DEFAULT_PORT, rate=50.0,
+                 max_buffer=256 * 1024, max_set_rate=50.0):
+        self.raildriver = raildriver
+        self.host = host
+        self.port = port
+        self.period = 1.0 / rate
+        self.max_buffer = max_buffer
+        self.commands = CommandQueue(raildriver.client, max_rate=max_set_rate)
+        self.layout = None
+        self.loco_name = ""
+        self.snapshot = None
+        self.frame = 0
+        self.missed_deadlines = 0
+        self.clients = set()
+        self.groups = {}
+        self._layout_message = None
+        self._positions_layout = None
+        self._positions = {}
+        self._server = None
+        self._poller = None
+
+    async def start(self):
+        """Starts listening and polling. Returns once the socket is bound."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # if port 0 was given
+        self._poller = asyncio.ensure_future(self._poll())
+        log(2, "Telemetry server on %s:%s", self.host, self.port)
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        await self._poller
+
+    async def close(self):
+        if self._poller:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+        for client in list(self.clients):
+            client.writer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.raildriver.call(self.commands.flush, True)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def stats(self):
+        return {
+            "frame": self.frame,
+            "clients": len(self.clients),
+            "subscriptions": len(self.groups),
+            "missed_deadlines": self.missed_deadlines,
+            "skipped_sends": sum(client.skipped for client in self.clients),
+            "commands": self.commands.stats(),
+        }
+
+    # ---- polling ----
+    def _tick(self):
+        """DLL thread: writes what's queued, reads a snapshot, confirms written controllers from it."""
+        commands = self.commands
+        commands.flush()
+        client = self.raildriver.client
+        snapshot = client.read_snapshot()
+        if commands.confirmed:
+            position_of = self._position_of(snapshot.layout)
+            for control_id in list(commands.confirmed):
+                position = position_of.get(control_id)
+                if position is not None:
+                    commands.confirm(control_id, snapshot.values[position])
+        if snapshot.layout is not self.layout:
+            self.loco_name = client.get_loco_name() or ""
+        return snapshot
+
+    async def _poll(self):
+        loop = asyncio.get_running_loop()
+        period = self.period
+        deadline = loop.time()
+        while True:
+            try:
+                self._broadcast(await self.raildriver.call(self._tick))
+            except Exception as e:
+                log(1, f"Telemetry poll failed: {e}")
+            deadline += period
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+            else:
+                skipped = int(-remaining // period)
+                self.missed_deadlines += skipped
+                deadline += skipped * period
+                await asyncio.sleep(0)
+
+    def _position_of(self, layout):
+        if self._positions_layout is not layout:
+            self._positions_layout = layout
+            self._positions = {controller_id: position for position, controller_id in enumerate(layout.ids)}
+        return self._positions
+
+    def _set_layout(self, layout):
+        self.layout = layout
+        self._layout_message = encode(LAYOUT, json.dumps(layout_dict(layout, self.loco_name)).encode("utf-8"))
+        for group in self.groups.values():
+            self._resolve(group)
+        for client in self.clients:
+            client.needs_full = True
+            client.writer.write(self._layout_message)
+
+    def _resolve(self, group):
+        """Subscription ids -> positions in the current layout. Unknown ids point past the end (NaN)."""
+        group.last = None
+        if not group.ids:
+            group.positions = None  # all
+            return
+        position_of = self._position_of(self.layout)
+        missing = len(self.layout)
+        group.positions = array('H', (position_of.get(i, missing) for i in group.ids))
+        group.unknown = any(i not in position_of for i in group.ids)
+
+    def _broadcast(self, snapshot):
+        self.snapshot = snapshot
+        self.frame += 1
+        if snapshot.layout is not self.layout:
+            self._set_layout(snapshot.layout)
+        header_args = (self.frame & 0xFFFFFFFF, snapshot.timestamp)
+        for group in self.groups.values():
+            if not group.clients:
+                continue
+            if group.positions is None:
+                values = snapshot.values
+            else:
+                source = snapshot.values + _NAN if group.unknown else snapshot.values
+                values = array('f', map(source.__getitem__, group.positions))
+            full = encode(SNAPSHOT, FRAME_HEADER.pack(*header_args, len(values)) + values.tobytes())
+            delta = None
+            if group.mode == MODE_DELTAS:
+                # compared as bits, so a NaN that stays NaN is no change
+                bits = array('I', values.tobytes())
+                last = group.last
+                if last is None or len(last) != len(bits):
+                    changed = range(len(values))
+                else:
+                    changed = [index for index, (new, old) in enumerate(zip(bits, last)) if new != old]
+                if changed:
+                    delta = encode(DELTA, FRAME_HEADER.pack(*header_args, len(changed))
+                                   + b"".join(DELTA_ITEM.pack(index, values[index]) for index in changed))
+                group.last = bits
+            for client in group.clients:
+                if group.mode == MODE_DELTAS and not client.needs_full:
+                    message = delta
+                else:
+                    message = full
+                if message is None:
+                    continue
+                if client.writer.transport.get_write_buffer_size() > self.max_buffer:
+                    client.skipped += 1
+                    client.needs_full = True
+                    continue
+                client.writer.write(message)
+                client.needs_full = False
+                client.sent += 1
+
+    # ---- connections ----
+    async def _handle(self, reader, writer):
+        try:
+            first = await reader.readexactly(1)
+        except asyncio.IncompleteReadError:
+            writer.close()
+            return
+        if first in (b"G", b"P"):
+            await self._handle_http(first, reader, writer)
+            return
+        client = _Client(writer)
+        self.clients.add(client)
+        if self._layout_message:
+            writer.write(self._layout_message)
+        try:
+            header = first + await reader.readexactly(MSG_HEADER.size - 1)
+            while True:
+                message_type, length = MSG_HEADER.unpack(header)
+                if length > MAX_PAYLOAD:
+                    raise ValueError(f"message too long ({length} bytes)")
+                payload = await reader.readexactly(length) if length else b""
+                self._dispatch(client, message_type, payload)
+                header = await reader.readexactly(MSG_HEADER.size)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except (ValueError, struct.error) as e:
+            writer.write(encode(ERROR, str(e).encode("utf-8")))
+        finally:
+            self._unsubscribe(client)
+            self.clients.discard(client)
+            writer.close()
+
+    def _dispatch(self, client, message_type, payload):
+        if message_type == SUBSCRIBE:
+            mode, count = struct.unpack_from("<BH", payload)
+            ids = tuple(struct.unpack_from(f"<{count}i", payload, 3))
+            self._subscribe(client, mode, ids)
+        elif message_type == SET:
+            count, = struct.unpack_from("<H", payload)
+            for index in range(count):
+                control_id, value = SET_ITEM.unpack_from(payload, 2 + index * SET_ITEM.size)
+                self.commands.set(control_id, value)
+            client.writer.write(encode(SET_ACK, struct.pack("<H", count)))
+        elif message_type == GET_LAYOUT:
+            if self._layout_message:
+                client.writer.write(self._layout_message)
+        else:
+            raise ValueError(f"unknown message type {message_type:#x}")
+
+    def _subscribe(self, client, mode, ids):
+        if mode not in (MODE_SNAPSHOTS, MODE_DELTAS):
+            raise ValueError(f"unknown subscription mode {mode}")
+        self._unsubscribe(client)
+        key = (mode, ids)
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = _Group(mode, ids)
+            if self.layout is not None:
+                self._resolve(group)
+        if group.unknown:
+            client.writer.write(encode(ERROR, b"unknown controller ids, their values are NaN"))
+        group.clients.add(client)
+        client.group = group
+        client.needs_full = True
+
+    def _unsubscribe(self, client):
+        group = client.group
+        if group is None:
+            return
+        group.clients.discard(client)
+        if not group.clients:
+            del self.groups[(group.mode, group.ids)]
+        client.group = None
+
+    # ---- HTTP / JSON ----
+    async def _handle_http(self, first, reader, writer):
+        try:
+            head = first + await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, path, _ = request_line.split(" ", 2)
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            body = b""
+            length = int(headers.get("content-length", 0))
+            if length:
+                body = await reader.readexactly(min(length, MAX_PAYLOAD))
+            status, result = self._http(method, path.split("?", 1)[0], body)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, TypeError) as e:
+            status, result = 400, {"error": str(e)}
+        data = json.dumps(result).encode("utf-8")
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 503: "Service Unavailable"}
+        writer.write(f"HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    def _http(self, method, path, body):
+        if self.snapshot is None:
+            return 503, {"error": "no snapshot yet"}
+        if method == "GET" and path == "/layout":
+            return 200, layout_dict(self.layout, self.loco_name)
+        if method == "GET" and path == "/snapshot":
+            snapshot = self.snapshot
+            return 200, {"frame": self.frame, "timestamp": snapshot.timestamp, "loco_name": self.loco_name,
+                         "values": snapshot.as_dict()}
+        if method == "GET" and path == "/stats":
+            return 200, self.stats()
+        if method == "POST" and path == "/set":
+            values = json.loads(body.decode("utf-8") or "{}")
+            if not isinstance(values, dict):
+                return 400, {"error": "expected a JSON object {controller name or id: value}"}
+            index = self.layout.index
+            writes = []  # all checked before the first is queued: a bad body queues nothing
+            for key, value in values.items():
+                if key in index:
+                    control_id = self.layout.ids[index[key]]
+                elif key.lstrip("-").isdigit():
+                    control_id = int(key)
+                else:
+                    return 400, {"error": f"unknown controller {key!r}"}
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    return 400, {"error": f"value of {key!r} is not a number: {value!r}"}
+                writes.append((control_id, float(value)))
+            for control_id, value in writes:
+                self.commands.set(control_id, value)
+            return 200, {"queued": len(writes)}
+        return 404, {"error": f"no {method} {path}"}
+
+# ===============================
+# Client
+# ===============================
+class TelemetryClient:
+    """
+    asyncio client of the binary protocol. Keeps the latest value of every subscribed controller
+    in values ({controller id: value}), updated by receive() / frames().
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.layout = None
+        self.subscribed = ()
+        self.values = {}
+        self.frame = 0
+        self.timestamp = 0.0
+        self.errors = []
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=DEFAULT_PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def subscribe(self, ids=(), deltas=True):
+        """Subscribes to the given controller ids (empty: all)."""
+        ids = tuple(ids)
+        self.subscribed = ids
+        self.values = {}
+        payload = struct.pack(f"<BH{len(ids)}i", MODE_DELTAS if deltas else MODE_SNAPSHOTS, len(ids), *ids)
+        self.writer.write(encode(SUBSCRIBE, payload))
+        await self.writer.drain()
+
+    async def set(self, values):
+        """Queues writes on the server, {controller id: value}, as one message."""
+        payload = struct.pack("<H", len(values)) + b"".join(SET_ITEM.pack(control_id, value)
+                                                            for control_id, value in values.items())
+        self.writer.write(encode(SET, payload))
+        await self.writer.drain()
+
+    async def receive(self):
+        """Reads one message. Returns (type, data); SNAPSHOT/DELTA data is {id: value} of what changed."""
+        message_type, length = MSG_HEADER.unpack(await self.reader.readexactly(MSG_HEADER.size))
+        payload = await self.reader.readexactly(length) if length else b""
+        if message_type == LAYOUT:
+            self.layout = json.loads(payload.decode("utf-8"))
+            return message_type, self.layout
+        if message_type in (SNAPSHOT, DELTA):
+            self.frame, self.timestamp, count = FRAME_HEADER.unpack_from(payload)
+            ids = self.subscribed or (self.layout["ids"] if self.layout else ())
+            start = FRAME_HEADER.size
+            if message_type == SNAPSHOT:
+                values = struct.unpack_from(f"<{count}f", payload, start)
+                changed = dict(zip(ids, values))
+            else:
+                changed = {}
+                for item in range(count):
+                    index, value = DELTA_ITEM.unpack_from(payload, start + item * DELTA_ITEM.size)
+                    changed[ids[index]] = value
+            self.values.update(changed)
+            return message_type, changed
+        if message_type == SET_ACK:
+            return message_type, struct.unpack("<H", payload)[0]
+        if message_type == ERROR:
+            self.errors.append(payload.decode("utf-8", "replace"))
+            return message_type, self.errors[-1]
+        return message_type, payload
+
+    async def frames(self):
+        """Async generator of (frame, timestamp, {id: changed value}) for every snapshot/delta."""
+        while True:
+            message_type, data = await self.receive()
+            if message_type in (SNAPSHOT, DELTA):
+                yield self.frame, self.timestamp, data
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+# =============
+# Main Script
+# =============
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serves RailDriver telemetry over TCP (binary protocol and HTTP/JSON).")
+    parser.add_argument("dll", nargs="?", default=DLL_NAME, help="RailDriver DLL (or the stub DLL)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--rate", type=float, default=50.0, help="snapshots per second")
+    args = parser.parse_args(argv)
+    raildriver = await AsyncRailDriver.load(args.dll)
+    if not raildriver:
+        return 1
+    async with raildriver:
+        server = TelemetryServer(raildriver, args.host, args.port, args.rate)
+        await server.start()
+        print(f"Serving on {args.host}:{server.port} at {args.rate:.0f} Hz "
+              f"(try: curl http://{args.host}:{server.port}/snapshot). Ctrl+C to stop.")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+    return 0
+
+if __name__ == "__main__":
+    try:
+        sys.exit(asyncio.run(main()))
+    except KeyboardInterrupt:
+        pass
@@ -1,8 +1,10 @@
 import os
 import ctypes
-import time
 import keyboard  # Import the keyboard library (install if needed: pip install keyboard)
-from ctypes import c_int, c_char_p, c_float, POINTER, create_string_buffer
+from ctypes import c_int, c_char_p
+from RailDriverData import RailDriverClient
+from controller_names import ControllerNames
+from live_view import LiveView
 
 DLL_PATH = os.path.join(os.getcwd(), "C:\Program Files (x86)\Steam\steamapps\common\RailWorks\plugins\RailDriver64.dll")
 
@@ -19,10 +21,9 @@ rd_dll.SetRailDriverConnected.argtypes = [c_int]
 rd_dll.SetRailDriverConnected.restype = None
 rd_dll.GetRailSimConnected.restype = c_int
 rd_dll.GetLocoName.restype = c_char_p
-rd_dll.GetControllerValue.argtypes = [c_char_p]
-rd_dll.GetControllerValue.restype = c_float
-rd_dll.SetControllerValue.argtypes = [c_char_p, c_float]  # Add SetControllerValue
-rd_dll.SetControllerValue.restype = None
+
+# Controllers are addressed by name; ControllerNames compiles the names to IDs once per loco
+controllers = ControllerNames(RailDriverClient(rd_dll))
 
 # Connect to RailDriver
 try:
@@ -33,54 +34,55 @@ except Exception as e:
 
 headlights_on = False
 wipers_on = False
+held = set()  # keys down on the last frame: a toggle fires once per press, no sleep needed
 
-try:
-    while True:
-        os.system('cls' if os.name == 'nt' else 'clear')
-
-        is_connected = rd_dll.GetRailSimConnected()
-        print(f"RailSim Connected: {bool(is_connected)}")
-
-        loco_name_ptr = rd_dll.GetLocoName()
-        loco_name = loco_name_ptr.decode('utf-8') if loco_name_ptr else "Unknown"
-        print(f"Locomotive Name: {loco_name}")
+def status():
+    """Extra header lines of the live view."""
+    return [
+        f"RailSim Connected: {bool(rd_dll.GetRailSimConnected())}  |  "
+        f"'l' headlights (Target: {'On' if headlights_on else 'Off'}), "
+        f"'w' wipers (Target: {'On' if wipers_on else 'Off'})",
+    ]
 
-        print("\nControlling Lights and Wipers:")
-        print("  Press 'l' to toggle headlights.")
-        print("  Press 'w' to toggle wipers.")
+def on_tick(view):
+    """Runs every frame: follows loco changes and toggles on 'l' / 'w' (not while a filter is typed)."""
+    global headlights_on, wipers_on
+    # the view re-reads the layout after a loco change; compile the names for it (no second
+    # GetRailSimLocoChanged call, which would clear the flag before the view sees it)
+    if view.snapshot is not None and view.snapshot.layout is not controllers.layout:
+        controllers.compile(view.snapshot.layout)
 
-        if keyboard.is_pressed('l'):
+    for key, name in (('l', "Headlights"), ('w', "Wipers")):
+        if not keyboard.is_pressed(key):
+            held.discard(key)
+            continue
+        if key in held:
+            continue
+        held.add(key)
+        if view.editing:
+            continue  # typed into the filter ('f'), not a toggle
+        if key == 'l':
             headlights_on = not headlights_on
-            try:
-                rd_dll.SetControllerValue(b"Headlights", 1.0 if headlights_on else 0.0)
-                # To prevent rapid toggling on a single key press
-                time.sleep(0.2)
-            except Exception as e:
-                print(f"  Error setting headlights: {e}")
-
-        if keyboard.is_pressed('w'):
+            on = headlights_on
+        else:
             wipers_on = not wipers_on
-            try:
-                rd_dll.SetControllerValue(b"Wipers", 1.0 if wipers_on else 0.0)
-                # To prevent rapid toggling on a single key press
-                time.sleep(0.2)
-            except Exception as e:
-                print(f"  Error setting wipers: {e}")
-
-        # Get and print the current values
+            on = wipers_on
         try:
-            headlights_value = rd_dll.GetControllerValue(b"Headlights")
-            wipers_value = rd_dll.GetControllerValue(b"Wipers")
-            print(f"  Headlights Value: {headlights_value} (Target: {'On' if headlights_on else 'Off'})")
-            print(f"  Wipers Value: {wipers_value} (Target: {'On' if wipers_on else 'Off'})")
+            controllers.set(name, 1.0 if on else 0.0)
+            view.message = f"{name} {'On' if on else 'Off'}"
         except Exception as e:
-            print(f"  Error getting light/wiper values: {e}")
+            view.message = f"Error setting {name.lower()}: {e}"
 
-        time.sleep(1)
+# All controllers (virtual ones included), redrawn in place up to 30 times a second; only the
+# cells that changed are written. 's' sorts, 'f' filters (e.g. "head"), 'q' quits.
+view = LiveView(controllers.client, rate=30, status=status)
 
+try:
+    view.run(on_tick=on_tick)
+    print("Exiting loop.")
 except KeyboardInterrupt:
     print("\nExiting loop.")
 except Exception as e:
     print(f"\nAn error occurred: {e}")
 finally:
-    pass
\ No newline at end of file
+    pass